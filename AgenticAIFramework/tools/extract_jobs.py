@@ -1,26 +1,48 @@
 # tools/extract_jobs.py
 from tools.base import Tool
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer
 from models.job import Job
 
+try:
+    import lxml
+    PARSER = "lxml"
+except ImportError:
+    PARSER = "html.parser"
+
+CARD_CLASS = "jobs-search-results__list-item"
+
 class ExtractJobs(Tool):
     """Tool: ExtractJobs - Parses HTML and extracts LinkedIn job data into Job objects."""
     name = "extract_jobs"
     inputs = ["html"]
     returns = {"jobs": "list of Job objects"}
 
+    # Only build the job card subtrees, the rest of the page is skipped by the parser
+    strainer = SoupStrainer("li", class_=lambda value: value is not None and CARD_CLASS in value.split())
+
+    # Field selectors within a card
+    fields = {
+        "title": "h3",
+        "company": "h4",
+        "link": "a[href]",
+        "location": ".job-search-card__location",
+        "date": "time",
+    }
+
     def run(self, context):
         """Parses LinkedIn job listing HTML and returns a structured list of Job objects."""
-        soup = BeautifulSoup(context["html"], "html.parser")
+        soup = BeautifulSoup(context["html"], PARSER, parse_only=self.strainer)
         jobs = []
 
-        for card in soup.select("li.jobs-search-results__list-item"):
-            title = card.select_one("h3") and card.select_one("h3").text.strip()
-            company = card.select_one("h4") and card.select_one("h4").text.strip()
-            link = card.find("a", href=True)
+        for card in soup.select(f"li.{CARD_CLASS}"):
+            # one lookup per field
+            found = {name: card.select_one(selector) for name, selector in self.fields.items()}
+            title = found["title"] and found["title"].text.strip()
+            company = found["company"] and found["company"].text.strip()
+            link = found["link"]
             job_id = card.get("data-entity-urn", "")
-            location = card.select_one(".job-search-card__location")
-            date = card.select_one("time") and card.select_one("time").get("datetime")
+            location = found["location"]
+            date = found["date"] and found["date"].get("datetime")
 
             if title and company and link:
                 job = Job(
@@ -33,4 +55,4 @@ class ExtractJobs(Tool):
                 )
                 jobs.append(job)
 
-        return {"jobs": jobs}
\ No newline at end of file
+        return {"jobs": jobs}
@@ -1,11 +1,9 @@
 from abc import ABC, abstractmethod
-from bs4 import BeautifulSoup
 
 import requests
 import logging
 import sys
 import configparser
-import re
 
 from argparse import ArgumentParser
 
@@ -13,26 +11,24 @@ import backoff
 
 from job_scraper import Job
 from job_scraper import SearcherImplementation
+from rate_limiter import rate_limiter
+from response_cache import ResponseCache
+from browser_pool import get_browser_pool
+from async_fetcher import AsyncFetcher
+from html_parser import HtmlParser
+from extraction_spec import get_spec
+from render_waits import wait_for_any, css_present, url_contains, all_of, render_timeout
 
 # Need to use Selenium & Edge due to Dice dynamic loading
-from selenium import webdriver
-from selenium.webdriver.edge.service import Service as EdgeService
-from selenium.webdriver.edge.options import Options as EdgeOptions
-from webdriver_manager.microsoft import EdgeChromiumDriverManager
-
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-
-from bs4 import BeautifulSoup
-import time
 
 
 # Default HTTP settings for get_response
 http_max_tries = 8
 http_max_time=60
 
-MAX_WAIT_TIME=120
+# Selectors that show the search results have rendered
+DICE_CARD_SELECTOR = "a[data-cy='card-title-link']"
+DICE_PLATFORM_RESULTS_SELECTOR = 'div[data-testid="jobSearchResultsContainer"]'
 
 
 class DiceJobScraper(SearcherImplementation):
@@ -64,7 +60,15 @@ class DiceJobScraper(SearcherImplementation):
                 logging.error("Unable to load DICE_URL")
                 return None
 
-        self.__session = requests.Session()
+        self.cache = ResponseCache.from_config(configParser)
+        # Detail pages are fetched concurrently over plain HTTP through the async fetcher
+        self.fetcher = AsyncFetcher.from_config(configParser["Dice"], name=self.source, auth=(self.__username, self.__password), cache=self.cache)
+        self.browser_pool = get_browser_pool(configParser)
+        self.render_timeout = configParser["Browser"].getint("RENDER_TIMEOUT", fallback=render_timeout) if configParser.has_section("Browser") else render_timeout
+        self.parser = HtmlParser.from_config(configParser)
+        # card & field selectors for the classic & /platform/jobs layouts, see extraction_specs.json
+        self.spec = get_spec(configParser, "Dice")
+        self.platform_spec = get_spec(configParser, "DicePlatform")
 
         logging.debug(f"Search URL {self.url}")
         
@@ -72,45 +76,23 @@ class DiceJobScraper(SearcherImplementation):
     def scrape(self) -> list[Job]:
         super().scrape()
 
-        self.__session.auth = (self.__username, self.__password)
-
-        # Make a GET request to the LinkedIn page using the session
-        # Use the session to make the request
+        # Find the job cards on the search page in a pooled browser
         logging.debug("Getting search page response")
 
         job_list = self._get_response(self.url)
        
        # so we now have a list of Jobs - that have their source & URL attributes populated.
        # we need to get the raw job description so activities in the pipeline can process them
+       # The browser is already back in the pool, so fetch the detail pages concurrently over HTTP
 
-        for job in job_list:
-            job.raw_description = self.get_job_description(job.url)
-
-        return job_list
-
-
-
-
-
-    @backoff.on_exception(backoff.expo, requests.exceptions.RequestException, max_tries=http_max_tries, max_time=http_max_time, logger=logging)
-    def get_job_description(self, url:str) -> str:
-    
-        url=url.replace("\"","").replace("\'","")
-
-        print(f"**** Trying to access: {url}")
-
-        response = self.__session.get(url)
-        if response.status_code == 429:
-            raise requests.exceptions.RequestException("Rate limit exceeded")
-
-        if response.status_code == 200:
-            logging.debug("HTTP Response: returning valid response")
-            return response.content
-        
-        logging.error("Failed with status code: %s", response.status_code)
-        return None
+        urls = [job.url.replace("\"","").replace("\'","") for job in job_list]
+        logging.info(f"Fetching {len(urls)} Dice job descriptions, concurrency {self.fetcher.concurrency}")
+        pages = self.fetcher.fetch_all_sync(urls)
 
+        for job, page in zip(job_list, pages):
+            job.raw_description = page
 
+        return job_list
 
 
 
@@ -136,39 +118,28 @@ class DiceJobScraper(SearcherImplementation):
  #       logging.error("Failed with status code: %s", response.status_code)
  #       return None
     
-    # 🔧 Setup Edge options
-        options = EdgeOptions()
-        options.use_chromium = True
-        options.headless = True  # Set to False if you want to see the browser
-        options.add_argument("start-minimized")
-        options.add_argument("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36")
 
-        # 🚀 Launch Edge with Selenium
-        driver = webdriver.Edge(service=EdgeService(EdgeChromiumDriverManager().install()), options=options)
+        # 🚀 Borrow an Edge session from the shared pool rather than launching one per scrape
+        with self.browser_pool.browser() as driver:
+            return self._find_job_cards(driver)
 
+
+    def _find_job_cards(self, driver) -> list[Job]:
         # 🎯 Target URL
       #  url = "https://www.dice.com/jobs?q=leader%20AI&location=Seattle,%20WA,%20USA&filters.postedDate=ONE"
 
         print("[*] Loading Dice job search page...")
+        rate_limiter.acquire(self.url)
         driver.get(self.url)
 
-        # Default process to extract the job
-        process = 0
-       # ✅ Wait up to MAX_WAIT_TIME until job titles appear
-        try:
-            if '/platform/jobs' in self.url:
-                WebDriverWait(driver, MAX_WAIT_TIME).until(
-                    EC.presence_of_element_located(
-                        (By.CSS_SELECTOR, 'div[data-testid="jobSearchResultsContainer"]')
-                    )
-                )
-                process = 2
-            else:
-                WebDriverWait(driver, MAX_WAIT_TIME).until(
-                    EC.presence_of_element_located((By.CSS_SELECTOR, "a[data-cy='card-title-link']"))
-                )
-                process=1
-        except:
+        # ✅ Wait for whichever layout renders first. The redirect to the /platform/jobs
+        # React site is watched for alongside the classic cards, not after they time out
+        process = wait_for_any(driver, {
+            1: css_present(DICE_CARD_SELECTOR),
+            2: all_of(url_contains("/platform/jobs"), css_present(DICE_PLATFORM_RESULTS_SELECTOR)),
+        }, timeout=self.render_timeout) or 0
+
+        if process == 0:
             print("[-] Timeout: Job listings did not load. Testing for redirect")
             if "/platform/jobs" in driver.current_url:
                  print("[-] Redirect detected. Switching to alternate processing")
@@ -183,19 +154,16 @@ class DiceJobScraper(SearcherImplementation):
 
             # 🧼 Grab full rendered HTML
             html = driver.page_source
-            soup = BeautifulSoup(html, "html.parser")
 
             # 🔍 Find job cards
-            job_cards = soup.find_all("dhi-search-card", attrs={"data-cy": "search-card"})
+            job_cards = self.spec.extract_all(self.parser, html)
 
             print(f"[+] Found {len(job_cards)} jobs.")
 
             
             for card in job_cards:
-                job_id = card.get("data-cy-value")
-
-                if job_id is not None:
-                    job_list.append(Job(id=job_id, source="Dice", url=f"https://www.dice.com/job-detail/{job_id}"))
+                if card["id"] is not None:
+                    job_list.append(Job(id=card["id"], source="Dice", url=card["url"]))
             
             
         elif process==2:
@@ -205,25 +173,16 @@ class DiceJobScraper(SearcherImplementation):
             # we've gotten here so we know we've been redirected to the REACT site 
             # 🧼 Grab full rendered HTML
             html = driver.page_source
-            soup = BeautifulSoup(html, "html.parser")
-
-     
-            # 🔍 Find job cards - this gets the search results
-            search_results = soup.find("div", attrs={"data-testid": "jobSearchResultsContainer"})
 
-            # now need to extract each link
-            if search_results is not None:
-                dice_job_list = search_results.find_all("a", attrs={"data-testid": "job-search-job-card-link"})
+            # 🔍 Find the job card links inside the search results, the job id is in the URL
+            dice_job_list = self.platform_spec.extract_all(self.parser, html)
 
-                for job in dice_job_list:
-                    current_url=job['href']
-                    current_id = re.findall(r"[^\/]{36}", current_url)
-                    print(f"Current URL = {current_url}")
-                    print(f"Job id = {current_id}")
-                    job_list.append(Job(id=current_id, source="Dice",url=current_url))
+            for job in dice_job_list:
+                print(f"Current URL = {job['url']}")
+                print(f"Job id = {job['id']}")
+                job_list.append(Job(id=job["id"], source="Dice",url=job["url"]))
 
-        # Shutdown the browser    
-        driver.quit()
+        # The browser goes back to the pool for the next scrape
         return job_list
 
 
@@ -1,4 +1,3 @@
-from bs4 import BeautifulSoup
 import requests
 import re
 import logging
@@ -8,14 +7,14 @@ import certifi
 
 from job_scraper import SearcherImplementation
 from job_scraper import Job
+from rate_limiter import rate_limiter
+from aimd_controller import controllers
+from browser_pool import get_browser_pool
+from render_waits import wait_for_any, css_present, render_timeout
+from html_parser import HtmlParser
+from extraction_spec import get_spec
 
-from selenium import webdriver
-from selenium.webdriver.edge.service import Service as EdgeService
-from webdriver_manager.microsoft import EdgeChromiumDriverManager
-from selenium.webdriver.edge.options import Options
 from selenium.webdriver.common.by import By
-from bs4 import BeautifulSoup
-import time
 
 
 # Default HTTP settings for get_response
@@ -26,7 +25,8 @@ http_max_time=60
 class IndeedJobScraper(SearcherImplementation):
 
     def __init__(self, configParser, parser):
-     
+
+        self.source="Indeed"
 
         # Check if the parameters were passed, and set the access variables
         if parser.parse_args().username:
@@ -52,6 +52,10 @@ class IndeedJobScraper(SearcherImplementation):
 
         self.__session = requests.Session()
         self.__indeed_url = self.__indeed_url.strip("'\"")
+        self.browser_pool = get_browser_pool(configParser)
+        self.render_timeout = configParser["Browser"].getint("RENDER_TIMEOUT", fallback=render_timeout) if configParser.has_section("Browser") else render_timeout
+        self.parser = HtmlParser.from_config(configParser)
+        self.spec = get_spec(configParser, "Indeed")
 
         logging.debug(f"Search URL {self.__indeed_url}")
 
@@ -69,25 +73,20 @@ class IndeedJobScraper(SearcherImplementation):
             "Referer": "https://www.google.com/",
         }
 
-        # Setup headless Chrome
+        # Borrow a headless browser from the shared pool
+        with self.browser_pool.browser() as driver:
+            rate_limiter.acquire(self.__indeed_url)
+            driver.get(self.__indeed_url)
         
-        options = Options()
-        options.headless = True  # Set False if you want to watch the browser
-        options.use_chromium = True
-        options.add_argument("start-maximized")
-        options.add_argument("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36")
+            # Wait for the job cards (or Indeed's no results message) rather than a fixed sleep
+            wait_for_any(driver, {
+                "jobs": css_present("div.job_seen_beacon"),
+                "no results": css_present("div.jobsearch-NoResult-messageContainer"),
+            }, timeout=self.render_timeout)
 
-        
-        # Launch browser
-        driver = webdriver.Edge(service=EdgeService(EdgeChromiumDriverManager().install()), options=options)
+            # Grab HTML after rendering
+            html = driver.page_source
 
-        driver.get(self.__indeed_url)
-    
-        # Wait for dynamic content to load
-        time.sleep(5)
-
-        # Grab HTML after rendering
-        html = driver.page_source
         recent_jobs = self.extract_recent_jobs(html)
         return recent_jobs
         
@@ -104,23 +103,29 @@ class IndeedJobScraper(SearcherImplementation):
 
     def extract_recent_jobs(self, html):
 
-        soup = BeautifulSoup(html, "html.parser")
-        job_cards = soup.find_all("div", class_="job_seen_beacon")  # or whatever class wraps the job
+        # the card, title & posted time selectors are in extraction_specs.json
+        job_cards = self.spec.extract_all(self.parser, html)
 
         recent_jobs = []
         for card in job_cards:
-            # You'll need to inspect the correct class for the posted time span
-            time_span = card.find("span", class_="date")  # Sometimes it's "date" or similar
-            if time_span and is_posted_within_last_hour(time_span.get_text()):
-                title_elem = card.find("h2")  # Or appropriate title tag
-                job_title = title_elem.get_text(strip=True) if title_elem else "Unknown title"
-                recent_jobs.append(job_title)
+            if card["posted"] and is_posted_within_last_hour(card["posted"]):
+                recent_jobs.append(card["title"] or "Unknown title")
 
         return recent_jobs
     
     def get_indeed_page(self, url) -> str:
-        response = self.__session.get(url)
+        controller = controllers.get(self.source)
+        controller.acquire()
+        rate_limiter.acquire(url)
+        status = None
+        try:
+            response = self.__session.get(url)
+            status = response.status_code
+        finally:
+            controller.release(status)
+
         if response.status_code == 429:
+            rate_limiter.penalize(url, response.headers.get("Retry-After"))
             raise requests.exceptions.RequestException("Rate limit exceeded")
 
         if response.status_code == 200:
@@ -1,10 +1,12 @@
 from abc import ABC, abstractmethod
-from bs4 import BeautifulSoup
 
 import requests
 import logging
 import sys
 import configparser
+import asyncio
+
+from datetime import datetime, timedelta
 
 from argparse import ArgumentParser
 
@@ -12,18 +14,29 @@ import backoff
 
 from job_scraper import Job
 from job_scraper import SearcherImplementation
+from async_fetcher import AsyncFetcher
+from rate_limiter import rate_limiter
+from response_cache import ResponseCache
+from singleflight import fetch_flight
+from http_session import pooled_session
+from html_parser import HtmlParser, CardStream, element_matcher
+from page_encoding import PageBody
+from extraction_spec import get_spec
 
 from urllib.parse import urlparse, parse_qs, urlencode, urlunparse
-from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
 from concurrent.futures import ThreadPoolExecutor, as_completed
-import time
-import random
 
 # Default HTTP settings for get_response
 http_max_tries = 8
 http_max_time=60
 
+# Default search paging settings
+search_page_size = 25
+search_max_jobs = 100
+
+# The guest list endpoint returns just the job card <li> fragments for a search
+guest_api_url = "https://www.linkedin.com/jobs-guest/jobs/api/seeMoreJobPostings/search"
+
 
 
 
@@ -40,23 +53,18 @@ class LinkedInJobScraper(SearcherImplementation):
         # Use the session to make the request
         logging.debug("Getting search page response")
 
-        search_page = self._get_response(self.__linkedin_url)
-        if search_page.status_code == 429:
-            raise requests.exceptions.RequestException("Rate limit exceeded")
+        # An injected extractor is handed each search results page in turn
+        if self.job_extractor != self._default_job_extractor:
+            jobs = []
+            for soup, _ in self.iter_search_pages():
+                jobs.extend(self.job_extractor(soup) or [])
+            return jobs
 
-        # Check if the request was successful (status code 200)
-        if search_page.status_code != 200:
-            logging.error("Failed to retrieve the page")
-            sys.exit(0)
+        # Stream the cards into the async fetcher so detail pages download while the next search page loads
+        if self.fetch_mode == "async":
+            return asyncio.run(self._scrape_async())
 
-        soup = BeautifulSoup(search_page.content, "html.parser")
-
-        logging.debug("Got the LinkedIn page")
-        jobs = self.job_extractor(soup)
-        return jobs
-
-    # LinkedIn div class id that identifies the job card
-    __job_string="base-card relative w-full hover:no-underline focus:no-underline base-card--link base-search-card base-search-card--link job-search-card"
+        return self._default_job_extractor(list(self.iter_search_cards()))
 
 
     # inject a custome function to extract jobs or use the default
@@ -75,6 +83,8 @@ class LinkedInJobScraper(SearcherImplementation):
         else:
             self.__password = configParser["LinkedIn"]["LINKEDIN_PASSWORD"]
 
+        self.__time_range = None
+
         if parser.parse_args().url:
             self.__linkedin_url = parser.parse_args().url
         else:
@@ -96,23 +106,37 @@ class LinkedInJobScraper(SearcherImplementation):
 
         logging.info(f"Setting up LinkedIn HTTP Connection Pool")
 
-        self.__session = requests.Session()
-
-         # Configure connection pooling
-        adapter = HTTPAdapter(
-            pool_connections=2,  # Number of connection pools
-            pool_maxsize=10,      # Maximum number of connections in the pool
-            max_retries=Retry(
-                total=5,          # Retry up to 5 times for failed requests
-                backoff_factor=0.3,  # Wait time between retries (exponential backoff)
-                status_forcelist=[429, 500, 502, 503, 504]  # Retry on these HTTP status codes
-            )
-        )
-        self.__session.mount("http://", adapter)
-        self.__session.mount("https://", adapter)
+        self.__session = pooled_session()
 
         logging.info(f"Search URL {self.__linkedin_url}")
 
+        # How the job detail pages are fetched: async (default), threaded or serial
+        self.fetch_mode = configParser["LinkedIn"].get("FETCH_MODE", fallback="async").strip("\"'").lower()
+        # Job detail pages are cached on disk & revalidated, search pages are always fetched
+        self.cache = ResponseCache.from_config(configParser)
+        self.fetcher = AsyncFetcher.from_config(configParser["LinkedIn"], name=self.source, auth=(self.__username, self.__password), cache=self.cache)
+        logging.info(f"Job detail fetch mode: {self.fetch_mode}")
+
+        # Search results are paged with start= offsets until a page is empty, MAX_JOBS is reached or the time window runs out
+        self.page_size = configParser["LinkedIn"].getint("PAGE_SIZE", fallback=search_page_size)
+        self.max_jobs = configParser["LinkedIn"].getint("MAX_JOBS", fallback=search_max_jobs)
+
+        # page (default) downloads the full search page, guest only the job card fragments
+        self.search_mode = configParser["LinkedIn"].get("SEARCH_MODE", fallback="page").strip("\"'").lower()
+        self.guest_api_url = configParser["LinkedIn"].get("GUEST_API_URL", fallback=guest_api_url).strip("\"'")
+        logging.info(f"Search mode: {self.search_mode}")
+
+        # lxml (default), soup-lxml or html.parser, see html_parser
+        self.parser = HtmlParser.from_config(configParser)
+        # the card & field selectors, guest fragments only carry the base card class
+        self.spec = get_spec(configParser, "LinkedInGuest" if self.search_mode == "guest" else "LinkedIn")
+
+        # Parse the search pages as they download in async mode, needs lxml & a single compound container selector
+        self.stream_search = configParser["LinkedIn"].getboolean("STREAM_SEARCH", fallback=False)
+        if self.stream_search and (self.parser.backend != "lxml" or element_matcher(self.spec.container) is None):
+            logging.warning(f"Can't stream the search pages with the {self.parser.backend} backend & {self.spec.container}, parsing whole pages")
+            self.stream_search = False
+
         # If the job_extractor is not injected, use the default extractor
         self.job_extractor = job_extractor or self._default_job_extractor
 
@@ -122,9 +146,197 @@ class LinkedInJobScraper(SearcherImplementation):
         self.__session.close()
 
 
-    def _default_job_extractor(self, soup):
+    def _default_job_extractor(self, job_elements):
         logging.info("Extracting jobs with default extractor")
-        return self._extract_jobs(soup)
+        if self.fetch_mode == "threaded":
+            return self._extract_jobs_threaded(job_elements)
+        if self.fetch_mode == "serial":
+            return self._extract_jobs(job_elements)
+        return self._extract_jobs_async(job_elements)
+
+
+
+    def _search_page_url(self, start):
+        """The search URL for the results page starting at offset start"""
+        if start == 0 and self.search_mode != "guest":
+            return self.__linkedin_url
+
+        url_parts = urlparse(self.__linkedin_url)
+        query_params = parse_qs(url_parts.query)
+        query_params["start"] = [start]
+        query = urlencode(query_params, doseq=True)
+
+        # the guest endpoint takes the same search parameters as the search page
+        if self.search_mode == "guest":
+            return f"{self.guest_api_url}?{query}"
+
+        return urlunparse(url_parts._replace(query=query))
+
+    def _posted_in_window(self, card):
+        """False if the card's posting date is before the start of the time window"""
+        if self.__time_range is None or not card.get("date"):
+            return True
+
+        try:
+            posted_date = datetime.strptime(card["date"][:10], "%Y-%m-%d").date()
+        except ValueError:
+            return True
+
+        return posted_date >= (datetime.now() - timedelta(seconds=self.__time_range)).date()
+
+    def _page_cards(self, content, seen):
+        """
+        Parse one search results page. Returns (soup, cards, more) where cards are the fields
+        (see extraction_specs.json) of the new job cards inside the time window & more is
+        False once paging should stop
+        """
+        soup = self.parser.parse(content, only=self.spec.container)
+        page = {"cards": 0, "in_window": 0}
+        cards = []
+        for job_element in soup.select(self.spec.container):
+            card = self._take_card(job_element, seen, page)
+            if card is not None:
+                cards.append(card)
+
+        return soup, cards, self._more_pages(page, seen)
+
+    def _take_card(self, job_element, seen, page):
+        """
+        The fields of a card element if it is a new job inside the time window & MAX_JOBS
+        hasn't been reached, otherwise None. page counts the cards seen on the current page
+        """
+        page["cards"] += 1
+        if len(seen) >= self.max_jobs:
+            return None
+
+        card = self.spec.extract(job_element)
+        if not self._posted_in_window(card):
+            return None
+        page["in_window"] += 1
+
+        # pages overlap, the tracking parameters in the link change but the job id doesn't
+        key = card.get("id") or card.get("url")
+        if key is None or key in seen or not card.get("url"):
+            return None
+
+        seen.add(key)
+        return card
+
+    def _more_pages(self, page, seen) -> bool:
+        """Whether to fetch the next search results page"""
+        if page["cards"] == 0:
+            logging.info("Empty search results page, no more jobs")
+            return False
+
+        if len(seen) >= self.max_jobs:
+            logging.info(f"Reached MAX_JOBS ({self.max_jobs})")
+            return False
+
+        if page["in_window"] == 0:
+            logging.info("No jobs on this page inside the time window, stopping")
+            return False
+
+        return True
+
+    def iter_search_pages(self):
+        """Generator that walks the search results pages yielding (soup, new cards) as each page arrives"""
+        seen = set()
+        start = 0
+        more = True
+
+        while more:
+            search_page = self._get_response(self._search_page_url(start))
+            if search_page is None:
+                logging.error("Failed to retrieve the page")
+                return
+
+            logging.debug(f"Got the LinkedIn page starting at {start}")
+            soup, cards, more = self._page_cards(search_page.content, seen)
+            yield soup, cards
+            start += self.page_size
+
+    def iter_search_cards(self):
+        """Generator yielding the job card fields from every search results page"""
+        for _, cards in self.iter_search_pages():
+            yield from cards
+
+    async def _aiter_search_cards(self):
+        """Async version of iter_search_cards, the pages come through the async fetcher"""
+        seen = set()
+        start = 0
+        more = True
+
+        while more:
+            content = await self.fetcher.fetch(self._search_page_url(start), use_cache=False)
+            if content is None:
+                logging.error("Failed to retrieve the page")
+                return
+
+            logging.debug(f"Got the LinkedIn page starting at {start}")
+            _, cards, more = self._page_cards(content, seen)
+            for card in cards:
+                yield card
+            start += self.page_size
+
+    async def _astream_search_cards(self):
+        """
+        Streaming version of _aiter_search_cards. Each search page is parsed as it downloads
+        & a card is yielded as soon as its closing tag arrives
+        """
+        seen = set()
+        start = 0
+        more = True
+
+        while more:
+            stream = CardStream(self.spec.container)
+            page = {"cards": 0, "in_window": 0}
+            received = False
+
+            chunks = self.fetcher.stream(self._search_page_url(start))
+            try:
+                async for chunk in chunks:
+                    received = True
+                    for job_element in stream.feed(chunk):
+                        card = self._take_card(job_element, seen, page)
+                        if card is not None:
+                            yield card
+
+                    # no need for the rest of the page
+                    if len(seen) >= self.max_jobs:
+                        break
+            finally:
+                # close the download now rather than when the generator is collected
+                await chunks.aclose()
+
+            if not received:
+                logging.error("Failed to retrieve the page")
+                return
+
+            for job_element in stream.close():
+                card = self._take_card(job_element, seen, page)
+                if card is not None:
+                    yield card
+
+            logging.debug(f"Streamed the LinkedIn page starting at {start}")
+            more = self._more_pages(page, seen)
+            start += self.page_size
+
+    async def _scrape_async(self):
+        """Schedule each job detail fetch as soon as its card arrives"""
+        search_cards = self._astream_search_cards if self.stream_search else self._aiter_search_cards
+
+        async with self.fetcher:
+            cards = []
+            tasks = []
+            async for card in search_cards():
+                cards.append(card)
+                tasks.append(asyncio.create_task(self.fetcher.fetch(card["url"])))
+
+            pages = await asyncio.gather(*tasks)
+
+        jobs = [self._job(card, page) for card, page in zip(cards, pages)]
+        logging.debug(f"Found {len(jobs)} jobs")
+        return jobs
 
 
 
@@ -160,12 +372,32 @@ class LinkedInJobScraper(SearcherImplementation):
 # The max_time parameter will set the maximum time to wait for the request
 
     @backoff.on_exception(backoff.expo, requests.exceptions.RequestException, max_tries=http_max_tries, max_time=http_max_time, logger=logging)
-    def _get_response(self, url):
+    def _get_response(self, url, use_cache=False):
         logging.info(f"Getting response from {url}")
-        response = self.__session.get(url)
+
+        entry, headers = None, {}
+        if use_cache and self.cache is not None:
+            cached, entry, headers = self.cache.begin(url)
+            if cached is not None:
+                logging.debug("HTTP Response: returning cached response")
+                return cached
+
+        # the AIMD window is shared with the async fetcher, so 429s from either path shrink it
+        self.fetcher.controller.acquire()
+        rate_limiter.acquire(url)
+        status = None
+        try:
+            response = self.__session.get(url, headers=headers)
+            status = response.status_code
+        finally:
+            self.fetcher.controller.release(status)
+
+        if use_cache and self.cache is not None:
+            response = self.cache.finish(url, entry, response)
+
         if response.status_code == 429:
-            time.sleep(30)  # Wait for 30 seconds before retrying
-            logging.error("LinkedIn Rate limit exceeded. Retrying after 30 seconds.")
+            # the shared limiter holds back every LinkedIn request until Retry-After has passed
+            rate_limiter.penalize(url, response.headers.get("Retry-After"))
             raise requests.exceptions.RequestException("Rate limit exceeded")
 
         if response.status_code == 200:
@@ -177,13 +409,10 @@ class LinkedInJobScraper(SearcherImplementation):
 
 
 
-# Extract job details from the LinkedIn page
-# The soup object will be passed to this function
-    def _extract_jobs(self, soup):
+# Extract job details from the LinkedIn job cards
+# The job cards from the search pages will be passed to this function
+    def _extract_jobs(self, job_elements):
         logging.debug(">")
-        # job_string = "scaffold-layout__list "
-        logging.debug(f"Extracting jobs with {self.__job_string}")
-        job_elements = soup.find_all('div', {'class': self.__job_string})
         
         jobs = []
         for job_element in job_elements:
@@ -194,14 +423,14 @@ class LinkedInJobScraper(SearcherImplementation):
         logging.debug(f"Found {len(jobs)} jobs")
         return jobs
 
-    def _extract_jobs_threaded(self, soup):
+    def _extract_jobs_threaded(self, job_elements):
         logging.info("Extracting jobs with multi-threading")
-        job_elements = soup.find_all('div', {'class': self.__job_string})
         
         jobs = []
 
         # Use ThreadPoolExecutor to process job elements concurrently
-        with ThreadPoolExecutor(max_workers=5) as executor:  # Adjust max_workers based on your system
+        # The pool is sized to the largest window, _get_response holds the requests to the current AIMD window
+        with ThreadPoolExecutor(max_workers=self.fetcher.controller.maximum) as executor:
             future_to_job = {executor.submit(self._extract_job_details, job_element): job_element for job_element in job_elements}
 
             for future in as_completed(future_to_job):
@@ -209,37 +438,60 @@ class LinkedInJobScraper(SearcherImplementation):
                     job = future.result()  # Get the result of the job processing
                     if job is not None:
                         jobs.append(job)
-                        time.sleep(random.uniform(1,3)) # Random sleep between 1 and 3 seconds
                 except Exception as e:
                     logging.error(f"Error processing job element: {e}")
 
         logging.debug(f"Found {len(jobs)} jobs")
         return jobs
 
-# Function to extract job details from a job element (job card on LinkedIn)
+# Fetch all the job description pages concurrently with the asyncio fetcher
+# The wall time grows with the number of cards / FETCH_CONCURRENCY rather than the number of cards
+    def _extract_jobs_async(self, job_elements):
+        logging.info(f"Extracting jobs with asyncio, concurrency {self.fetcher.concurrency}")
+
+        pages = self.fetcher.fetch_all_sync([card["url"] for card in job_elements])
+
+        jobs = [self._job(card, page) for card, page in zip(job_elements, pages)]
+
+        logging.debug(f"Found {len(jobs)} jobs")
+        return jobs
+
+# Function to extract job details from a job element (the fields of a job card on LinkedIn)
     def _extract_job_details(self, job_element):
         
-        url = job_element.find('a')['href']
+        url = job_element.get("url")
     
         # Get the job description page
         if url is not None:
             job_details = self._get_job_description_page(url)
-            return Job(source="LinkedIn", url=url, raw_description=job_details)
+            return self._job(job_element, job_details)
         
         return None
+
+    def _job(self, card, raw_description):
+        """The Job for a card, the LLM fills in anything the card doesn't have"""
+        return Job(id=card.get("id"), source="LinkedIn", title=card.get("title"), company=card.get("company"),
+                   location=card.get("location"), date=card.get("date"), url=card["url"], salary=card.get("salary"),
+                   raw_description=raw_description)
     
 
     def _get_job_description_page(self, url):
+        # the same posting turns up in overlapping searches, share one fetch between them
+        return fetch_flight.do(url, lambda: self._fetch_job_description_page(url))
+
+    def _fetch_job_description_page(self, url):
+        description_page = None
         try:
-            description_page = self._get_response(url)
-            return description_page.content
+            description_page = self._get_response(url, use_cache=True)
+            if description_page is not None:
+                return PageBody.from_response(description_page)
 
         except requests.exceptions.ConnectionError as e:
             logging.error("Connection error while fetching job description: %s", e)        
         except requests.exceptions.RequestException as e:
             logging.error("Error accessing page %s", e)
 
-        logging.error("Failed to retrieve job description page. Status code: %s",description_page.status_code)   
+        logging.error("Failed to retrieve job description page %s", url)
 
         return None
 
@@ -11,11 +11,26 @@ import backoff
 from openai import OpenAIError
 import re
 
+import hashlib
+
 import trafilatura
 
+from aimd_controller import controllers, status_from_exception
+from llm_budget import llm_budgets
+from llm_clients import llm_clients, prompt_cache
+from structured_data import extract_job_fields, LOCAL_FIELDS
+from salary_extractor import extract_salary, salary_snippets, snippet_chars, max_snippets
+from compactor import DescriptionCompactor, count_tokens
+from openai_batch import OpenAIBatch
+from page_encoding import decode_body
+
 
 DEV_MODE = True
 
+# Default packing settings, a pack size of 1 sends each job on its own
+pack_size = 1
+pack_token_cap = 6000
+
 
 class OpenAISummarizer(GenAISummarizer):
 
@@ -28,7 +43,12 @@ class OpenAISummarizer(GenAISummarizer):
         """
         self.__api_key = config["OpenAI"]["OPENAI_API_KEY"]
         self.__model = config["OpenAI"]["MODEL"]
+        # one keep-alive client for every job rather than a new connection per request
+        self.base_url = config["OpenAI"].get("BASE_URL", fallback="").strip("\"'")
+        self.client = llm_clients.openai(self.__api_key, self.base_url)
         self.retry_on_no_salary = config["OpenAI"].getboolean("RETRY_ON_NO_SALARY", fallback=False)
+        # dedupe, drop the boilerplate & trim the description to TOKEN_BUDGET before it is sent
+        self.compactor = DescriptionCompactor.from_config(config["OpenAI"])
 
         self._load_prompt(prompt_filename)
 
@@ -65,9 +85,9 @@ class OpenAISummarizer(GenAISummarizer):
 
 
 
-    def summarize(self, raw_description: str) -> Job:
+    def summarize(self, job: Job) -> Job:
         """
-        Summarizes the given text using OpenAI's API. The text should be the raw job description from the job board.
+        Summarizes the job using OpenAI's API, its description as the CPU stage cleaned it or else the raw page from the job board.
         This method will call the OpenAI API to summarize the text and return a Job object with the summarized description.
         
         This is the implementation of the abstract method from the JobSummarizer class.
@@ -89,14 +109,14 @@ class OpenAISummarizer(GenAISummarizer):
 
 
         Args:
-            text (str): The text to summarize.
+            job (Job): The scraped job, its raw or cleaned description is summarized.
         
         Returns:
             Job: An object created by the information returned from the GenAI.
         """
         logging.debug("Summarizing text using OpenAI API...")
     
-        summary = self._query_openai( str(raw_description))
+        summary = self._query_openai(self.compactor.compact_page(job))
         if summary is None:
             logging.error("Failed to summarize text using OpenAI API.")
             return None
@@ -131,7 +151,7 @@ class OpenAISummarizer(GenAISummarizer):
             description=parsed_summary.get("description", ""),
             summary=parsed_summary.get("summary", ""),
             fit=parsed_summary.get("fit", None),
-            raw_description=raw_description)
+            raw_description=job.raw_description)
     
 
 
@@ -143,6 +163,11 @@ class OpenAISummarizer(GenAISummarizer):
 
     @backoff.on_exception(backoff.expo, (openai.OpenAIError, openai.APIError, openai.RateLimitError, openai.Timeout, BaseException), max_tries=20)
     def _query_openai(self, raw_description ):
+        # wait for the tokens per minute budget before taking a slot in the concurrency window
+        llm_budgets.get("llm:openai").acquire(self.__prompt, raw_description)
+        controller = controllers.get("llm:openai")
+        controller.acquire()
+        status = None
         try:
 
             logging.debug(f"Input string: {super().get_prompt()}")
@@ -150,14 +175,15 @@ class OpenAISummarizer(GenAISummarizer):
             raw_input = self.__prompt + raw_description
 
 
-            openai.api_key = self.__api_key
-            response = openai.responses.create(
+            response = self.client.responses.create(
                 model=self.__model,\
                 instructions="You are a computer programmer & you will follow the instructions carefully.",
                 input= raw_input,
                 temperature=0.1,  # Adjust for creativity (0.0 = deterministic, 1.0 = more creative)
                 max_output_tokens=500   # Adjust for response length
             )
+            status = 200
+            prompt_cache.record_openai("llm:openai", response.usage)
 
             json_response = str(response.output_text)
 
@@ -169,9 +195,12 @@ class OpenAISummarizer(GenAISummarizer):
             return json_response
         
         except openai.OpenAIError as e:
+            status = status_from_exception(e)
             logging.error("Error querying OpenAI: %s",e)
             # logging.error(f"Model: {model} Temperature: {temp} Max Output Tokens: {max_tokens} Prompt: {prompt}")
             return None
+        finally:
+            controller.release(status)
 
 
 
@@ -250,64 +279,299 @@ class OpenAIStructuredSummarizer(OpenAISummarizer):
             }
         }
 
-
-        
+        # Only ask the LLM for the fields the page's structured data doesn't have
+        self.structured_data = config["OpenAI"].getboolean("STRUCTURED_DATA", fallback=True)
+        # With every local field found, skip the LLM & leave summary/fit empty
+        self.skip_llm_if_complete = config["OpenAI"].getboolean("SKIP_LLM_IF_COMPLETE", fallback=False)
+        # Find the salary in the cleaned description with salary_extractor before asking the LLM
+        self.local_salary = config["OpenAI"].getboolean("LOCAL_SALARY", fallback=True)
+        # The salary re-query sends these windows of the raw page rather than all of it
+        self.salary_snippet_chars = config["OpenAI"].getint("SALARY_SNIPPET_CHARS", fallback=snippet_chars)
+        self.salary_snippets = config["OpenAI"].getint("SALARY_SNIPPETS", fallback=max_snippets)
+        # Send the jobs through the Batch API, half the cost but the results can take hours
+        self.batch_mode = config["OpenAI"].getboolean("BATCH_MODE", fallback=False)
+        self.batch = OpenAIBatch.from_config(config["OpenAI"], self.get_api_key()) if self.batch_mode else None
+        # Up to PACK_SIZE jobs per request, sharing one copy of prompt.txt, within PACK_TOKEN_CAP tokens of descriptions
+        self.pack_size = max(1, config["OpenAI"].getint("PACK_SIZE", fallback=pack_size))
+        self.pack_token_cap = config["OpenAI"].getint("PACK_TOKEN_CAP", fallback=pack_token_cap)
+
+    # Fields only the LLM can fill in
+    LLM_FIELDS = ("description", "summary", "fit")
+
+    SALARY_FIELDS = ("salary", "salary_lower", "salary_upper")
+
+    PACK_PROMPT = ("\n\nThere are several job descriptions below rather than one, each starts with a JOB line giving its "
+                   "index. Return an object for every job in jobs, completed as above from that job's description alone, "
+                   "with its index.\n\n")
+
+    WANTED_PROMPT = "Only these fields are needed for this job, leave the others empty / 0: "
+
+    SALARY_PROMPT = ("Find the salary of the job described below in these snippets of its web page. The snippets may also "
+                     "show the salaries of other, similar jobs, ignore those. salary is the text as shown, salary_lower & "
+                     "salary_upper are annual amounts in whole units, all three are empty / 0 if the job's salary isn't given.\n\n")
+
+    def _local_fields(self, job: Job, page):
+        """
+        The fields known without the LLM & where they came from: the page's JSON-LD / meta
+        tags first, then anything the scraper took from the search card. page is the decoded raw page
+        """
+        if not self.structured_data:
+            return {}, {}
+
+        if job.page_fields is not None:
+            # already parsed by the CPU stage
+            fields, provenance = dict(job.page_fields[0]), dict(job.page_fields[1])
+        else:
+            fields, provenance = extract_job_fields(page)
+        for name in LOCAL_FIELDS:
+            value = getattr(job, name, None)
+            if value and name not in fields:
+                fields[name] = value
+                provenance[name] = "card"
+
+        # the card only has the salary text, e.g. "$120,000.00/yr - $150,000.00/yr"
+        if self.local_salary and "salary_upper" not in fields and isinstance(fields.get("salary"), str):
+            for name, value in extract_salary(fields["salary"], known_salary=True).items():
+                if name not in fields:
+                    fields[name] = value
+                    provenance[name] = provenance["salary"]
+        return fields, provenance
+
+    def _local_salary(self, description, known, provenance):
+        """Fill in the salary fields from the cleaned description when the page & card didn't have them"""
+        if not self.local_salary or "salary_upper" in known:
+            return
+        found = extract_salary(description)
+        if found:
+            logging.info(f"Found the salary {found['salary']} in the description, not asking the LLM for it")
+        for name, value in found.items():
+            known[name] = value
+            provenance[name] = "regex"
+
+    def _complete(self, known) -> bool:
+        return self.skip_llm_if_complete and all(name in known for name in LOCAL_FIELDS)
+
+    def _schema_for(self, fields):
+        """The job schema cut down to fields"""
+        schema = json.loads(json.dumps(self.job_schema))
+        body = schema["format"]["schema"]
+        body["properties"] = {name: spec for name, spec in body["properties"].items() if name in fields}
+        body["required"] = [name for name in body["required"] if name in fields]
+        return schema
 
     def summarize(self, job: Job):
 
+        summary, request = self._prepare(job)
+        if request is None:
+            return summary
+
+        text, schema, page, known, provenance = request
+        return self._summary(job, self._openai_structured_query(text, schema), page, known, provenance)
+
+    def summarize_batch(self, jobs) -> list:
+        """
+        Summarize jobs through the Batch API, for runs that can wait for the answers. The
+        requests are the same as summarize would send but go as one batch, the summaries
+        are returned in the order of jobs, None for those that failed. The salary re-query
+        is skipped, it would need a second batch
+        """
+        summaries = [None] * len(jobs)
+        requests = {}
+        for index, job in enumerate(jobs):
+            summaries[index], request = self._prepare(job)
+            if request is not None:
+                requests[f"job-{index}"] = request
+
+        logging.info(f"Summarizing {len(requests)} of {len(jobs)} jobs through the OpenAI Batch API")
+        results = self.batch.run({custom_id: self._request_body(text, schema) for custom_id, (text, schema, *_) in requests.items()})
+
+        for custom_id, (_, _, page, known, provenance) in requests.items():
+            index = int(custom_id.split("-")[1])
+            summaries[index] = self._summary(jobs[index], results.get(custom_id), page, known, provenance, requery=False)
+        return summaries
+
+    def summarize_packed(self, jobs) -> list:
+        """
+        Summarize jobs several to a request: the jobs the LLM is needed for are packed up to
+        pack_size at a time & pack_token_cap tokens of descriptions, so prompt.txt is sent once
+        per pack rather than once per job. The summaries are returned in the order of jobs,
+        None for those that failed
+        """
+        summaries = [None] * len(jobs)
+        requests = {}
+        for index, job in enumerate(jobs):
+            summaries[index], request = self._prepare(job)
+            if request is not None:
+                requests[index] = request
+
+        pack, tokens = [], 0
+        for index, request in requests.items():
+            size = count_tokens(request[0], self.compactor.encoding)
+            if pack and (len(pack) == self.pack_size or tokens + size > self.pack_token_cap):
+                self._query_pack(jobs, requests, pack, summaries)
+                pack, tokens = [], 0
+            pack.append(index)
+            tokens += size
+        if pack:
+            self._query_pack(jobs, requests, pack, summaries)
+        return summaries
+
+    def _query_pack(self, jobs, requests, pack, summaries):
+        """Send one pack, a failed request or the jobs missing from a partial answer are split in two & sent again"""
+        if len(pack) == 1:
+            text, schema, page, known, provenance = requests[pack[0]]
+            summaries[pack[0]] = self._summary(jobs[pack[0]], self._openai_structured_query(text, schema), page, known, provenance)
+            return
+
+        text = "".join(f"JOB {index}\n{requests[index][0]}\n\n" for index in pack)
+        answer = self._openai_structured_query(text, self._pack_schema(), instructions=self.get_prompt() + self.PACK_PROMPT)
+
+        answered = {}
+        for fields in (answer or {}).get("jobs", []):
+            index = fields.pop("index", None)
+            if index in pack and index not in answered:
+                answered[index] = fields
+        for index, fields in answered.items():
+            _, _, page, known, provenance = requests[index]
+            summaries[index] = self._summary(jobs[index], fields, page, known, provenance)
+
+        missing = [index for index in pack if index not in answered]
+        if missing:
+            logging.warning(f"Packed request answered {len(answered)} of {len(pack)} jobs, retrying the other {len(missing)}")
+            middle = (len(missing) + 1) // 2
+            for half in (missing[:middle], missing[middle:]):
+                if half:
+                    self._query_pack(jobs, requests, half, summaries)
+
+    def _pack_schema(self):
+        """The job schema as an array of jobs each with its index"""
+        item = json.loads(json.dumps(self.job_schema))["format"]["schema"]
+        item["properties"] = {"index": {"type": "integer"}, **item["properties"]}
+        item["required"] = ["index", *item["required"]]
+        return {
+            "format": {
+                "name": "Job_Pack_Summarizer",
+                "type": "json_schema",
+                "strict": True,
+                "schema": {
+                    "type": "object",
+                    "properties": {"jobs": {"type": "array", "items": item}},
+                    "required": ["jobs"],
+                    "additionalProperties": False
+                },
+            }
+        }
+
+    def _prepare(self, job: Job):
+        """
+        Everything before the LLM call: the local fields, cleaning & compaction. Returns
+        (Job, None) when the fields found locally are enough or (None, None) if the page
+        can't be cleaned, otherwise (None, (text, schema, page, known, provenance)) for the query
+        """
+        # the raw page is kept as downloaded, decoded once here with its charset
+        page = decode_body(job.raw_description)
+        known, provenance = self._local_fields(job, page)
+        if known:
+            logging.info(f"Found {', '.join(known)} on the page, not asking the LLM for them")
+
+        if self._complete(known):
+            logging.info("All fields found on the page, skipping the LLM")
+            return self._job(job, known, provenance), None
+
         # clean up the description using trafilatura
         # and then pass it to the OpenAI API
         # to get the summary. Reduce the number of tokens
         # by removing the HTML tags and other junk.
         logging.info("Cleaning up the description using trafilatura...")
-        logging.info(f"Raw description size: {len(job.raw_description)}")
+        logging.info(f"Raw description size: {len(page or '')}")
         
 
-        # Use trafilatura to clean up the description
-        clean_up_description = trafilatura.extract(job.raw_description)
+        # Use trafilatura to clean up the description, unless the CPU stage already has
+        clean_up_description = job.cleaned_description or trafilatura.extract(page)
         if clean_up_description is None:
             logging.error("Error cleaning up the description using trafilatura.")
-            return None
+            return None, None
         
         logging.info(f"Cleaned up description size: {len(clean_up_description)}")
-        
-        parsed_summary = self._openai_structured_query(clean_up_description)
 
+        # the cleaned text rather than the raw page, which has other jobs' salaries in the sidebar
+        self._local_salary(clean_up_description, known, provenance)
+        if self._complete(known):
+            logging.info("All fields found locally, skipping the LLM")
+            return self._job(job, known, provenance), None
+
+        clean_up_description, _, _ = self.compactor.compact(clean_up_description)
+
+        # every request sends the whole schema, it comes before the messages so a schema cut
+        # down per job would change the prefix OpenAI caches. The fields wanted go with the job text
+        context = "\n\n" + self.WANTED_PROMPT + ", ".join(self._wanted(job, known))
+        # what we already know still matters for the fit score (e.g. the salary)
+        if known:
+            context += "\n\nThese fields have already been taken from the page, use them when scoring the fit:\n" + json.dumps(known)
+
+        return None, (clean_up_description + context, self.job_schema, page, known, provenance)
+
+    def _wanted(self, job: Job, known) -> list:
+        """The fields the LLM is asked for: what's missing, plus the fields only it can write"""
+        return [name for name in self.job_schema["format"]["schema"]["properties"]
+                if name in self.LLM_FIELDS or (name in LOCAL_FIELDS and name not in known) or (name == "id" and job.id is None)]
+
+    def _summary(self, job: Job, parsed_summary, page, known, provenance, requery=True):
+        """The Job from the LLM's answer & the local fields, None if there was no answer"""
         if parsed_summary is not None:
-            # Create a Job object from the parsed JSON
-            # OpenAI wont return the raw_description, so we need to add it manually
-            # to the Job object. Don't want to incur the cost of those tokens!
+            # the schema has every field, keep only those the LLM was asked for
+            wanted = self._wanted(job, known)
+            parsed_summary = {name: value for name, value in parsed_summary.items() if name in wanted}
+            salary_upper = known.get("salary_upper", parsed_summary.get("salary_upper", None))
+
+            if requery and self.retry_on_no_salary and not salary_upper:
+                parsed_summary.update(self._salary_requery(job, page, {**parsed_summary, **known}))
+
+            for name in parsed_summary:
+                provenance.setdefault(name, "llm")
+            return self._job(job, {**parsed_summary, **known}, provenance)
 
-            parsed_id = parsed_summary.get("id","Unkown ID")
-            job_id = job.id if job.id is not None else parsed_id
-
-            salary_upper = parsed_summary.get("salary_upper", None)
-
-            if self.retry_on_no_salary:
-
-                if salary_upper is None or salary_upper == 0:
-                    # need to requery OPENAI with the   raw_description - so it has all the information 
-                    logging.info("Requerying OpenAI with the raw description... EXPENSIVE!")
-                    parsed_summary = self._openai_structured_query(job.raw_description)
-                    if parsed_summary is None:
-                        logging.error("Error requerying OpenAI with the raw description.")
-                        return None
-
-            return Job(
-                id=job_id,
-                source=job.source,
-                title=parsed_summary.get("title", "Unknown Title"),
-                company=parsed_summary.get("company", "Unknown Company"),
-                location=parsed_summary.get("location", "Unknown Location"),
-                date=parsed_summary.get("date", "Unknown Date"),
-                url=job.url,
-                salary=parsed_summary.get("salary", "Unknown Salary"),
-                salary_lower=parsed_summary.get("salary_lower", None),
-                salary_upper=parsed_summary.get("salary_upper", None),
-                description=parsed_summary.get("description", ""),
-                summary=parsed_summary.get("summary", ""),
-                fit=parsed_summary.get("fit", None),
-                raw_description=job.raw_description)
+    def _salary_requery(self, job: Job, page, fields) -> dict:
+        """
+        Second pass for a salary the description didn't have: ask for just the salary fields
+        given the snippets of the raw page that mention pay, a few hundred tokens rather than the whole page
+        """
+        snippets = salary_snippets(page, self.salary_snippet_chars, self.salary_snippets)
+        if not snippets:
+            logging.info("Nothing on the page mentions pay, not requerying OpenAI for the salary")
+            return {}
+
+        job_fields = {name: fields[name] for name in ("title", "company", "location") if fields.get(name)}
+        text = "The job: " + json.dumps(job_fields) + "\n\nSnippets:\n" + "\n...\n".join(snippets)
+        logging.info(f"Requerying OpenAI for the salary with {len(snippets)} snippets ({len(text)} characters)")
+        found = self._openai_structured_query(text, self._schema_for(self.SALARY_FIELDS), instructions=self.SALARY_PROMPT)
+        if found is None:
+            logging.error("Error requerying OpenAI for the salary.")
+            return {}
+        return {name: value for name, value in found.items() if value}
+
+    def _job(self, job: Job, fields, provenance) -> Job:
+        """
+        Create a Job object from the local & LLM fields
+        OpenAI wont return the raw_description, so we need to add it manually
+        to the Job object. Don't want to incur the cost of those tokens!
+        """
+        return Job(
+            id=job.id if job.id is not None else fields.get("id", "Unkown ID"),
+            source=job.source,
+            title=fields.get("title", "Unknown Title"),
+            company=fields.get("company", "Unknown Company"),
+            location=fields.get("location", "Unknown Location"),
+            date=fields.get("date", "Unknown Date"),
+            url=job.url,
+            salary=fields.get("salary", "Unknown Salary"),
+            salary_lower=fields.get("salary_lower", None),
+            salary_upper=fields.get("salary_upper", None),
+            description=fields.get("description", ""),
+            summary=fields.get("summary", ""),
+            fit=fields.get("fit", None),
+            raw_description=job.raw_description,
+            provenance=provenance)
 
 
 #    def summarize(self, source, url, raw_description):
@@ -337,15 +601,41 @@ class OpenAIStructuredSummarizer(OpenAISummarizer):
 #        return None    
 
 
+    def _request_body(self, text, schema=None, instructions=None) -> dict:
+        """
+        The Responses API request for text, sent on its own or as a line of a batch. The static
+        parts come first, the schema, system message & instructions (prompt.txt by default),
+        then the job text in a message of its own, so every request with the same instructions
+        & schema starts with the same prefix & OpenAI's prompt cache can serve it. The prompt
+        cache key routes those requests to the same cache
+        """
+        instructions = self.get_prompt() if instructions is None else instructions
+        schema = schema or self.job_schema
+        prefix = hashlib.sha256((instructions + json.dumps(schema, sort_keys=True)).encode("utf-8")).hexdigest()
+        return {
+            "model": self.get_model(),
+            "input": [
+                {"role": "system", "content": "You are a computer programmer & you will follow the instructions carefully."},
+                {"role": "user", "content": instructions},
+                {"role": "user", "content": str(text)}
+                ],
+            "text": schema,
+            "prompt_cache_key": f"job-summary-{prefix[:16]}"
+            }
+
     @backoff.on_exception(backoff.expo, (openai.OpenAIError, openai.APIError, openai.RateLimitError, openai.Timeout, BaseException), max_time=600, max_tries=60, jitter=backoff.full_jitter)
-    def _openai_structured_query(self, raw_description):
+    def _openai_structured_query(self, raw_description, schema=None, instructions=None):
+        # wait for the tokens per minute budget before taking a slot in the concurrency window
+        llm_budgets.get("llm:openai").acquire(super().get_prompt() if instructions is None else instructions, str(raw_description))
+        controller = controllers.get("llm:openai")
+        controller.acquire()
+        status = None
         try:
 
             
 
             logging.debug(f"Input string: {super().get_prompt()}")
 
-            raw_input=""
 
  #           if url is None:
  #               raw_input = super().get_prompt() + str(raw_description)
@@ -353,25 +643,21 @@ class OpenAIStructuredSummarizer(OpenAISummarizer):
  #               print("Using URL based prompt to reduce tokens, let the LLM go out on the web")
  #               raw_input = super().get_prompt() + str(url)
 
-            raw_input = super().get_prompt() + str(raw_description)
- 
-            openai.api_key = super().get_api_key()
-
-            prompt =  {"role": "user", "content": raw_input}
-
-            response = openai.responses.create(
-                model=super().get_model(),
-                input=[
-                    {"role": "system", "content": "You are a computer programmer & you will follow the instructions carefully."},
-                    prompt                   
-                    ],
-                text=self.job_schema
-                )
+            # instructions replaces prompt.txt for the narrow queries e.g. the salary re-query
+            body = self._request_body(raw_description, schema, instructions)
+            # sent as an extra body field, the pinned SDK doesn't take prompt_cache_key as an argument
+            cache_key = body.pop("prompt_cache_key")
+            response = self.client.responses.create(**body, extra_body={"prompt_cache_key": cache_key})
+            status = 200
+            prompt_cache.record_openai("llm:openai", response.usage)
             
         except openai.OpenAIError as e:
+            status = status_from_exception(e)
             logging.error("Error querying OpenAI: %s",e)
             # logging.error(f"Model: {model} Temperature: {temp} Max Output Tokens: {max_tokens} Prompt: {prompt}")
             return None
+        finally:
+            controller.release(status)
 
         json_response = json.loads(response.output_text)
         return json_response       
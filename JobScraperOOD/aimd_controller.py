@@ -0,0 +1,162 @@
+import asyncio
+import logging
+import threading
+import time
+
+
+# Default AIMD settings
+initial_window = 2
+min_window = 1
+max_window = 5
+
+# Status codes that mean the endpoint is over capacity
+OVERLOAD_STATUS_CODES = (429, 503)
+
+
+class AIMDController:
+    """
+    Adaptive concurrency limit using additive increase / multiplicative decrease.
+
+    The window is the number of requests allowed in flight. Each successful response
+    grows it by roughly one request per window's worth of successes, a 429/503 halves it.
+    Overload signals arriving within `cooldown` seconds of a decrease are treated as
+    the same event, so a burst of 429s from one window only halves it once.
+    """
+
+    def __init__(self, name, initial=initial_window, minimum=min_window, maximum=max_window, decrease=0.5, cooldown=1.0):
+        self.name = name
+        self.minimum = max(1, int(minimum))
+        self.maximum = max(self.minimum, int(maximum))
+        self.window = float(min(max(initial, self.minimum), self.maximum))
+        self.decrease = decrease
+        self.cooldown = cooldown
+
+        self.in_flight = 0
+        self.successes = 0
+        self.overloads = 0
+        self._last_decrease = 0.0
+        self._condition = threading.Condition()
+
+    @property
+    def limit(self) -> int:
+        return int(self.window)
+
+    def try_acquire(self) -> bool:
+        with self._condition:
+            if self.in_flight < self.limit:
+                self.in_flight += 1
+                return True
+            return False
+
+    def acquire(self):
+        """Block until there is room in the window"""
+        with self._condition:
+            while self.in_flight >= self.limit:
+                self._condition.wait()
+            self.in_flight += 1
+
+    async def acquire_async(self):
+        """Asyncio version of acquire. The controller is shared between threads so poll rather than wait"""
+        while not self.try_acquire():
+            await asyncio.sleep(0.01)
+
+    def release(self, status=None):
+        """
+        Give the slot back & feed the outcome into the window.
+        status is the HTTP status of the response, None if there was no response (e.g. a timeout)
+        """
+        with self._condition:
+            self.in_flight -= 1
+
+            if status in OVERLOAD_STATUS_CODES:
+                self.overloads += 1
+                now = time.monotonic()
+                if now - self._last_decrease >= self.cooldown:
+                    self._last_decrease = now
+                    self.window = max(self.minimum, self.window * self.decrease)
+                    logging.info(f"{self.name}: status {status}, concurrency window down to {self.limit}")
+            elif status is not None and 200 <= status < 400:
+                self.successes += 1
+                previous = self.limit
+                self.window = min(self.maximum, self.window + 1.0 / self.window)
+                if self.limit != previous:
+                    logging.debug(f"{self.name}: concurrency window up to {self.limit}")
+
+            self._condition.notify_all()
+
+    def reconfigure(self, initial, minimum, maximum):
+        """New limits for the window, which restarts at initial if nothing has been sent yet"""
+        with self._condition:
+            self.minimum = max(1, int(minimum))
+            self.maximum = max(self.minimum, int(maximum))
+            if self.successes == 0 and self.overloads == 0 and self.in_flight == 0:
+                self.window = float(initial)
+            self.window = float(min(max(self.window, self.minimum), self.maximum))
+            self._condition.notify_all()
+
+    def metrics(self) -> dict:
+        with self._condition:
+            return {
+                "window": self.limit,
+                "in_flight": self.in_flight,
+                "successes": self.successes,
+                "overloads": self.overloads,
+            }
+
+
+def status_from_exception(e):
+    """HTTP status carried by an exception from requests, httpx or the LLM SDKs, if any"""
+    status = getattr(e, "status_code", None)
+    if status is None and getattr(e, "response", None) is not None:
+        status = getattr(e.response, "status_code", None)
+    return status
+
+
+class ControllerRegistry:
+    """One controller per source (LinkedIn, Dice...) or LLM provider (llm:openai...)"""
+
+    def __init__(self):
+        self.initial = initial_window
+        self.minimum = min_window
+        self.maximum = max_window
+        self._controllers = {}
+        # the initial & maximum each controller was asked for, e.g. a fetcher's CONCURRENCY
+        self._overrides = {}
+        self._lock = threading.Lock()
+
+    def configure(self, config):
+        """
+        Load the defaults from the [Concurrency] section. MAX_WINDOW falls back to the
+        MAX_WORKERS setting in [DEFAULT]. Controllers created before, e.g. by the scrapers'
+        fetchers, take the new settings too
+        """
+        section = config["Concurrency"] if config.has_section("Concurrency") else config["DEFAULT"]
+        self.initial = section.getint("INITIAL_WINDOW", fallback=self.initial)
+        self.minimum = section.getint("MIN_WINDOW", fallback=self.minimum)
+        self.maximum = section.getint("MAX_WINDOW", fallback=section.getint("MAX_WORKERS", fallback=self.maximum))
+        logging.info(f"Concurrency windows: initial {self.initial}, min {self.minimum}, max {self.maximum}")
+
+        with self._lock:
+            for name, controller in self._controllers.items():
+                initial, maximum = self._overrides[name]
+                controller.reconfigure(initial or self.initial, self.minimum, maximum or self.maximum)
+
+    def get(self, name, initial=None, maximum=None) -> AIMDController:
+        with self._lock:
+            if name not in self._controllers:
+                self._overrides[name] = (initial, maximum)
+                self._controllers[name] = AIMDController(
+                    name,
+                    initial=initial or self.initial,
+                    minimum=self.minimum,
+                    maximum=maximum or self.maximum)
+            return self._controllers[name]
+
+    def metrics(self) -> dict:
+        with self._lock:
+            controllers = dict(self._controllers)
+        return {name: controller.metrics() for name, controller in controllers.items()}
+
+
+# The shared controllers for the whole process
+controllers = ControllerRegistry()
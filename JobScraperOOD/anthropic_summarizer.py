@@ -1,6 +1,7 @@
 
 from abc import ABC, abstractmethod
 import logging
+import re
 import backoff
 from job_scraper import Job
 from job_scraper import GenAISummarizer
@@ -9,6 +10,11 @@ from job_scraper import GenAISummarizer
 import json
 import anthropic
 
+from aimd_controller import controllers, status_from_exception
+from llm_budget import llm_budgets
+from llm_clients import llm_clients, prompt_cache
+from compactor import DescriptionCompactor
+
 
 class AnthropicSummarizer(GenAISummarizer):
     def __init__(self, configParser, prompt_file):
@@ -22,6 +28,10 @@ class AnthropicSummarizer(GenAISummarizer):
         logging.debug(f"Prompt loaded successfully from {prompt_file}")
         
         self.config = configParser
+        # dedupe, drop the boilerplate & trim the description to TOKEN_BUDGET before it is sent
+        self.compactor = DescriptionCompactor.from_config(configParser["Anthropic"])
+        # one keep-alive client for every job rather than a new connection per request
+        self.client = llm_clients.anthropic(self.__api_key)
     
         # Open the prompt file and read its contents
         self.__prompt = None
@@ -43,7 +53,7 @@ class AnthropicSummarizer(GenAISummarizer):
     def get_model(self):
         return self.__model
     
-    def summarize(self, raw_description: str) -> Job:
+    def summarize(self, job: Job) -> Job:
         
         """Summarizes the given text using the Anthropic API.
         The GenAI needs to return a JSON structure which will be used to create the Job object.
@@ -63,14 +73,14 @@ class AnthropicSummarizer(GenAISummarizer):
 
 
         Args:
-            text (str): The text to summarize.
+            job (Job): The scraped job, its raw or cleaned description is summarized.
         
         Returns:
             Job: An object created by the information returned from the GenAI.
         """
         logging.debug("Summarizing text using Anthropic API...")
     
-        summary = self._query_anthropic( str(raw_description))
+        summary = self._query_anthropic(self.compactor.compact_page(job))
         if summary is None:
             logging.error("Failed to summarize text using Anthropic API.")
             return None
@@ -105,29 +115,35 @@ class AnthropicSummarizer(GenAISummarizer):
             description=parsed_summary.get("description", ""),
             summary=parsed_summary.get("summary", ""),
             fit=parsed_summary.get("fit", None),
-            raw_description=raw_description)
+            raw_description=job.raw_description)
     
 
 
     @backoff.on_exception(backoff.expo, (anthropic.AnthropicError, anthropic.APIConnectionError, BaseException), max_tries=20)
     def _query_anthropic(self, raw_description ):
+        # wait for the tokens per minute budget before taking a slot in the concurrency window
+        llm_budgets.get("llm:anthropic").acquire(self.__prompt, raw_description)
+        controller = controllers.get("llm:anthropic")
+        controller.acquire()
+        status = None
         try:
 
             logging.debug(f"Querying Anthropic with model {self.__model}")
 
-            raw_input = self.__prompt + raw_description
-
-            client = anthropic.Anthropic(
-                api_key=self.get_api_key()
-            )
-
-            message = client.messages.create(
+            # the prompt is the same for every job, marked as a cache breakpoint so Anthropic
+            # serves it from the prompt cache, with the job text after it
+            message = self.client.messages.create(
                 model="claude-3-7-sonnet-20250219",
                 max_tokens=1024,
                 messages=[
-                    {"role": "user", "content": raw_input}
+                    {"role": "user", "content": [
+                        {"type": "text", "text": self.__prompt, "cache_control": {"type": "ephemeral"}},
+                        {"type": "text", "text": raw_description}
+                        ]}
                 ]
             )
+            status = 200
+            prompt_cache.record_anthropic("llm:anthropic", message.usage)
 
                # Debug the response structure
             logging.debug(f"Anthropic response: {message}")
@@ -154,9 +170,12 @@ class AnthropicSummarizer(GenAISummarizer):
             return json_response
         
         except anthropic.AnthropicError as e:
+            status = status_from_exception(e)
             logging.error("Error querying Anthropic: %s",e)
             # logging.error(f"Model: {model} Temperature: {temp} Max Output Tokens: {max_tokens} Prompt: {prompt}")
             return None
+        finally:
+            controller.release(status)
 
 
 
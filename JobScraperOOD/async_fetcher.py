@@ -0,0 +1,192 @@
+import asyncio
+import logging
+
+import httpx
+
+from rate_limiter import rate_limiter
+from aimd_controller import controllers
+from singleflight import fetch_flight
+from page_encoding import PageBody, content_type_charset
+from http_session import RETRY_STATUS_CODES
+
+
+# Default async fetch settings
+fetch_concurrency = 10
+fetch_timeout = 15
+fetch_max_retries = 3
+
+DEFAULT_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36",
+    "Accept-Language": "en-US,en;q=0.9",
+}
+
+
+class AsyncFetcher:
+    """
+    AsyncFetcher downloads a batch of pages concurrently over a single keep-alive
+    httpx connection pool. The number of requests in flight is bounded by the
+    source's AIMD controller, which adapts between 1 and the concurrency limit,
+    so the wall time of a batch grows with len(urls) / concurrency rather than
+    with len(urls).
+
+    Use it as an async context manager inside a running event loop, or call
+    fetch_all_sync() from blocking code (e.g. a scraper thread).
+    """
+
+    def __init__(self, name="fetch", concurrency=fetch_concurrency, timeout=fetch_timeout, max_retries=fetch_max_retries, headers=None, auth=None, cache=None):
+        self.name = name
+        self.cache = cache
+        self.concurrency = max(1, int(concurrency))
+        self.timeout = float(timeout)
+        self.max_retries = max(1, int(max_retries))
+        self.headers = headers or DEFAULT_HEADERS
+        self.auth = auth
+
+        self._client = None
+        # start at the configured concurrency & let 429/503s pull the window down
+        self.controller = controllers.get(name, initial=self.concurrency, maximum=self.concurrency)
+
+    @classmethod
+    def from_config(cls, config_section, name="fetch", auth=None, cache=None):
+        """Build a fetcher from a config section e.g. config["LinkedIn"]"""
+        return cls(
+            name=name,
+            cache=cache,
+            concurrency=config_section.getint("FETCH_CONCURRENCY", fallback=fetch_concurrency),
+            timeout=config_section.getfloat("FETCH_TIMEOUT", fallback=fetch_timeout),
+            max_retries=config_section.getint("FETCH_MAX_RETRIES", fallback=fetch_max_retries),
+            auth=auth)
+
+    async def __aenter__(self):
+        limits = httpx.Limits(
+            max_connections=self.concurrency,
+            max_keepalive_connections=self.concurrency,
+            keepalive_expiry=30)
+
+        self._client = httpx.AsyncClient(
+            headers=self.headers,
+            auth=self.auth,
+            timeout=httpx.Timeout(self.timeout),
+            limits=limits,
+            follow_redirects=True)
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self._client.aclose()
+        self._client = None
+
+    async def fetch(self, url, use_cache=True) -> PageBody:
+        """
+        Fetch a single page, returning the body or None on failure.
+        Cacheable (job detail) pages are coalesced with any other fetch of the same posting
+        """
+        if not use_cache:
+            return await self._fetch(url, use_cache)
+        return await fetch_flight.do_async(url, lambda: self._fetch(url, use_cache))
+
+    async def _fetch(self, url, use_cache) -> PageBody:
+        cache = self.cache if use_cache else None
+        entry, headers = None, {}
+        if cache is not None:
+            cached, entry, headers = cache.begin(url)
+            if cached is not None:
+                return PageBody.from_response(cached)
+
+        for attempt in range(1, self.max_retries + 1):
+            await self.controller.acquire_async()
+            await rate_limiter.acquire_async(url)
+            status = None
+            try:
+                response = await self._client.get(url, headers=headers)
+                status = response.status_code
+            except httpx.TimeoutException:
+                logging.warning("Timeout fetching %s (attempt %s/%s)", url, attempt, self.max_retries)
+                continue
+            except httpx.HTTPError as e:
+                logging.error("Error fetching %s: %s", url, e)
+                return None
+            finally:
+                self.controller.release(status)
+
+            if cache is not None:
+                response = cache.finish(url, entry, response)
+                status = response.status_code
+
+            if status == 200:
+                return PageBody.from_response(response)
+
+            if status == 429:
+                # the next acquire waits out the Retry-After for the whole host
+                rate_limiter.penalize(url, response.headers.get("Retry-After"))
+                continue
+
+            if status in RETRY_STATUS_CODES:
+                logging.warning("Status %s fetching %s (attempt %s/%s)", status, url, attempt, self.max_retries)
+                await asyncio.sleep(min(2 ** attempt, 10))
+                continue
+
+            logging.error("Failed with status code: %s", status)
+            return None
+
+        logging.error("Giving up on %s after %s attempts", url, self.max_retries)
+        return None
+
+    async def stream(self, url):
+        """
+        Async generator yielding the body of url in chunks as they arrive, for callers that
+        parse while the page downloads. Each chunk is a PageBody carrying the charset of the
+        Content-Type. Not cached or coalesced. Retries like fetch until the first chunk has
+        been handed out, a failure after that ends the stream early
+        """
+        for attempt in range(1, self.max_retries + 1):
+            await self.controller.acquire_async()
+            await rate_limiter.acquire_async(url)
+            status = None
+            started = False
+            try:
+                async with self._client.stream("GET", url) as response:
+                    status = response.status_code
+                    if status == 200:
+                        charset = content_type_charset(response.headers.get("Content-Type"))
+                        async for chunk in response.aiter_bytes():
+                            started = True
+                            yield PageBody(chunk, charset)
+                        return
+                    retry_after = response.headers.get("Retry-After")
+            except httpx.TimeoutException:
+                if started:
+                    logging.error("Timeout part way through %s", url)
+                    return
+                logging.warning("Timeout fetching %s (attempt %s/%s)", url, attempt, self.max_retries)
+                continue
+            except httpx.HTTPError as e:
+                logging.error("Error fetching %s: %s", url, e)
+                return
+            finally:
+                self.controller.release(status)
+
+            if status == 429:
+                rate_limiter.penalize(url, retry_after)
+                continue
+
+            if status in RETRY_STATUS_CODES:
+                logging.warning("Status %s fetching %s (attempt %s/%s)", status, url, attempt, self.max_retries)
+                await asyncio.sleep(min(2 ** attempt, 10))
+                continue
+
+            logging.error("Failed with status code: %s", status)
+            return
+
+        logging.error("Giving up on %s after %s attempts", url, self.max_retries)
+
+    async def fetch_all(self, urls) -> list:
+        """Fetch all the urls concurrently. Results are returned in the same order as the urls"""
+        return await asyncio.gather(*(self.fetch(url) for url in urls))
+
+    def fetch_all_sync(self, urls) -> list:
+        """Blocking wrapper around fetch_all for callers that are not running an event loop"""
+        async def _run():
+            async with self:
+                return await self.fetch_all(urls)
+
+        return asyncio.run(_run())
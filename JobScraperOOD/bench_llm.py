@@ -0,0 +1,214 @@
+import configparser
+import json
+import logging
+import os
+import ssl
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from argparse import ArgumentParser
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import openai
+
+from job_scraper import Job
+from llm_clients import llm_clients, prompt_cache
+
+
+# The LinkedIn job page & prompt checked in at the top of the repo
+default_job = "../job.txt"
+default_prompt = "../prompt.txt"
+
+# OpenAI caches a prompt prefix of at least 1024 tokens, in steps of 128
+cache_min_tokens = 1024
+cache_step_tokens = 128
+
+
+def tokens(text) -> int:
+    return len(text) // 4
+
+
+class StandInAPI:
+    """
+    A local HTTPS stand-in for the Responses API. Each new connection waits two round trips
+    (the TCP & TLS 1.3 handshakes) & each request one, so the handshakes a client opens show
+    up in the timings. Usage reports cached tokens the way OpenAI's prompt cache would: the
+    request's input before the job text, at least cache_min_tokens & rounded down to a step,
+    once the same prefix has been seen under the same prompt_cache_key.
+    """
+
+    def __init__(self, rtt, min_tokens=cache_min_tokens):
+        self.rtt = rtt
+        self.min_tokens = min_tokens
+        self.connections = 0
+        self.requests = 0
+        self._prefixes = set()
+        self._lock = threading.Lock()
+        self._directory = tempfile.TemporaryDirectory()
+        cert, key = self._certificate()
+
+        stand_in = self
+
+        class Server(ThreadingHTTPServer):
+            daemon_threads = True
+
+            def get_request(self):
+                connection, address = super().get_request()
+                with stand_in._lock:
+                    stand_in.connections += 1
+                return connection, address
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def setup(self):
+                time.sleep(2 * stand_in.rtt)
+                super().setup()
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+                time.sleep(stand_in.rtt)
+                response = json.dumps(stand_in.respond(body)).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(response)))
+                self.end_headers()
+                self.wfile.write(response)
+
+            def log_message(self, format, *args):
+                pass
+
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        context.load_cert_chain(cert, key)
+        self._server = Server(("127.0.0.1", 0), Handler)
+        self._server.socket = context.wrap_socket(self._server.socket, server_side=True, do_handshake_on_connect=False)
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        # the SDK clients trust the stand-in's self-signed certificate
+        os.environ["SSL_CERT_FILE"] = cert
+
+    def _certificate(self):
+        cert = os.path.join(self._directory.name, "cert.pem")
+        key = os.path.join(self._directory.name, "key.pem")
+        subprocess.run(["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-keyout", key, "-out", cert,
+                        "-days", "1", "-subj", "/CN=127.0.0.1", "-addext", "subjectAltName=IP:127.0.0.1"],
+                       check=True, capture_output=True)
+        return cert, key
+
+    @property
+    def url(self):
+        return f"https://127.0.0.1:{self._server.server_address[1]}/v1"
+
+    def respond(self, body) -> dict:
+        messages = body["input"]
+        prefix = json.dumps([body.get("prompt_cache_key"), body.get("text"), messages[:-1]])
+        input_tokens = tokens(json.dumps(body))
+        prefix_tokens = tokens(prefix)
+
+        with self._lock:
+            self.requests += 1
+            cached = prefix in self._prefixes
+            self._prefixes.add(prefix)
+        cached_tokens = 0
+        if cached and prefix_tokens >= self.min_tokens:
+            cached_tokens = prefix_tokens - prefix_tokens % cache_step_tokens
+
+        schema = (body.get("text") or {}).get("format", {}).get("schema", {"properties": {}})
+        answer = {name: 0 if "integer" in str(spec.get("type")) else f"{name} {self.requests}"
+                  for name, spec in schema["properties"].items()}
+        return {
+            "id": f"resp_{self.requests}", "object": "response", "created_at": int(time.time()),
+            "model": body.get("model"), "status": "completed", "parallel_tool_calls": True, "tool_choice": "auto", "tools": [],
+            "output": [{"type": "message", "id": f"msg_{self.requests}", "role": "assistant", "status": "completed",
+                        "content": [{"type": "output_text", "text": json.dumps(answer), "annotations": []}]}],
+            "usage": {"input_tokens": input_tokens, "input_tokens_details": {"cached_tokens": cached_tokens},
+                      "output_tokens": 50, "output_tokens_details": {"reasoning_tokens": 0},
+                      "total_tokens": input_tokens + 50}}
+
+    def close(self):
+        self._server.shutdown()
+        self._server.server_close()
+        self._directory.cleanup()
+
+
+def bench_clients(base_url, api_key, model, rounds, stand_in=None):
+    """Milliseconds per request & connections opened, with a client per request & with the long-lived client"""
+    def ask(client):
+        client.responses.create(model=model, input="Reply with OK", max_output_tokens=16)
+
+    results = {}
+    for name in ("client per request", "long-lived client"):
+        opened = stand_in.connections if stand_in else 0
+        start = time.perf_counter()
+        for _ in range(rounds):
+            if name == "client per request":
+                with openai.OpenAI(api_key=api_key, base_url=base_url) as client:
+                    ask(client)
+            else:
+                ask(llm_clients.openai(api_key, base_url))
+        elapsed = (time.perf_counter() - start) / rounds * 1000
+        results[name] = (elapsed, stand_in.connections - opened if stand_in else None)
+    return results
+
+
+def bench_summaries(base_url, api_key, model, prompt_file, page, count):
+    """Summarize count copies of the job page, each made distinct, through the structured summarizer"""
+    from ai_summarizer import OpenAIStructuredSummarizer
+
+    config = configparser.RawConfigParser()
+    config.read_dict({"OpenAI": {"OPENAI_API_KEY": api_key, "MODEL": model, "BASE_URL": base_url}})
+    summarizer = OpenAIStructuredSummarizer(config, prompt_file)
+
+    start = time.perf_counter()
+    summaries = [summarizer.summarize(Job(id=str(index), url=f"https://example.com/jobs/{index}",
+                                          raw_description=page + f"<p>Job reference {index}</p>"))
+                 for index in range(count)]
+    elapsed = time.perf_counter() - start
+
+    body = summarizer._request_body("", summarizer.job_schema)
+    static_tokens = tokens(json.dumps([body["text"], body["input"][:-1]]))
+    return elapsed, sum(1 for summary in summaries if summary is not None), static_tokens
+
+
+def main():
+    parser = ArgumentParser(description="Time long-lived LLM clients against a client per request & report the prompt cache hit rate")
+    parser.add_argument("--job", default=default_job, help="saved job page")
+    parser.add_argument("--prompt", default=default_prompt, help="summary prompt")
+    parser.add_argument("--rounds", type=int, default=20, help="requests for each client setup")
+    parser.add_argument("--jobs", type=int, default=20, help="jobs to summarize")
+    parser.add_argument("--rtt", type=float, default=20, help="simulated round trip in ms to the stand-in")
+    parser.add_argument("--cache-min-tokens", type=int, default=cache_min_tokens, help="shortest prefix the stand-in caches")
+    parser.add_argument("--base-url", help="a real OpenAI compatible endpoint rather than the local stand-in")
+    parser.add_argument("--api-key", default="key")
+    parser.add_argument("--model", default="gpt-4.1-mini")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING, format="%(asctime)s - %(levelname)s - %(message)s")
+
+    with open(args.job, "r", encoding="utf-8") as file:
+        page = file.read().split("@@@@ Start Job Description @@@@")[-1]
+
+    stand_in = None if args.base_url else StandInAPI(args.rtt / 1000, args.cache_min_tokens)
+    base_url = args.base_url or stand_in.url
+    try:
+        for name, (elapsed, connections) in bench_clients(base_url, args.api_key, args.model, args.rounds, stand_in).items():
+            opened = f"{connections} connections" if connections is not None else ""
+            print(f"{name:20} {elapsed:8.1f} ms/request  {opened}")
+
+        elapsed, summarized, static_tokens = bench_summaries(base_url, args.api_key, args.model, args.prompt, page, args.jobs)
+        print(f"summarized {summarized}/{args.jobs} jobs in {elapsed:.1f}s, static prefix ~{static_tokens} tokens")
+        if static_tokens < args.cache_min_tokens:
+            print(f"the static prefix is under the {args.cache_min_tokens} tokens OpenAI needs before it caches a prompt")
+        for name, stats in prompt_cache.metrics().items():
+            print(f"{name:20} {stats['cached_tokens']}/{stats['input_tokens']} input tokens cached, hit rate {stats['hit_rate']:.0%}")
+    finally:
+        llm_clients.close()
+        if stand_in is not None:
+            stand_in.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
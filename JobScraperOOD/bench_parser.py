@@ -0,0 +1,63 @@
+import sys
+import time
+import logging
+
+from argparse import ArgumentParser
+
+from html_parser import HtmlParser, BACKENDS
+from extraction_spec import load_specs, spec_file
+
+
+# The LinkedIn search page checked in at the top of the repo
+default_page = "../page.html"
+
+
+def bench(backend, content, spec, rounds):
+    """
+    Average milliseconds to find the cards & to find them and extract every field,
+    plus the extracted fields of the last round
+    """
+    parser = HtmlParser(backend)
+    spec.extract_all(parser, content)
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        spec.cards(parser, content)
+    cards_time = (time.perf_counter() - start) / rounds * 1000
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        cards = spec.extract_all(parser, content)
+    fields_time = (time.perf_counter() - start) / rounds * 1000
+
+    return cards_time, fields_time, cards
+
+
+def main():
+    parser = ArgumentParser(description="Time the HTML parser backends & extraction specs on a saved search page")
+    parser.add_argument("--page", default=default_page, help="saved search results page")
+    parser.add_argument("--spec-file", default=spec_file, help="extraction spec file")
+    parser.add_argument("--source", default="LinkedIn", help="spec to apply to the page")
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+    with open(args.page, "rb") as file:
+        content = file.read()
+    spec = load_specs(args.spec_file)[args.source]
+
+    print(f"{args.page}: {len(content) / 1024:.0f} KB, {args.source} cards {spec.container}")
+    cards = []
+    for backend in BACKENDS:
+        cards_time, fields_time, cards = bench(backend, content, spec, args.rounds)
+        print(f"{backend:12} {cards_time:8.1f} ms cards {fields_time:8.1f} ms cards & fields  {len(cards)} cards")
+
+    # a field that is missing from most cards usually means the markup has changed
+    for field in spec.fields:
+        found = sum(1 for card in cards if card.get(field.name))
+        print(f"{field.name:12} {found}/{len(cards)}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
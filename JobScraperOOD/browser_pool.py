@@ -0,0 +1,192 @@
+import atexit
+import logging
+import queue
+import threading
+
+from contextlib import contextmanager
+
+from selenium import webdriver
+from selenium.webdriver.edge.service import Service as EdgeService
+from selenium.webdriver.edge.options import Options as EdgeOptions
+from webdriver_manager.microsoft import EdgeChromiumDriverManager
+
+
+# Default browser pool settings
+pool_size = 2
+pool_max_pages = 50
+
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36"
+
+# Requests the scrapers never need: images, fonts, media & third party trackers
+BLOCKED_URLS = [
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.svg", "*.ico",
+    "*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot",
+    "*.mp4", "*.webm", "*.mp3", "*.m3u8",
+    "*google-analytics.com*", "*googletagmanager.com*", "*doubleclick.net*", "*facebook.net*",
+    "*hotjar.com*", "*segment.io*", "*segment.com*", "*newrelic.com*", "*nr-data.net*",
+    "*optimizely.com*", "*adobedtm.com*", "*demdex.net*", "*bing.com/bat*", "*linkedin.com/px*",
+]
+
+# EdgeChromiumDriverManager().install() checks for & downloads the driver, only do it once per process
+_driver_path = None
+_driver_path_lock = threading.Lock()
+
+
+def _edge_driver_path():
+    global _driver_path
+    with _driver_path_lock:
+        if _driver_path is None:
+            _driver_path = EdgeChromiumDriverManager().install()
+        return _driver_path
+
+
+def edge_driver(headless=True, block_resources=True):
+    """Launch a headless Edge session, the default driver factory for the pool"""
+    options = EdgeOptions()
+    options.use_chromium = True
+    if headless:
+        options.add_argument("--headless=new")
+    options.add_argument("--window-size=1920,1080")
+    options.add_argument(f"user-agent={USER_AGENT}")
+    # hand the page back at DOMContentLoaded, the scrapers wait for the elements they need
+    options.page_load_strategy = "eager"
+
+    if block_resources:
+        options.add_experimental_option("prefs", {
+            "profile.managed_default_content_settings.images": 2,
+            "profile.managed_default_content_settings.fonts": 2,
+            "profile.managed_default_content_settings.media_stream": 2,
+        })
+
+    driver = webdriver.Edge(service=EdgeService(_edge_driver_path()), options=options)
+
+    if block_resources:
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": BLOCKED_URLS})
+
+    return driver
+
+
+class PooledBrowser:
+    def __init__(self, driver):
+        self.driver = driver
+        self.pages = 0
+
+
+class BrowserPool:
+    """
+    Size bounded pool of browser sessions shared by the Selenium based scrapers.
+
+    Sessions are started on demand up to `size`, handed out with browser() & reused
+    across scrapes, queries & pages. A session is health checked before it is handed
+    out & recycled (quit & replaced) after `max_pages` pages. shutdown() quits them all
+    & runs at exit.
+    """
+
+    def __init__(self, size=pool_size, max_pages=pool_max_pages, driver_factory=edge_driver):
+        self.size = max(1, int(size))
+        self.max_pages = max(1, int(max_pages))
+        self.driver_factory = driver_factory
+
+        self.started = 0
+        self.recycled = 0
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(self.size)
+        self._lock = threading.Lock()
+        self._closed = False
+
+    @staticmethod
+    def _healthy(browser) -> bool:
+        try:
+            browser.driver.execute_script("return 1")
+            return True
+        except Exception as e:
+            logging.warning(f"Browser session failed health check: {e}")
+            return False
+
+    def _quit(self, browser):
+        try:
+            browser.driver.quit()
+        except Exception as e:
+            logging.debug(f"Error closing browser session: {e}")
+
+    def _checkout(self) -> PooledBrowser:
+        while True:
+            try:
+                browser = self._idle.get_nowait()
+            except queue.Empty:
+                logging.info("Starting a new browser session")
+                with self._lock:
+                    self.started += 1
+                return PooledBrowser(self.driver_factory())
+
+            if self._healthy(browser):
+                return browser
+            self._quit(browser)
+
+    @contextmanager
+    def browser(self):
+        """Borrow a browser session (the selenium driver) for one page"""
+        if self._closed:
+            raise RuntimeError("Browser pool has been shut down")
+
+        self._slots.acquire()
+        browser = None
+        try:
+            browser = self._checkout()
+            yield browser.driver
+            browser.pages += 1
+        except Exception:
+            # the session may be in any state, don't hand it to anyone else
+            if browser is not None:
+                self._quit(browser)
+                browser = None
+            raise
+        finally:
+            if browser is not None:
+                if browser.pages >= self.max_pages or self._closed:
+                    logging.info(f"Recycling browser session after {browser.pages} pages")
+                    with self._lock:
+                        self.recycled += 1
+                    self._quit(browser)
+                else:
+                    self._idle.put(browser)
+            self._slots.release()
+
+    def shutdown(self):
+        """Quit every idle session, sessions in use are quit when they are returned"""
+        self._closed = True
+        while True:
+            try:
+                self._quit(self._idle.get_nowait())
+            except queue.Empty:
+                break
+
+    def metrics(self) -> dict:
+        return {"started": self.started, "recycled": self.recycled, "idle": self._idle.qsize()}
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_browser_pool(config=None) -> BrowserPool:
+    """
+    The process wide browser pool, created on first use from the [Browser] section:
+    POOL_SIZE, MAX_PAGES, HEADLESS & BLOCK_RESOURCES
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            size, max_pages, headless, block_resources = pool_size, pool_max_pages, True, True
+            if config is not None and config.has_section("Browser"):
+                section = config["Browser"]
+                size = section.getint("POOL_SIZE", fallback=size)
+                max_pages = section.getint("MAX_PAGES", fallback=max_pages)
+                headless = section.getboolean("HEADLESS", fallback=headless)
+                block_resources = section.getboolean("BLOCK_RESOURCES", fallback=block_resources)
+
+            _pool = BrowserPool(size, max_pages, driver_factory=lambda: edge_driver(headless, block_resources))
+            atexit.register(_pool.shutdown)
+            logging.info(f"Browser pool: {size} sessions, recycled after {max_pages} pages")
+        return _pool
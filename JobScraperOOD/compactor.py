@@ -0,0 +1,182 @@
+import logging
+import math
+import re
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+import trafilatura
+
+from salary_extractor import SNIPPET_CUES
+from page_encoding import decode_body
+
+
+# Default compaction settings, a budget of 0 keeps every paragraph that isn't a duplicate or boilerplate
+token_budget = 1500
+token_encoding = "o200k_base"
+
+# Without tiktoken, roughly four characters of English to a token
+CHARS_PER_TOKEN = 4
+
+# Legal & EEO paragraphs every posting carries & no summary needs
+BOILERPLATE = re.compile(
+    r"equal\s+(?:employment\s+)?opportunity|affirmative\s+action|without\s+regard\s+to|regardless\s+of\s+(?:race|age|gender|sex)"
+    r"|protected\s+veteran|(?:race|religion),\s+(?:color|creed)|reasonable\s+accommodations?|e-verify|federal\s+employment\s+laws"
+    r"|pay\s+transparency\s+nondiscrimination|background\s+check|drug[-\s]free\s+workplace|fair\s+chance|privacy\s+(?:notice|policy)"
+    r"|committed\s+to\s+(?:the\s+)?(?:inclusion|diversity|creating\s+a\s+diverse)",
+    re.IGNORECASE)
+
+# Headings of the sections worth keeping when the description is over budget
+KEEP_SECTIONS = re.compile(
+    r"\b(?:role|position|responsibilit\w*|requirements?|qualifications?|looking\s+for|you.?ll\s+do|what\s+you.?ll|you\s+will"
+    r"|skills|experience|success|compensation|salary|pay|about\s+the\s+(?:job|team))\b",
+    re.IGNORECASE)
+
+# Trimmed first to last
+COMPENSATION, KEEP, OTHER = 0, 1, 2
+
+_encodings = {}
+
+
+def _encoding(encoding):
+    """The tiktoken encoding, None if tiktoken isn't installed or can't load it e.g. offline on first use"""
+    if tiktoken is None:
+        return None
+    if encoding not in _encodings:
+        try:
+            _encodings[encoding] = tiktoken.get_encoding(encoding)
+        except Exception as e:
+            logging.warning(f"Can't load the {encoding} token encoding, estimating tokens from length: {e}")
+            _encodings[encoding] = None
+    return _encodings[encoding]
+
+
+def count_tokens(text, encoding=token_encoding) -> int:
+    """Tokens in text with tiktoken, or an estimate from its length if tiktoken isn't installed or can't load the encoding"""
+    if not text:
+        return 0
+    tokenizer = _encoding(encoding)
+    if tokenizer is None:
+        return math.ceil(len(text) / CHARS_PER_TOKEN)
+    return len(tokenizer.encode(text, disallowed_special=()))
+
+
+def _heading(paragraph) -> bool:
+    return len(paragraph) <= 60 and not paragraph.startswith("-") and not paragraph.endswith((".", ":", ";", ","))
+
+
+class DescriptionCompactor:
+    """
+    Shrinks a cleaned job description before it is sent to an LLM: repeated paragraphs
+    & legal / EEO boilerplate are dropped, then if it is still over the per-job token
+    budget the paragraphs outside the role, requirements & compensation sections are
+    trimmed from the end, then those sections, never the paragraphs that mention pay.
+    Keeps a running count of the tokens in & out.
+    """
+
+    def __init__(self, budget=token_budget, drop_boilerplate=True, encoding=token_encoding):
+        self.budget = max(0, int(budget))
+        self.drop_boilerplate = drop_boilerplate
+        self.encoding = encoding
+
+        self.tokens_in = 0
+        self.tokens_out = 0
+
+    @classmethod
+    def from_config(cls, config_section):
+        """Build a compactor from a summarizer's config section e.g. config["OpenAI"]"""
+        return cls(
+            budget=config_section.getint("TOKEN_BUDGET", fallback=token_budget),
+            drop_boilerplate=config_section.getboolean("DROP_BOILERPLATE", fallback=True),
+            encoding=config_section.get("TOKEN_ENCODING", fallback=token_encoding))
+
+    def _paragraphs(self, text) -> list:
+        """The distinct, non boilerplate paragraphs of text, each with its priority"""
+        paragraphs = []
+        seen = set()
+        priority = OTHER
+        for line in text.splitlines():
+            paragraph = " ".join(line.split())
+            if paragraph in ("", "-"):
+                continue
+
+            key = paragraph.lower()
+            if key in seen:
+                continue
+            seen.add(key)
+
+            pay = SNIPPET_CUES.search(paragraph) is not None
+            if self.drop_boilerplate and not pay and BOILERPLATE.search(paragraph):
+                continue
+
+            if _heading(paragraph):
+                # a heading sets the priority of the paragraphs under it
+                priority = KEEP if KEEP_SECTIONS.search(paragraph) else OTHER
+
+            if pay:
+                paragraphs.append([paragraph, COMPENSATION])
+            elif len(paragraphs) < 3:
+                # the opening lines are the title, company & location
+                paragraphs.append([paragraph, KEEP])
+            else:
+                paragraphs.append([paragraph, priority])
+        return paragraphs
+
+    def _trim(self, paragraphs) -> list:
+        """Drop paragraphs, lowest priority & last first, until the rest fit the budget"""
+        sizes = [count_tokens(paragraph, self.encoding) for paragraph, _ in paragraphs]
+        total = sum(sizes)
+        kept = [True] * len(paragraphs)
+        for level in (OTHER, KEEP):
+            for index in reversed(range(len(paragraphs))):
+                if total <= self.budget:
+                    return [paragraph for (paragraph, _), keep in zip(paragraphs, kept) if keep]
+                if kept[index] and paragraphs[index][1] == level:
+                    kept[index] = False
+                    total -= sizes[index]
+        return [paragraph for (paragraph, _), keep in zip(paragraphs, kept) if keep]
+
+    def compact(self, text):
+        """Returns (compacted text, tokens before, tokens after)"""
+        if not text:
+            return text, 0, 0
+
+        before = count_tokens(text, self.encoding)
+        paragraphs = self._paragraphs(text)
+        if self.budget:
+            kept = self._trim(paragraphs)
+        else:
+            kept = [paragraph for paragraph, _ in paragraphs]
+        compacted = "\n".join(kept)
+        after = count_tokens(compacted, self.encoding)
+
+        if self.budget and after > self.budget:
+            # only pay paragraphs left & still too long
+            compacted = compacted[:self.budget * CHARS_PER_TOKEN]
+            after = count_tokens(compacted, self.encoding)
+
+        self.tokens_in += before
+        self.tokens_out += after
+        logging.info(f"Compacted the description from {before} to {after} tokens")
+        return compacted, before, after
+
+    def compact_page(self, page):
+        """
+        Compact a job's description, returns the text. page is a Job, whose cleaned description
+        is used when the CPU stage has made it, or a raw page, which is cleaned with trafilatura
+        first (falling back to the page as text)
+        """
+        cleaned = getattr(page, "cleaned_description", None)
+        if cleaned:
+            return self.compact(cleaned)[0]
+        page = decode_body(getattr(page, "raw_description", page))
+        text = trafilatura.extract(page) if page else None
+        if text is None:
+            logging.warning("Couldn't clean the page, compacting it as it is")
+            text = page or ""
+        return self.compact(text)[0]
+
+    def metrics(self) -> dict:
+        return {"tokens_in": self.tokens_in, "tokens_out": self.tokens_out}
@@ -0,0 +1,168 @@
+import atexit
+import logging
+import multiprocessing
+import os
+import threading
+
+from concurrent.futures import Future, ProcessPoolExecutor
+
+import trafilatura
+
+from structured_data import extract_job_fields
+from page_encoding import decode_body
+from site_template import TemplateStore, page_blocks, parse, strip_template, to_html
+
+
+# Default CPU stage settings, a worker per core less one for the I/O threads
+cpu_workers = max(1, (os.cpu_count() or 2) - 1)
+cpu_chunk_size = 4
+
+
+def prepare_page(raw_description, template=None, learn=False):
+    """
+    The CPU bound work on a job page, run in a worker process: the trafilatura cleaned
+    text & the structured data fields. With a learned site template its blocks are
+    stripped before cleaning, with learn the page's blocks are returned for the
+    TemplateStore. Returns (cleaned text, fields, provenance, blocks)
+    """
+    if not raw_description:
+        return None, {}, {}, None
+    # decoded once, the parsers & trafilatura all get the same text
+    raw_description = decode_body(raw_description)
+    fields, provenance = extract_job_fields(raw_description)
+    if template is None and not learn:
+        return trafilatura.extract(raw_description), fields, provenance, None
+
+    document = parse(raw_description)
+    if document is None:
+        return trafilatura.extract(raw_description), fields, provenance, None
+    blocks = page_blocks(document) if learn and template is None else None
+    if template:
+        strip_template(document, template)
+    return trafilatura.extract(to_html(document)), fields, provenance, blocks
+
+
+def _prepare_chunk(pages) -> list:
+    return [prepare_page(*page) for page in pages]
+
+
+def _warm():
+    """Worker initializer, pays for trafilatura's imports & first-call setup once per worker rather than per page"""
+    _prepare_chunk([("<html><body><article><p>warm up</p></article></body></html>",)])
+
+
+class CpuStage:
+    """
+    A process pool for cleaning & parsing the job pages, so the CPU bound trafilatura &
+    HTML parsing run on every core rather than serializing on the GIL in the scraper
+    threads. Jobs are submitted a chunk at a time (one round trip per chunk) & the
+    workers are started once, warmed up & reused for the life of the process.
+
+    With 0 workers the pages are prepared in the calling thread. With a TemplateStore
+    each source's learned page template is stripped before cleaning.
+    """
+
+    def __init__(self, workers=cpu_workers, chunk_size=cpu_chunk_size, templates=None):
+        self.workers = max(0, int(workers))
+        self.chunk_size = max(1, int(chunk_size))
+        self.templates = templates
+
+        self.pages = 0
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                logging.info(f"Starting {self.workers} CPU workers")
+                # spawned rather than forked, the scraper threads, event loops & summary pool are
+                # already running & forking a threaded process can deadlock the children
+                self._executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_warm,
+                                                     mp_context=multiprocessing.get_context("spawn"))
+            return self._executor
+
+    def submit(self, jobs) -> Future:
+        """Start preparing a chunk of jobs, the future's result is a prepare_page result per job"""
+        if self.templates is None:
+            pages = [(job.raw_description,) for job in jobs]
+        else:
+            pages = [(job.raw_description, self.templates.template(job.source), True) for job in jobs]
+        if self.workers == 0:
+            future = Future()
+            future.set_result(_prepare_chunk(pages))
+            return future
+        return self._pool().submit(_prepare_chunk, pages)
+
+    def apply(self, jobs, future):
+        """Attach a submitted chunk's results to its jobs, leaving them for the summarizer to prepare if it failed"""
+        try:
+            results = future.result()
+        except Exception as e:
+            logging.error(f"CPU stage failed on a chunk of {len(jobs)} jobs: {e}")
+            return
+
+        for job, (cleaned, fields, provenance, blocks) in zip(jobs, results):
+            job.cleaned_description = cleaned
+            job.page_fields = (fields, provenance)
+            if self.templates is not None:
+                self.templates.observe(job.source, blocks)
+        with self._lock:
+            self.pages += len(jobs)
+
+    def _chunks(self, jobs):
+        chunk = []
+        for job in jobs:
+            chunk.append(job)
+            if len(chunk) == self.chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    def prepared(self, jobs):
+        """
+        Yield the jobs prepared, a chunk at a time. The next chunk is submitted before the
+        current one is handed back, so the workers clean while the caller summarizes
+        """
+        pending = None
+        for chunk in self._chunks(jobs):
+            future = self.submit(chunk)
+            if pending is not None:
+                self.apply(*pending)
+                yield from pending[0]
+            pending = (chunk, future)
+
+        if pending is not None:
+            self.apply(*pending)
+            yield from pending[0]
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+    def metrics(self) -> dict:
+        return {"workers": self.workers, "pages": self.pages}
+
+
+_stage = None
+_stage_lock = threading.Lock()
+
+
+def get_cpu_stage(config=None) -> CpuStage:
+    """
+    The process wide CPU stage, created on first use from WORKERS & CHUNK_SIZE in the [CPU]
+    section, with a TemplateStore if [Templates] is ENABLED
+    """
+    global _stage
+    with _stage_lock:
+        if _stage is None:
+            workers, chunk_size = cpu_workers, cpu_chunk_size
+            if config is not None and config.has_section("CPU"):
+                workers = config["CPU"].getint("WORKERS", fallback=workers)
+                chunk_size = config["CPU"].getint("CHUNK_SIZE", fallback=chunk_size)
+
+            _stage = CpuStage(workers, chunk_size, TemplateStore.from_config(config))
+            atexit.register(_stage.shutdown)
+        return _stage
@@ -8,7 +8,11 @@ from job_scraper import GenAISummarizer
 import json
 
 import openai   #deepseek uses the OpenAI API
-from openai import OpenAI
+
+from aimd_controller import controllers, status_from_exception
+from llm_budget import llm_budgets
+from llm_clients import llm_clients, prompt_cache
+from compactor import DescriptionCompactor
 
 
 class DeepseekSummarizer(GenAISummarizer):
@@ -25,17 +29,17 @@ class DeepseekSummarizer(GenAISummarizer):
         self.__api_key = config["Deepseek"]["DEEPSEEK_API_KEY"]
         self.__model = config["Deepseek"]["MODEL"]
 
+        # dedupe, drop the boilerplate & trim the description to TOKEN_BUDGET before it is sent
+        self.compactor = DescriptionCompactor.from_config(config["Deepseek"])
+
         self._load_prompt(prompt_filename)
 
         logging.debug(f"Deepseek API key loaded successfully: {self.__api_key}")
         logging.debug(f"Deepseek model loaded successfully: {self.__model}")
         logging.debug(f"Prompt loaded successfully from {prompt_filename}")
        
-        # Set up OpenAI API client here if needed
-        self.client = OpenAI(
-            api_key=self.__api_key,
-            base_url="https://api.deepseek.com",
-        )
+        # Set up OpenAI API client here if needed, kept alive & shared by every job
+        self.client = llm_clients.openai(self.__api_key, "https://api.deepseek.com")
  
     def get_prompt(self):
         return self.__prompt
@@ -62,10 +66,10 @@ class DeepseekSummarizer(GenAISummarizer):
     
 
 
-    def summarize(self, raw_description: str) -> Job:
+    def summarize(self, job: Job) -> Job:
         logging.debug("Summarizing text using Deepseek API...")
     
-        summary = self._query_deekseek( str(raw_description))
+        summary = self._query_deekseek(self.compactor.compact_page(job))
         if summary is None:
             logging.error("Failed to summarize text using OpenAI API.")
             return None
@@ -105,11 +109,16 @@ class DeepseekSummarizer(GenAISummarizer):
             description=parsed_summary.get("description", ""),
             summary=parsed_summary.get("summary", ""),
             fit=parsed_summary.get("fit", None),
-            raw_description=raw_description)
+            raw_description=job.raw_description)
     
 
     @backoff.on_exception(backoff.expo, (openai.OpenAIError, openai.APIError, openai.RateLimitError, openai.Timeout, BaseException), max_tries=20)
     def _query_deekseek(self, raw_description ):
+        # wait for the tokens per minute budget before taking a slot in the concurrency window
+        llm_budgets.get("llm:deepseek").acquire(self.__prompt, raw_description)
+        controller = controllers.get("llm:deepseek")
+        controller.acquire()
+        status = None
         try:
 
             logging.debug(f"Input string: {self.get_prompt()}")
@@ -128,6 +137,9 @@ class DeepseekSummarizer(GenAISummarizer):
                     'type': 'json_object'
                 }
             )
+            status = 200
+            # Deepseek caches the shared prefix, the prompt ahead of the job text, by itself
+            prompt_cache.record_openai("llm:deepseek", response.usage)
 
             json_response = str(response.choices[0].message.content)
 
@@ -139,9 +151,12 @@ class DeepseekSummarizer(GenAISummarizer):
             return json_response
         
         except openai.OpenAIError as e:
+            status = status_from_exception(e)
             logging.error("Error querying OpenAI: %s",e)
             # logging.error(f"Model: {model} Temperature: {temp} Max Output Tokens: {max_tokens} Prompt: {prompt}")
             return None
+        finally:
+            controller.release(status)
 
 
 
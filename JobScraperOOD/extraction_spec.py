@@ -0,0 +1,163 @@
+import json
+import logging
+import os
+import re
+
+from html_parser import HtmlNode, element_matcher
+
+
+# Default spec file, next to this module
+spec_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), "extraction_specs.json")
+
+
+class FieldSpec:
+    """
+    One field of a card. selector picks the element inside the card (none means the card
+    itself), attr the attribute to read (none means the element's text). regex keeps the
+    first group (or the whole match) and format is a str.format template for the result.
+    """
+
+    def __init__(self, name, selector=None, attr=None, regex=None, format=None, default=None):
+        self.name = name
+        self.selector = selector
+        self.attr = attr
+        self.regex = re.compile(regex) if regex else None
+        self.format = format
+        self.default = default
+        # simple selectors are matched while walking the card, the rest fall back to select_one
+        self.matcher = element_matcher(selector) if selector else None
+
+    @classmethod
+    def from_dict(cls, name, spec):
+        if isinstance(spec, str):
+            return cls(name, selector=spec)
+        unknown = set(spec) - {"selector", "attr", "regex", "format", "default"}
+        if unknown:
+            raise ValueError(f"Unknown keys {sorted(unknown)} in field {name}")
+        return cls(name, **spec)
+
+    def value(self, node):
+        if node is None:
+            return self.default
+
+        if self.attr:
+            value = node.get(self.attr)
+            if isinstance(value, list):
+                value = " ".join(value)
+        else:
+            value = node.get_text(" ", strip=True)
+
+        if value is None:
+            return self.default
+
+        if self.regex is not None:
+            match = self.regex.search(value)
+            if match is None:
+                return self.default
+            value = match.group(1) if self.regex.groups else match.group(0)
+
+        if self.format:
+            value = self.format.format(value)
+        return value
+
+
+class ExtractionSpec:
+    """
+    Declarative card extraction for one source: the container selector for the job cards
+    & a FieldSpec per field. Compiled once, then each card is walked a single time to fill
+    every field rather than one tree search per field.
+    """
+
+    def __init__(self, source, container, fields):
+        self.source = source
+        self.container = container
+        self.fields = fields
+
+        self._own = [field for field in fields if field.selector is None]
+        self._walked = [field for field in fields if field.matcher is not None]
+        self._selected = [field for field in fields if field.selector and field.matcher is None]
+
+        # walked fields indexed by the tag they need, so most elements cost one dict lookup
+        self._any_tag = [field for field in self._walked if field.matcher.tag == "*"]
+        self._by_tag = {}
+        for field in self._walked:
+            if field.matcher.tag != "*":
+                self._by_tag.setdefault(field.matcher.tag, []).append(field)
+        for fields_for_tag in self._by_tag.values():
+            fields_for_tag.extend(self._any_tag)
+
+    @classmethod
+    def from_dict(cls, source, spec):
+        if "container" not in spec:
+            raise ValueError(f"Extraction spec for {source} has no container selector")
+        fields = [FieldSpec.from_dict(name, field) for name, field in spec.get("fields", {}).items()]
+        return cls(source, spec["container"], fields)
+
+    def extract(self, card) -> dict:
+        """The fields of one card (an HtmlNode or BeautifulSoup Tag) as a dict"""
+        values = {field.name: field.value(card) for field in self._own}
+
+        for field in self._selected:
+            values[field.name] = field.value(card.select_one(field.selector))
+
+        pending = len(self._walked)
+        if pending:
+            wrap = HtmlNode if isinstance(card, HtmlNode) else None
+            for name, node in self._elements(card):
+                for field in self._by_tag.get(name, self._any_tag):
+                    if field.name not in values and field.matcher(name, node.get):
+                        values[field.name] = field.value(wrap(node) if wrap else node)
+                        pending -= 1
+                if not pending:
+                    break
+
+        for field in self._walked:
+            values.setdefault(field.name, field.default)
+        return values
+
+    @staticmethod
+    def _elements(card):
+        """(tag name, element) for the elements inside the card in document order, as lxml elements or Tags"""
+        if isinstance(card, HtmlNode):
+            for element in card.element.iterdescendants():
+                # skip comments & processing instructions
+                if isinstance(element.tag, str):
+                    yield element.tag, element
+        else:
+            for node in card.descendants:
+                # skip the text nodes
+                if node.name is not None:
+                    yield node.name, node
+
+    def cards(self, parser, content) -> list:
+        """The card elements of a page"""
+        return parser.select(content, self.container)
+
+    def extract_all(self, parser, content) -> list[dict]:
+        """The fields of every card on a page"""
+        return [self.extract(card) for card in self.cards(parser, content)]
+
+
+def load_specs(path=None) -> dict:
+    """Compile every spec in a JSON spec file, keyed by source"""
+    path = path or spec_file
+    with open(path, "r", encoding="utf-8") as file:
+        specs = json.load(file)
+    logging.info(f"Loaded extraction specs for {', '.join(specs)} from {path}")
+    return {source: ExtractionSpec.from_dict(source, spec) for source, spec in specs.items()}
+
+
+_specs = {}
+
+
+def get_spec(config, source) -> ExtractionSpec:
+    """The compiled spec for source from the file named by SPEC_FILE in [Parser], compiled once per file"""
+    path = spec_file
+    if config is not None and config.has_section("Parser"):
+        path = config["Parser"].get("SPEC_FILE", fallback=spec_file).strip("\"'")
+
+    if path not in _specs:
+        _specs[path] = load_specs(path)
+    if source not in _specs[path]:
+        raise KeyError(f"No extraction spec for {source} in {path}")
+    return _specs[path][source]
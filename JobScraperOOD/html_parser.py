@@ -0,0 +1,412 @@
+import codecs
+import logging
+import re
+
+from functools import lru_cache
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+from page_encoding import SNIFF_BYTES, decode_body, sniff_charset
+
+try:
+    import lxml.html
+    from lxml import etree
+except ImportError:
+    lxml = None
+
+
+# Default parser backend, see HtmlParser
+parser_backend = "lxml"
+
+# lxml parses with lxml.html directly, soup-lxml & html.parser build a BeautifulSoup tree with that builder
+BACKENDS = ("lxml", "soup-lxml", "html.parser")
+
+
+# The start of the page's <body>, see CardStream
+_BODY_TAG = re.compile(rb"<body[\s>]", re.IGNORECASE)
+
+# A compound selector: an optional tag followed by any number of #id, .class & [attr op value] parts
+_COMPOUND = re.compile(r"""\s*(?P<tag>[\w-]+|\*)?(?P<parts>(?:\#[\w-]+|\.[\w-]+|\[[^\]]+\])*)\s*""")
+_PART = re.compile(r"""\#(?P<id>[\w-]+)|\.(?P<cls>[\w-]+)|\[\s*(?P<attr>[\w:-]+)\s*(?:(?P<op>[~^$*|]?=)\s*(?P<value>"[^"]*"|'[^']*'|[^\]\s]+)\s*)?\]""")
+
+
+def _literal(value) -> str:
+    """Quote value as an XPath string literal"""
+    if "'" not in value:
+        return f"'{value}'"
+    if '"' not in value:
+        return f'"{value}"'
+    return "concat(" + ", \"'\", ".join(f"'{piece}'" for piece in value.split("'")) + ")"
+
+
+def _class_test(name) -> str:
+    return f"contains(concat(' ', normalize-space(@class), ' '), {_literal(' ' + name + ' ')})"
+
+
+def _attr_test(attr, op, value) -> str:
+    if op is None:
+        return f"@{attr}"
+    value = value.strip("\"'")
+    if op == "=":
+        return f"@{attr} = {_literal(value)}"
+    if op == "~=":
+        return f"contains(concat(' ', normalize-space(@{attr}), ' '), {_literal(' ' + value + ' ')})"
+    if op == "^=":
+        return f"starts-with(@{attr}, {_literal(value)})"
+    if op == "$=":
+        return f"substring(@{attr}, string-length(@{attr}) - {len(value) - 1}) = {_literal(value)}"
+    if op == "*=":
+        return f"contains(@{attr}, {_literal(value)})"
+    # |= matches the value or the value followed by a hyphen
+    return f"(@{attr} = {_literal(value)} or starts-with(@{attr}, {_literal(value + '-')}))"
+
+
+def _split_compounds(selector):
+    """Split a selector into [(combinator, tag, parts)], combinator is ' ' (descendant) or '>' (child)"""
+    compounds = []
+    combinator = " "
+    for token in re.split(r"\s*(>)\s*|\s+(?![^\[]*\])", selector.strip()):
+        if not token:
+            continue
+        if token == ">":
+            combinator = ">"
+            continue
+        match = _COMPOUND.fullmatch(token)
+        if match is None or not (match.group("tag") or match.group("parts")):
+            raise ValueError(f"Unsupported selector: {selector!r}")
+        compounds.append((combinator, match.group("tag") or "*", match.group("parts")))
+        combinator = " "
+    if not compounds:
+        raise ValueError(f"Empty selector: {selector!r}")
+    return compounds
+
+
+@lru_cache(maxsize=256)
+def css_to_xpath(selector) -> str:
+    """
+    Translate a CSS selector to an XPath relative to the node it is applied to. Covers
+    what the scrapers use: tags, #id, .class, [attr], [attr=value] (also ~= ^= $= *= |=),
+    the descendant & child combinators and comma separated groups
+    """
+    paths = []
+    for group in selector.split(","):
+        steps = []
+        for combinator, tag, parts in _split_compounds(group):
+            tests = []
+            for part in _PART.finditer(parts):
+                if part.group("id"):
+                    tests.append(f"@id = {_literal(part.group('id'))}")
+                elif part.group("cls"):
+                    tests.append(_class_test(part.group("cls")))
+                else:
+                    tests.append(_attr_test(part.group("attr"), part.group("op"), part.group("value")))
+            axis = "child::" if combinator == ">" and steps else "descendant::"
+            steps.append(axis + tag + "".join(f"[{test}]" for test in tests))
+        paths.append("/".join(steps))
+    return " | ".join(paths)
+
+
+@lru_cache(maxsize=256)
+def _compiled(selector):
+    return etree.XPath(css_to_xpath(selector))
+
+
+def _attr_matches(actual, op, value) -> bool:
+    if actual is None:
+        return False
+    if op is None:
+        return True
+    if op == "=":
+        return actual == value
+    if op == "~=":
+        return value in actual.split()
+    if op == "^=":
+        return actual.startswith(value)
+    if op == "$=":
+        return actual.endswith(value)
+    if op == "*=":
+        return value in actual
+    return actual == value or actual.startswith(value + "-")
+
+
+@lru_cache(maxsize=256)
+def element_matcher(selector):
+    """
+    Compile a single compound selector (no combinators or groups) to a predicate taking
+    an element's tag name & attribute getter, so it works on lxml elements & BeautifulSoup
+    Tags alike. None if the selector is more complex
+    """
+    if "," in selector:
+        return None
+    try:
+        compounds = _split_compounds(selector)
+    except ValueError:
+        return None
+    if len(compounds) != 1:
+        return None
+
+    _, tag, parts = compounds[0]
+    tests = []
+    for part in _PART.finditer(parts):
+        if part.group("id"):
+            tests.append(("id", "=", part.group("id")))
+        elif part.group("cls"):
+            tests.append(("class", "~=", part.group("cls")))
+        else:
+            value = part.group("value")
+            tests.append((part.group("attr"), part.group("op"), value.strip("\"'") if value else None))
+
+    def matches(name, get):
+        if tag != "*" and name != tag:
+            return False
+        for attr, op, value in tests:
+            actual = get(attr)
+            if isinstance(actual, list):
+                # BeautifulSoup splits class into a list
+                actual = " ".join(actual)
+            if not _attr_matches(actual, op, value):
+                return False
+        return True
+
+    # lets callers index matchers by tag name
+    matches.tag = tag
+    return matches
+
+
+def strainer_for(selector):
+    """
+    SoupStrainer that keeps only the elements matching the first compound of selector (&
+    their subtrees), so a BeautifulSoup backend builds just the card subtrees. None when
+    the selector can't be strained (groups or an id / attribute operator the strainer
+    can't express), in which case the whole page is parsed
+    """
+    if "," in selector:
+        return None
+    try:
+        _, tag, parts = _split_compounds(selector)[0]
+    except ValueError:
+        return None
+
+    classes = []
+    attrs = {}
+    for part in _PART.finditer(parts):
+        if part.group("cls"):
+            classes.append(part.group("cls"))
+        elif part.group("id"):
+            attrs["id"] = part.group("id")
+        elif part.group("op") in (None, "="):
+            attrs[part.group("attr")] = True if part.group("op") is None else part.group("value").strip("\"'")
+        else:
+            return None
+
+    if classes:
+        # the strainer may see the class attribute as the whole string or one class at a time
+        attrs["class"] = lambda value: value is not None and all(name in value.split() for name in classes)
+
+    return SoupStrainer(None if tag == "*" else tag, attrs=attrs)
+
+
+class HtmlNode:
+    """
+    An lxml element with the subset of the BeautifulSoup Tag API the scrapers use:
+    find / find_all, select / select_one, get, [], get_text, text & decompose
+    """
+    __slots__ = ("element",)
+
+    def __init__(self, element):
+        self.element = element
+
+    @property
+    def name(self):
+        return self.element.tag
+
+    @property
+    def attrs(self) -> dict:
+        return dict(self.element.attrib)
+
+    def get(self, key, default=None):
+        return self.element.get(key, default)
+
+    def __getitem__(self, key):
+        return self.element.attrib[key]
+
+    def has_attr(self, key) -> bool:
+        return key in self.element.attrib
+
+    def get_text(self, separator="", strip=False) -> str:
+        pieces = self.element.itertext()
+        if strip:
+            return separator.join(piece.strip() for piece in pieces if piece.strip())
+        return separator.join(pieces)
+
+    @property
+    def text(self) -> str:
+        return self.get_text()
+
+    def select(self, selector) -> list:
+        return [HtmlNode(element) for element in _compiled(selector)(self.element)]
+
+    def select_one(self, selector):
+        found = _compiled(selector)(self.element)
+        return HtmlNode(found[0]) if found else None
+
+    def find_all(self, name=None, attrs=None, class_=None, **kwargs) -> list:
+        tests = []
+        attrs = dict(attrs or {}, **kwargs)
+        if class_ is not None:
+            attrs["class"] = class_
+        for attr, value in attrs.items():
+            if value is True:
+                tests.append(f"@{attr}")
+            elif attr == "class" and " " not in value:
+                tests.append(_class_test(value))
+            else:
+                tests.append(f"normalize-space(@{attr}) = {_literal(' '.join(value.split()))}")
+        return [HtmlNode(element) for element in self.element.xpath(f"descendant::{name or '*'}" + "".join(f"[{test}]" for test in tests))]
+
+    def find(self, name=None, attrs=None, class_=None, **kwargs):
+        found = self.find_all(name, attrs, class_, **kwargs)
+        return found[0] if found else None
+
+    def decompose(self):
+        """Remove the element & its subtree from the document, keeping the text that follows it"""
+        self.element.drop_tree()
+
+    def __str__(self):
+        return etree.tostring(self.element, encoding="unicode", method="html", with_tail=False)
+
+    def __repr__(self):
+        return f"<HtmlNode {self.element.tag}>"
+
+
+class HtmlParser:
+    """
+    Parses the scraped HTML with the configured backend.
+
+    lxml (the default) parses with lxml.html & returns HtmlNode elements, the fastest
+    option by an order of magnitude. soup-lxml & html.parser return BeautifulSoup tags,
+    with select() straining the parse down to the card subtrees. lxml falls back to
+    html.parser if lxml isn't installed.
+    """
+
+    def __init__(self, backend=parser_backend):
+        backend = backend.strip("\"'").lower()
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown HTML parser backend {backend!r}, expected one of {BACKENDS}")
+        if backend != "html.parser" and lxml is None:
+            logging.warning(f"lxml isn't installed, using html.parser rather than {backend}")
+            backend = "html.parser"
+        self.backend = backend
+
+    @classmethod
+    def from_config(cls, config):
+        """Build the parser from BACKEND in the [Parser] section"""
+        if not config.has_section("Parser"):
+            return cls()
+        return cls(config["Parser"].get("BACKEND", fallback=parser_backend))
+
+    def parse(self, content, only=None):
+        """
+        Parse a whole page. only is a selector to strain a BeautifulSoup parse down to,
+        the lxml backend always parses the whole page
+        """
+        if not isinstance(content, str):
+            # decoded with the page's charset rather than lxml's latin-1 or bs4's guess
+            content = decode_body(content)
+        if self.backend == "lxml":
+            try:
+                return HtmlNode(lxml.html.document_fromstring(content))
+            except ValueError:
+                # lxml won't take a str with an encoding declaration
+                return HtmlNode(lxml.html.document_fromstring(content.encode("utf-8")))
+            except etree.ParserError:
+                # empty document
+                return HtmlNode(lxml.html.document_fromstring("<html></html>"))
+
+        builder = "lxml" if self.backend == "soup-lxml" else "html.parser"
+        return BeautifulSoup(content, builder, parse_only=strainer_for(only) if only else None)
+
+    def select(self, content, selector) -> list:
+        """The elements of the page matching the CSS selector"""
+        return self.parse(content, only=selector).select(selector)
+
+
+class CardStream:
+    """
+    Incremental parse of a page arriving in chunks. feed() each chunk as it is received &
+    get back the elements matching selector (a single compound selector) whose closing
+    tag has arrived, so the caller can act on each card before the rest of the page has
+    downloaded. Needs lxml.
+
+    The chunks are decoded before lxml sees them, with charset, else the charset of the
+    first chunk if it is a PageBody, else the page's own declaration (the start of the page
+    is held back until that could have arrived), else utf-8, rather than lxml's latin-1
+    guess. A multi-byte character split across chunks is kept whole
+    """
+
+    def __init__(self, selector, charset=None):
+        if lxml is None:
+            raise RuntimeError("Streaming HTML parsing needs lxml")
+        self.matcher = element_matcher(selector)
+        if self.matcher is None:
+            raise ValueError(f"Can't stream on {selector!r}, only single compound selectors are supported")
+        self._parser = etree.HTMLPullParser(events=("end",), tag=None if self.matcher.tag == "*" else self.matcher.tag)
+        self.charset = charset
+        self._decoder = None
+        # the start of the page, held back until its <meta charset> can be sniffed
+        self._head = b""
+
+    def _head_seen(self) -> bool:
+        # a <meta charset> has to come before the <body>, so no need to wait for SNIFF_BYTES past it
+        head = self._head[:SNIFF_BYTES]
+        return len(head) == SNIFF_BYTES or _BODY_TAG.search(head) is not None or sniff_charset(head) is not None
+
+    def _start(self, charset):
+        # a BOM wins over a declared charset, as in decode_body
+        bom = sniff_charset(self._head[:4])
+        charset = bom or charset or sniff_charset(self._head) or "utf-8"
+        try:
+            self._decoder = codecs.getincrementaldecoder(charset)(errors="replace")
+        except LookupError:
+            logging.debug(f"Unknown charset {charset}, streaming the page as utf-8")
+            self._decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        self.charset = self.charset or charset
+        head, self._head = self._head, b""
+        return head
+
+    def _ready(self) -> list:
+        cards = []
+        for _, element in self._parser.read_events():
+            if self.matcher(element.tag, element.get):
+                cards.append(HtmlNode(element))
+        return cards
+
+    def feed(self, chunk) -> list:
+        """Parse the next chunk, returns the cards completed by it"""
+        if self._decoder is None:
+            charset = self.charset or getattr(chunk, "charset", None)
+            self._head += bytes(chunk)
+            if charset is None and not self._head_seen():
+                return []
+            chunk = self._start(charset)
+
+        text = self._decoder.decode(bytes(chunk))
+        if text:
+            self._parser.feed(text)
+        return self._ready()
+
+    def close(self) -> list:
+        """End of the page, returns any cards only closed by the end of the document"""
+        rest = b""
+        if self._decoder is None:
+            # a page shorter than the sniffed head
+            rest = self._start(self.charset)
+        text = self._decoder.decode(rest, final=True)
+        if text:
+            self._parser.feed(text)
+        try:
+            self._parser.close()
+        except etree.XMLSyntaxError:
+            # nothing was fed, e.g. an empty page
+            pass
+        return self._ready()
@@ -0,0 +1,32 @@
+import requests
+
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+# Status codes worth another attempt before giving up on a page, for both the sync & async fetchers
+RETRY_STATUS_CODES = (500, 502, 503, 504)
+
+
+def pooled_session(pool_maxsize=10, max_retries=5) -> requests.Session:
+    """
+    A requests Session with a keep-alive connection pool & the same retry policy as the
+    async fetcher: transient 5xx responses are retried with exponential backoff, 429s are
+    left to the shared rate limiter so it can honour Retry-After for the whole host.
+    """
+    session = requests.Session()
+
+    # Configure connection pooling
+    adapter = HTTPAdapter(
+        pool_connections=2,             # Number of connection pools
+        pool_maxsize=pool_maxsize,      # Maximum number of connections in the pool
+        max_retries=Retry(
+            total=max_retries,          # Retry failed requests
+            backoff_factor=0.3,         # Wait time between retries (exponential backoff)
+            status_forcelist=RETRY_STATUS_CODES,
+            raise_on_status=False       # Hand the last response back rather than raising
+        )
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
@@ -3,6 +3,7 @@ from argparse import ArgumentParser
 import sys 
 import time
 import logging
+import threading
 import openpyxl as xl
 from openpyxl.utils import FORMULAE
 
@@ -10,12 +11,23 @@ from openpyxl.utils import FORMULAE
 from abc import ABC, abstractmethod
 
 from concurrent.futures import ThreadPoolExecutor, as_completed
+from itertools import islice
+
+from rate_limiter import rate_limiter
+from aimd_controller import controllers
+from singleflight import canonical_url, fetch_flight
+from cpu_stage import get_cpu_stage
+from summary_stage import get_summary_stage
+from llm_budget import llm_budgets
+from llm_clients import prompt_cache
+from summary_cache import CachedSummarizer
+from page_encoding import decode_body
 
 
 DEV_MODE = True
 
 class Job:
-    def __init__(self, id=None, source="LinkedIn", title=None, company=None, location=None, date=None, url=None, salary=None, salary_lower=None, salary_upper=None,description=None, summary=None, fit=None, raw_description=None, cleaned_description=None):
+    def __init__(self, id=None, source="LinkedIn", title=None, company=None, location=None, date=None, url=None, salary=None, salary_lower=None, salary_upper=None,description=None, summary=None, fit=None, raw_description=None, cleaned_description=None, provenance=None):
         self.id = id
         self.source = source
         self.url = url
@@ -31,6 +43,10 @@ class Job:
         self.fit = fit
         self.raw_description = raw_description
         self.cleaned_description = cleaned_description
+        # where each field came from e.g. {"title": "json-ld", "summary": "llm"}
+        self.provenance = provenance or {}
+        # (fields, provenance) from the page's structured data, filled in by the CPU stage
+        self.page_fields = None
 
     def __str__(self):
         return f"ID: {self.id},Source: {self.source}, Title: {self.title}, Company: {self.company}, Location: {self.location}, \
@@ -59,7 +75,7 @@ class Job:
             "description": self.description,
             "summary": self.summary,
             "fit": self.fit,
-            "raw_description": self.raw_description
+            "raw_description": decode_body(self.raw_description)
         }
 
 
@@ -97,7 +113,7 @@ class JobSorter(ABC):
 
 class SalaryDownJobSorter(JobSorter):
     def sort(self, jobs: list[Job]) -> list[Job]:
-       sorted_jobs = sorted(jobs, key=lambda job: job.salary_upper or 0, reverse=True)
+       sorted_jobs = sorted(jobs, key=lambda job: job.salary_upper or job.salary_lower or 0, reverse=True)
 
        return sorted_jobs
 
@@ -287,7 +303,7 @@ class BasicJobProcessor():
             # need to hook up the "resume provider" to the summarizer at some point in the future
             json_job = None
             while json_job is None:
-                json_job = self.summarizer.summarize(job.raw_description)
+                json_job = self.summarizer.summarize(job)
     
             if json_job is None:
                 logging.error("Failed to summarize job description")
@@ -312,12 +328,24 @@ class JobMultiProcessor(BasicJobProcessor):
 
     def __init__(self, config=RawConfigParser, scrapers=list[JobScraper], summarizer=GenAISummarizer, writers=list[JobWriter], sorter=JobSorter):
         self.scrapers = scrapers
-        self.summarizer = summarizer
+        # reposted & cross-posted jobs get their stored summary rather than another LLM call
+        self.summarizer = CachedSummarizer.wrap(summarizer, config)
         self.writers = writers
         self.sorter = sorter
         self.dev_mode = config["DEFAULT"].getboolean("DEV_MODE", fallback=False)
         self.dev_mode_limit = config["DEFAULT"].getint("DEV_MODE_JOB_LIMIT", fallback=2)
 
+        # every scraper shares the per-host rate limits, so they can run in parallel without getting banned
+        rate_limiter.configure(config)
+        # AIMD concurrency windows per source & LLM provider, capped by MAX_WORKERS
+        controllers.configure(config)
+        # tokens & requests per minute per LLM provider, shared by every summary in flight
+        llm_budgets.configure(config)
+
+        # postings already handed to the summarizer in this run, keyed by canonical URL
+        self._seen_urls = set()
+        self._seen_lock = threading.Lock()
+
     def getScrapers(self):
         return self.scrapers
     def getWriters(self):
@@ -326,6 +354,25 @@ class JobMultiProcessor(BasicJobProcessor):
         return self.summarizer
     def getSorter(self):
         return self.sorter
+
+    def _start_run(self):
+        """Forget the postings & fetches from any previous run"""
+        with self._seen_lock:
+            self._seen_urls = set()
+        fetch_flight.reset()
+
+    def _first_sighting(self, job) -> bool:
+        """False if another scraper or search already surfaced this posting in this run"""
+        if job.url is None:
+            return True
+
+        key = canonical_url(job.url)
+        with self._seen_lock:
+            if key in self._seen_urls:
+                logging.info(f"Skipping duplicate posting {key}")
+                return False
+            self._seen_urls.add(key)
+            return True
     
 
     def process_jobs(self) -> list[Job]:
@@ -334,6 +381,7 @@ class JobMultiProcessor(BasicJobProcessor):
         # 2. Output to all destinations by iterating over all the writers
 
         job_list = []
+        self._start_run()
 
         # 1. Scrape all jobs, iterating over all the scrapers
         # Move this to
@@ -349,6 +397,9 @@ class JobMultiProcessor(BasicJobProcessor):
                     if STOP:
                         break
 
+                    if not self._first_sighting(job):
+                        continue
+
                     job_scraper.fetch_job_details(job)
 
                     # Summarize the job
@@ -398,10 +449,17 @@ class JobMultiParallelProcessor(JobMultiProcessor):
         self.futures = []
         self.job_list = []
         self.max_workers = config["DEFAULT"].getint("MAX_WORKERS", fallback=5)
+        # trafilatura & the page parsing run in worker processes rather than on the scraper threads
+        self.cpu_stage = get_cpu_stage(config)
+        # many LLM summaries in flight at once rather than one per scraper thread
+        self.summary_stage = get_summary_stage(config)
+        # or every job of the run sent as one Batch API batch once the scrapers are done
+        self.batch_mode = getattr(self.summarizer, "batch_mode", False)
 
 
     def process_jobs(self) -> list[Job]:
         job_list = []
+        self._start_run()
 
         # Use ThreadPoolExecutor to run scrapers in parallel
         with ThreadPoolExecutor(max_workers=len(self.scrapers)) as executor:
@@ -419,6 +477,9 @@ class JobMultiParallelProcessor(JobMultiProcessor):
                 except Exception as e:
                     logging.error(f"{scraper.source}: Failed to fetch job listings. Error: {e}")
 
+        if self.batch_mode and job_list:
+            job_list = self.summarizer.summarize_batch(job_list)
+
         logging.info(f"Pre-sort job list {len(job_list)}")
         # Filter out None values
         job_list = [job for job in job_list if job is not None]
@@ -433,40 +494,35 @@ class JobMultiParallelProcessor(JobMultiProcessor):
             for job in job_list:
                 job_writer.write(job)
 
+        logging.info(f"Concurrency windows: {controllers.metrics()}")
+        logging.info(f"CPU stage: {self.cpu_stage.metrics()}")
+        logging.info(f"Summary stage: {self.summary_stage.metrics()}, LLM budgets: {llm_budgets.metrics()}")
+        logging.info(f"Prompt cache: {prompt_cache.metrics()}")
+        if isinstance(self.summarizer, CachedSummarizer):
+            logging.info(f"Summary cache: {self.summarizer.cache.metrics()}")
         return job_list
 
-    def _process_jobs_from_scraper(self, scraper, jobs):
-        """Process jobs from a single scraper."""
-        processed_jobs = []
-        STOP = False
-        dev_counter = 0
-
+    def _fetched(self, scraper, jobs):
+        """The jobs no other scraper has surfaced, with their details fetched"""
         for job in jobs:
-            if STOP:
-                break
-
-            scraper.fetch_job_details(job)
-
-            # Summarize the job
-            json_job = None
-            max_retries = 5
-            retries = 0
-            while json_job is None and retries < max_retries:
-                json_job = self.summarizer.summarize(job)
-                retries += 1
-
-            if json_job is None:
-                logging.error("Failed to summarize job description after multiple attempts.")
+            if not self._first_sighting(job):
                 continue
+            scraper.fetch_job_details(job)
+            yield job
 
-            processed_jobs.append(json_job)
-            dev_counter += 1
+    def _process_jobs_from_scraper(self, scraper, jobs):
+        """Process jobs from a single scraper."""
+        limit = self.dev_mode_limit if self.dev_mode else None
 
-            if self.dev_mode and dev_counter >= self.dev_mode_limit:
-                logging.info(f"Dev mode: stopping after {self.dev_mode_limit} jobs")
-                STOP = True
-                break
+        # the CPU stage cleans the next chunk of pages while the summary stage has the LLM requests for earlier ones in flight
+        prepared = self.cpu_stage.prepared(self._fetched(scraper, jobs))
+        if self.batch_mode:
+            # summarized in one batch by process_jobs
+            return list(islice(prepared, limit))
+        processed_jobs = list(self.summary_stage.summarized(self.summarizer, prepared, limit))
 
+        if limit is not None and len(processed_jobs) >= limit:
+            logging.info(f"Dev mode: stopping after {self.dev_mode_limit} jobs")
         return processed_jobs
 
 
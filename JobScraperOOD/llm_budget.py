@@ -0,0 +1,100 @@
+import logging
+import threading
+import time
+
+from compactor import count_tokens
+from rate_limiter import TokenBucket
+
+
+# Default LLM budget settings, 0 is no limit
+tokens_per_minute = 0
+requests_per_minute = 0
+output_tokens = 500     # tokens a reply is expected to use, counted against the budget with the input
+
+# The config section of each LLM provider's limits
+SECTIONS = {"llm:openai": "OpenAI", "llm:anthropic": "Anthropic", "llm:deepseek": "Deepseek"}
+
+
+class LLMBudget:
+    """
+    A provider's requests per minute & tokens per minute limits, as token buckets holding
+    a minute's worth. Each request reserves one request & its estimated tokens (the prompt
+    & compacted description it sends plus output_tokens for the reply) & waits until both
+    are available, so many requests in flight still stay under the provider's limits
+    rather than running into 429s.
+    """
+
+    def __init__(self, name, tokens_per_minute=tokens_per_minute, requests_per_minute=requests_per_minute, output_tokens=output_tokens):
+        self.name = name
+        self.output_tokens = max(0, int(output_tokens))
+        self.tokens = TokenBucket(tokens_per_minute / 60, tokens_per_minute) if tokens_per_minute > 0 else None
+        self.requests = TokenBucket(requests_per_minute / 60, requests_per_minute) if requests_per_minute > 0 else None
+
+        self.reserved_tokens = 0
+        self.reserved_requests = 0
+        self.waited = 0.0
+        self._lock = threading.Lock()
+
+    def estimate(self, *texts) -> int:
+        return sum(count_tokens(text) for text in texts if text) + self.output_tokens
+
+    def reserve(self, *texts) -> float:
+        """Reserve a request sending texts, returns the seconds to wait before sending it"""
+        tokens = self.estimate(*texts)
+        wait = 0.0
+        if self.requests is not None:
+            wait = max(wait, self.requests.reserve())
+        if self.tokens is not None:
+            wait = max(wait, self.tokens.reserve(tokens))
+        with self._lock:
+            self.reserved_tokens += tokens
+            self.reserved_requests += 1
+            self.waited += wait
+        return wait
+
+    def acquire(self, *texts):
+        """Block until a request sending texts fits in the budget"""
+        wait = self.reserve(*texts)
+        if wait > 0:
+            logging.debug(f"{self.name}: waiting {wait:.2f}s for the tokens per minute budget")
+            time.sleep(wait)
+
+    def metrics(self) -> dict:
+        with self._lock:
+            return {"requests": self.reserved_requests, "tokens": self.reserved_tokens, "waited": round(self.waited, 1)}
+
+
+class BudgetRegistry:
+    """One budget per LLM provider (llm:openai...)"""
+
+    def __init__(self):
+        self._limits = {}
+        self._budgets = {}
+        self._lock = threading.Lock()
+
+    def configure(self, config):
+        """Load TOKENS_PER_MINUTE, REQUESTS_PER_MINUTE & OUTPUT_TOKENS from each provider's section"""
+        with self._lock:
+            for name, section in SECTIONS.items():
+                if config.has_section(section):
+                    self._limits[name] = (
+                        config[section].getint("TOKENS_PER_MINUTE", fallback=tokens_per_minute),
+                        config[section].getint("REQUESTS_PER_MINUTE", fallback=requests_per_minute),
+                        config[section].getint("OUTPUT_TOKENS", fallback=output_tokens))
+            self._budgets = {}
+        logging.info(f"LLM budgets (tokens/min, requests/min, output tokens): {self._limits}")
+
+    def get(self, name) -> LLMBudget:
+        with self._lock:
+            if name not in self._budgets:
+                self._budgets[name] = LLMBudget(name, *self._limits.get(name, (tokens_per_minute, requests_per_minute, output_tokens)))
+            return self._budgets[name]
+
+    def metrics(self) -> dict:
+        with self._lock:
+            budgets = dict(self._budgets)
+        return {name: budget.metrics() for name, budget in budgets.items()}
+
+
+# The shared budgets for the whole process
+llm_budgets = BudgetRegistry()
@@ -0,0 +1,97 @@
+import atexit
+import logging
+import threading
+
+import openai
+
+try:
+    import anthropic
+except ImportError:
+    anthropic = None
+
+
+class LLMClients:
+    """
+    The process wide LLM SDK clients, one per provider, API key & base URL. Each client
+    holds a keep-alive connection pool, so after the first request a summary reuses an open
+    TLS connection rather than paying for a new handshake (a round trip or two to the
+    provider) every job. Closed when the process exits.
+    """
+
+    def __init__(self):
+        self._clients = {}
+        self._lock = threading.Lock()
+
+    def _get(self, key, create):
+        with self._lock:
+            if key not in self._clients:
+                logging.info(f"Creating a long-lived {key[0]} client")
+                self._clients[key] = create()
+            return self._clients[key]
+
+    def openai(self, api_key, base_url=None) -> "openai.OpenAI":
+        """An OpenAI client, or a client of an OpenAI compatible API e.g. Deepseek's with base_url"""
+        return self._get(("openai", api_key, base_url or None), lambda: openai.OpenAI(api_key=api_key, base_url=base_url or None))
+
+    def anthropic(self, api_key, base_url=None):
+        if anthropic is None:
+            raise ImportError("The anthropic package is needed for the Anthropic summarizer")
+        return self._get(("anthropic", api_key, base_url or None), lambda: anthropic.Anthropic(api_key=api_key, base_url=base_url or None))
+
+    def close(self):
+        with self._lock:
+            clients, self._clients = list(self._clients.values()), {}
+        for client in clients:
+            try:
+                client.close()
+            except Exception as e:
+                logging.debug(f"Error closing an LLM client: {e}")
+
+
+class PromptCacheStats:
+    """
+    How much of each provider's input was served from its prompt cache, from the usage
+    every response reports. The static instructions & schema go first in each request &
+    the job text last so the prefix is the same from job to job & can be cached
+    """
+
+    def __init__(self):
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def record(self, name, input_tokens, cached_tokens):
+        with self._lock:
+            stats = self._stats.setdefault(name, {"requests": 0, "input_tokens": 0, "cached_tokens": 0})
+            stats["requests"] += 1
+            stats["input_tokens"] += input_tokens or 0
+            stats["cached_tokens"] += cached_tokens or 0
+
+    def record_openai(self, name, usage):
+        """Responses API usage, or chat completions usage from an OpenAI compatible API"""
+        if usage is None:
+            return
+        input_tokens = getattr(usage, "input_tokens", None) or getattr(usage, "prompt_tokens", 0)
+        details = getattr(usage, "input_tokens_details", None) or getattr(usage, "prompt_tokens_details", None)
+        # Deepseek reports its cache hits on the usage itself
+        cached = getattr(usage, "prompt_cache_hit_tokens", None) or getattr(details, "cached_tokens", 0)
+        self.record(name, input_tokens, cached)
+
+    def record_anthropic(self, name, usage):
+        """Anthropic counts cache reads & writes apart from input_tokens, the uncached remainder"""
+        if usage is None:
+            return
+        cached = getattr(usage, "cache_read_input_tokens", 0) or 0
+        written = getattr(usage, "cache_creation_input_tokens", 0) or 0
+        self.record(name, (usage.input_tokens or 0) + cached + written, cached)
+
+    def metrics(self) -> dict:
+        with self._lock:
+            return {name: {**stats, "hit_rate": round(stats["cached_tokens"] / max(1, stats["input_tokens"]), 3)}
+                    for name, stats in self._stats.items()}
+
+
+# The shared clients & prompt cache counts for the whole process
+llm_clients = LLMClients()
+prompt_cache = PromptCacheStats()
+
+atexit.register(llm_clients.close)
@@ -0,0 +1,115 @@
+import json
+import logging
+import os
+import time
+
+from llm_clients import llm_clients
+
+
+# Default batch settings
+batch_directory = ".batches"
+batch_poll_interval = 60        # seconds between checks on a submitted batch
+batch_completion_window = "24h"
+
+BATCH_ENDPOINT = "/v1/responses"
+
+# Batch statuses that won't change again
+FINISHED = ("completed", "failed", "expired", "cancelled")
+
+
+def output_text(response_body) -> str:
+    """The text of a Responses API response body, what response.output_text gives for a live call"""
+    texts = []
+    for item in response_body.get("output") or []:
+        if item.get("type") != "message":
+            continue
+        for content in item.get("content") or []:
+            if content.get("type") == "output_text":
+                texts.append(content.get("text", ""))
+    return "".join(texts)
+
+
+class OpenAIBatch:
+    """
+    Runs a set of Responses API requests through the OpenAI Batch API: half the price
+    of the interactive calls & outside their rate limits, but the results can take up to
+    the completion window. The requests are written as JSONL to directory, uploaded &
+    submitted as one batch, which is polled until it finishes, then each result is
+    matched back to its request by custom id. base_url points the client at a stand-in
+    endpoint for tests.
+    """
+
+    def __init__(self, api_key, base_url=None, directory=batch_directory, poll_interval=batch_poll_interval):
+        self.directory = directory
+        self.poll_interval = max(0.0, float(poll_interval))
+        self.client = llm_clients.openai(api_key, base_url)
+
+    @classmethod
+    def from_config(cls, config_section, api_key):
+        """Build the batch runner from the [OpenAI] section"""
+        return cls(
+            api_key,
+            base_url=config_section.get("BATCH_BASE_URL", fallback=config_section.get("BASE_URL", fallback="")).strip("\"'"),
+            directory=config_section.get("BATCH_DIRECTORY", fallback=batch_directory).strip("\"'"),
+            poll_interval=config_section.getfloat("BATCH_POLL_INTERVAL", fallback=batch_poll_interval))
+
+    def write(self, requests) -> str:
+        """Write {custom id: request body} as a batch input file, returns its path"""
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, f"batch-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}.jsonl")
+        with open(path, "w", encoding="utf-8") as file:
+            for custom_id, body in requests.items():
+                file.write(json.dumps({"custom_id": custom_id, "method": "POST", "url": BATCH_ENDPOINT, "body": body}) + "\n")
+        return path
+
+    def submit(self, path) -> str:
+        """Upload the input file & start the batch, returns the batch id"""
+        with open(path, "rb") as file:
+            uploaded = self.client.files.create(file=file, purpose="batch")
+        batch = self.client.batches.create(
+            input_file_id=uploaded.id,
+            endpoint=BATCH_ENDPOINT,
+            completion_window=batch_completion_window,
+            metadata={"input": os.path.basename(path)})
+        logging.info(f"Submitted OpenAI batch {batch.id} from {path}")
+        return batch.id
+
+    def wait(self, batch_id):
+        """Poll the batch until it has finished, returns it"""
+        while True:
+            batch = self.client.batches.retrieve(batch_id)
+            if batch.status in FINISHED:
+                logging.info(f"OpenAI batch {batch_id} {batch.status}: {batch.request_counts}")
+                return batch
+            logging.info(f"OpenAI batch {batch_id} {batch.status}, checking again in {self.poll_interval:.0f}s")
+            time.sleep(self.poll_interval)
+
+    def results(self, batch) -> dict:
+        """{custom id: the parsed JSON the model returned} for the batch's successful requests"""
+        if batch.error_file_id:
+            errors = self.client.files.content(batch.error_file_id).text.splitlines()
+            logging.error(f"OpenAI batch {batch.id}: {len(errors)} requests failed")
+
+        results = {}
+        if not batch.output_file_id:
+            return results
+
+        for line in self.client.files.content(batch.output_file_id).text.splitlines():
+            if not line.strip():
+                continue
+            result = json.loads(line)
+            response = result.get("response") or {}
+            if result.get("error") or response.get("status_code") != 200:
+                logging.error(f"OpenAI batch request {result.get('custom_id')} failed: {result.get('error') or response.get('status_code')}")
+                continue
+            try:
+                results[result["custom_id"]] = json.loads(output_text(response.get("body") or {}))
+            except json.JSONDecodeError as e:
+                logging.error(f"Error parsing JSON from OpenAI batch request {result['custom_id']}: {e}")
+        return results
+
+    def run(self, requests) -> dict:
+        """Submit {custom id: request body} as one batch & wait for it, returns {custom id: parsed JSON}"""
+        if not requests:
+            return {}
+        return self.results(self.wait(self.submit(self.write(requests))))
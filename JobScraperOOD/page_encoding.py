@@ -0,0 +1,92 @@
+import codecs
+import logging
+import re
+
+try:
+    from charset_normalizer import from_bytes
+except ImportError:
+    from_bytes = None
+
+
+# Only the start of the page is searched for a <meta charset>, as browsers do
+SNIFF_BYTES = 4096
+
+BOMS = ((codecs.BOM_UTF8, "utf-8-sig"), (codecs.BOM_UTF16_LE, "utf-16"), (codecs.BOM_UTF16_BE, "utf-16"))
+
+_CONTENT_TYPE_CHARSET = re.compile(r"""charset\s*=\s*["']?([\w.:-]+)""", re.IGNORECASE)
+_META_CHARSET = re.compile(rb"""<meta[^>]+?charset\s*=\s*["']?\s*([\w.:-]+)""", re.IGNORECASE)
+_XML_ENCODING = re.compile(rb"""^\s*<\?xml[^>]+encoding\s*=\s*["']([\w.:-]+)""")
+
+
+class PageBody(bytes):
+    """
+    A page body exactly as it was downloaded, plus the charset its Content-Type header
+    declared (None if it didn't). Still bytes, so it can go anywhere the body could,
+    & decode_body() uses the charset
+    """
+
+    def __new__(cls, content, charset=None):
+        body = super().__new__(cls, content)
+        body.charset = charset
+        return body
+
+    def __reduce__(self):
+        # keep the charset when the body is pickled to a CPU stage worker
+        return PageBody, (bytes(self), self.charset)
+
+    @classmethod
+    def from_response(cls, response):
+        """The body of a requests or httpx response with its declared charset"""
+        return cls(response.content, content_type_charset(response.headers.get("Content-Type")))
+
+
+def content_type_charset(content_type):
+    match = _CONTENT_TYPE_CHARSET.search(content_type or "")
+    return match.group(1) if match else None
+
+
+def sniff_charset(body):
+    """The charset a page declares itself: a byte order mark, an XML declaration or a <meta charset>"""
+    head = bytes(body[:SNIFF_BYTES])
+    for bom, charset in BOMS:
+        if head.startswith(bom):
+            return charset
+    match = _XML_ENCODING.match(head) or _META_CHARSET.search(head)
+    return match.group(1).decode("ascii") if match else None
+
+
+def _decode(body, charset):
+    try:
+        return str(body, charset)
+    except (LookupError, UnicodeDecodeError):
+        return None
+
+
+def decode_body(body, charset=None) -> str:
+    """
+    Decode a raw page body (bytes, a PageBody or a memoryview) to text, once, so cleaning,
+    parsing & token counting all work on the real characters rather than a b'...' repr
+    or a latin-1 guess. The charset is, in order: a byte order mark, the one passed in or
+    declared by the Content-Type, the page's own declaration, utf-8, then whatever
+    charset_normalizer detects. Text is returned as is
+    """
+    if body is None or isinstance(body, str):
+        return body
+
+    bom = sniff_charset(body[:4])
+    candidates = [bom] if bom else []
+    candidates += [charset or getattr(body, "charset", None), sniff_charset(body), "utf-8"]
+    for candidate in candidates:
+        if candidate:
+            text = _decode(body, candidate)
+            if text is not None:
+                return text
+
+    if from_bytes is not None:
+        best = from_bytes(bytes(body)).best()
+        if best is not None:
+            logging.debug(f"Decoding a page as {best.encoding}, detected")
+            return str(best)
+
+    logging.debug("Couldn't work out the page's charset, decoding as cp1252")
+    return str(body, "cp1252", errors="replace")
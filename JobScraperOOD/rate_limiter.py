@@ -0,0 +1,145 @@
+import asyncio
+import logging
+import threading
+import time
+
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+from urllib.parse import urlparse
+
+
+# Default rate limit settings, requests per second & burst size per host
+default_rate = 2.0
+default_burst = 5
+
+# Wait used when a 429 arrives without a usable Retry-After header
+default_retry_after = 30
+
+
+def parse_retry_after(value, fallback=default_retry_after) -> float:
+    """
+    Converts a Retry-After header into a number of seconds to wait.
+    The header is either a number of seconds or an HTTP date.
+    """
+    if value is None:
+        return fallback
+
+    value = str(value).strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        logging.warning("Unable to parse Retry-After header: %s", value)
+        return fallback
+
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+class TokenBucket:
+    """
+    Thread safe token bucket. Tokens refill at `rate` per second up to `burst`.
+    Callers reserve a token and are told how long to wait for it, so queued
+    callers are spaced out at the refill rate rather than all waking together.
+    """
+
+    def __init__(self, rate=default_rate, burst=default_burst):
+        self.rate = float(rate)
+        self.burst = max(1, int(burst))
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def reserve(self, tokens=1) -> float:
+        """Take tokens (one request by default) & return the number of seconds the caller must wait before using them"""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= tokens
+
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+            return max(wait, self.blocked_until - now)
+
+    def block(self, seconds):
+        """Stop handing out usable tokens for `seconds` e.g. after a 429"""
+        with self._lock:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+            self.tokens = min(self.tokens, 0.0)
+
+
+class HostRateLimiter:
+    """
+    Process wide rate limiter keyed by host. Every scraper draws from the same
+    buckets, so parallel scrapers hitting the same site share its budget.
+    """
+
+    def __init__(self, rate=default_rate, burst=default_burst):
+        self.rate = rate
+        self.burst = burst
+        self.host_limits = {}
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def configure(self, config):
+        """
+        Load the limits from the [RateLimit] config section. DEFAULT_RATE & DEFAULT_BURST apply
+        to every host, individual hosts are set with `host = rate, burst` e.g. www.dice.com = 1, 3
+        """
+        if not config.has_section("RateLimit"):
+            return
+
+        section = config["RateLimit"]
+        self.rate = section.getfloat("DEFAULT_RATE", fallback=self.rate)
+        self.burst = section.getint("DEFAULT_BURST", fallback=self.burst)
+
+        for key in config.options("RateLimit"):
+            # hosts are the only keys with a dot in them
+            if "." not in key:
+                continue
+            rate, _, burst = section[key].partition(",")
+            self.host_limits[key.lower()] = (float(rate), int(burst or self.burst))
+
+        with self._lock:
+            self._buckets = {}
+
+        logging.info(f"Rate limits: default {self.rate}/s burst {self.burst}, hosts {self.host_limits}")
+
+    def bucket(self, url) -> TokenBucket:
+        host = (urlparse(url).hostname or url).lower()
+        with self._lock:
+            if host not in self._buckets:
+                rate, burst = self.host_limits.get(host, (self.rate, self.burst))
+                self._buckets[host] = TokenBucket(rate, burst)
+            return self._buckets[host]
+
+    def acquire(self, url):
+        """Block until a request to url's host is allowed"""
+        wait = self.bucket(url).reserve()
+        if wait > 0:
+            logging.debug(f"Rate limiting {url} for {wait:.2f}s")
+            time.sleep(wait)
+
+    async def acquire_async(self, url):
+        """Asyncio version of acquire"""
+        wait = self.bucket(url).reserve()
+        if wait > 0:
+            logging.debug(f"Rate limiting {url} for {wait:.2f}s")
+            await asyncio.sleep(wait)
+
+    def penalize(self, url, retry_after=None) -> float:
+        """Back off url's host after a 429, honouring the Retry-After header. Returns the wait in seconds"""
+        seconds = parse_retry_after(retry_after)
+        logging.warning(f"Rate limit exceeded for {urlparse(url).hostname}, backing off {seconds:.0f}s")
+        self.bucket(url).block(seconds)
+        return seconds
+
+
+# The shared limiter all the scrapers draw from
+rate_limiter = HostRateLimiter()
@@ -0,0 +1,55 @@
+import logging
+
+from selenium.common.exceptions import TimeoutException, WebDriverException
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+
+
+# Default seconds to wait for a rendered page before giving up
+render_timeout = 15
+render_poll_frequency = 0.1
+
+
+def css_present(selector):
+    """Condition: an element matching the CSS selector is in the DOM"""
+    def condition(driver):
+        return len(driver.find_elements(By.CSS_SELECTOR, selector)) > 0
+    return condition
+
+
+def url_contains(fragment):
+    """Condition: the browser has ended up on a URL containing fragment (e.g. after a redirect)"""
+    def condition(driver):
+        return fragment in driver.current_url
+    return condition
+
+
+def all_of(*conditions):
+    def condition(driver):
+        return all(check(driver) for check in conditions)
+    return condition
+
+
+def wait_for_any(driver, conditions, timeout=render_timeout):
+    """
+    Wait until the first of several DOM conditions is met & return its name, or None on timeout.
+
+    conditions maps a name to a callable taking the driver. They are all checked on every
+    poll, so e.g. redirect detection runs alongside the wait for the job cards rather than
+    after it has timed out.
+    """
+    def first_match(driver):
+        for name, condition in conditions.items():
+            try:
+                if condition(driver):
+                    return name
+            except WebDriverException:
+                # the page is mid navigation, try again on the next poll
+                continue
+        return False
+
+    try:
+        return WebDriverWait(driver, timeout, poll_frequency=render_poll_frequency).until(first_match)
+    except TimeoutException:
+        logging.warning(f"Timed out after {timeout}s waiting for any of {list(conditions)}")
+        return None
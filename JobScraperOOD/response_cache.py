@@ -0,0 +1,241 @@
+import gzip
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from contextlib import contextmanager
+
+from page_encoding import PageBody, content_type_charset, decode_body
+from singleflight import canonical_url
+
+
+# Default cache settings
+cache_directory = ".http_cache"
+cache_ttl = 24 * 60 * 60    # seconds before a page is revalidated
+cache_max_size_mb = 200
+
+
+class CachedResponse:
+    """The parts of a requests.Response the scrapers use, served from the cache"""
+
+    def __init__(self, url, content, status_code=200, headers=None):
+        self.url = url
+        self.content = content
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.from_cache = True
+
+    @property
+    def text(self):
+        return decode_body(self.content, content_type_charset(self.headers.get("Content-Type")))
+
+
+class CacheEntry:
+    def __init__(self, row):
+        (self.url_key, self.url, self.body_hash, self.etag, self.last_modified,
+         self.stored_at, self.last_access, self.size, self.content_type) = row
+
+    @property
+    def headers(self) -> dict:
+        # the Content-Type is kept so a cached page decodes with the charset it was served with
+        return {"Content-Type": self.content_type} if self.content_type else {}
+
+
+class ResponseCache:
+    """
+    On-disk HTTP response cache for job detail pages.
+
+    Bodies are stored gzip compressed & content addressed (named by the sha256 of
+    the body), so the same page reached through different URLs is stored once.
+    An SQLite index maps each URL to its body & validators. Fresh entries (younger
+    than ttl) are served without a request, stale ones are revalidated with
+    If-None-Match / If-Modified-Since. When the bodies grow past max_size the least
+    recently used entries are evicted.
+    """
+
+    def __init__(self, directory=cache_directory, ttl=cache_ttl, max_size=cache_max_size_mb * 1024 * 1024):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_size = max_size
+        self.hits = 0
+        self.revalidations = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        os.makedirs(self.directory, exist_ok=True)
+        self._index = os.path.join(self.directory, "index.sqlite")
+
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS entries (
+                    url_key TEXT PRIMARY KEY,
+                    url TEXT,
+                    body_hash TEXT,
+                    etag TEXT,
+                    last_modified TEXT,
+                    stored_at REAL,
+                    last_access REAL,
+                    size INTEGER,
+                    content_type TEXT)""")
+            columns = [row[1] for row in conn.execute("PRAGMA table_info(entries)")]
+            if "content_type" not in columns:
+                # an index written before the Content-Type was stored
+                conn.execute("ALTER TABLE entries ADD COLUMN content_type TEXT")
+
+    @classmethod
+    def from_config(cls, config):
+        """Build the cache from the [Cache] section, returns None if the cache is disabled"""
+        if not config.has_section("Cache"):
+            return cls()
+
+        section = config["Cache"]
+        if not section.getboolean("ENABLED", fallback=True):
+            logging.info("HTTP response cache disabled")
+            return None
+
+        return cls(
+            directory=section.get("DIRECTORY", fallback=cache_directory).strip("\"'"),
+            ttl=section.getint("TTL", fallback=cache_ttl),
+            max_size=section.getint("MAX_SIZE_MB", fallback=cache_max_size_mb) * 1024 * 1024)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self._index, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def key(url) -> str:
+        # tracking parameters change on every search, so key on the canonical URL
+        return hashlib.sha256(canonical_url(url).encode("utf-8")).hexdigest()
+
+    def _body_path(self, body_hash):
+        return os.path.join(self.directory, body_hash[:2], body_hash + ".gz")
+
+    def lookup(self, url) -> CacheEntry:
+        with self._lock, self._connect() as conn:
+            row = conn.execute("SELECT * FROM entries WHERE url_key = ?", (self.key(url),)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        entry = CacheEntry(row)
+        if not os.path.exists(self._body_path(entry.body_hash)):
+            self.misses += 1
+            return None
+        return entry
+
+    def is_fresh(self, entry) -> bool:
+        return entry is not None and time.time() - entry.stored_at < self.ttl
+
+    def conditional_headers(self, entry) -> dict:
+        headers = {}
+        if entry is not None:
+            if entry.etag:
+                headers["If-None-Match"] = entry.etag
+            if entry.last_modified:
+                headers["If-Modified-Since"] = entry.last_modified
+        return headers
+
+    def read(self, entry) -> bytes:
+        with open(self._body_path(entry.body_hash), "rb") as file:
+            body = gzip.decompress(file.read())
+        with self._lock, self._connect() as conn:
+            conn.execute("UPDATE entries SET last_access = ? WHERE url_key = ?", (time.time(), entry.url_key))
+        return body
+
+    def get(self, url) -> CachedResponse:
+        """Return the cached response if it is still fresh, otherwise None"""
+        return self.begin(url)[0]
+
+    def begin(self, url):
+        """
+        Call before requesting url. Returns (response, entry, headers): response is the cached
+        copy if it is still fresh, otherwise send headers with the request & pass entry to finish()
+        """
+        entry = self.lookup(url)
+        if self.is_fresh(entry):
+            self.hits += 1
+            return CachedResponse(url, self.read(entry), headers=entry.headers), entry, {}
+        return None, entry, self.conditional_headers(entry)
+
+    def finish(self, url, entry, response):
+        """Call with the requests/httpx response. Stores a 200 & turns a 304 into the cached body"""
+        if response.status_code == 304 and entry is not None:
+            return self.revalidated(url, entry, response.headers)
+        if response.status_code == 200:
+            self.store(url, response.content, response.headers)
+        return response
+
+    def store(self, url, body, headers=None):
+        headers = headers or {}
+        body_hash = hashlib.sha256(body).hexdigest()
+        path = self._body_path(body_hash)
+
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # write then rename so a crash never leaves a truncated body behind
+            temp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(temp_path, "wb") as file:
+                file.write(gzip.compress(body))
+            os.replace(temp_path, path)
+
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (self.key(url), canonical_url(url), body_hash, headers.get("ETag"), headers.get("Last-Modified"), now, now,
+                 os.path.getsize(path), headers.get("Content-Type")))
+
+        self.evict()
+
+    def revalidated(self, url, entry, headers=None) -> CachedResponse:
+        """The server answered 304 Not Modified, restart the entry's ttl & serve the stored body"""
+        headers = headers or {}
+        self.revalidations += 1
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "UPDATE entries SET stored_at = ?, etag = COALESCE(?, etag), last_modified = COALESCE(?, last_modified) WHERE url_key = ?",
+                (time.time(), headers.get("ETag"), headers.get("Last-Modified"), entry.url_key))
+        return CachedResponse(url, self.read(entry), headers=entry.headers)
+
+    def evict(self):
+        """Drop the least recently used entries until the stored bodies fit in max_size"""
+        with self._lock, self._connect() as conn:
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM (SELECT DISTINCT body_hash, size FROM entries)").fetchone()[0]
+            if total <= self.max_size:
+                return
+
+            rows = conn.execute("SELECT url_key, body_hash, size FROM entries ORDER BY last_access").fetchall()
+            for url_key, body_hash, size in rows:
+                if total <= self.max_size:
+                    break
+                conn.execute("DELETE FROM entries WHERE url_key = ?", (url_key,))
+                # only remove the body once no other URL points at it
+                if conn.execute("SELECT 1 FROM entries WHERE body_hash = ?", (body_hash,)).fetchone() is None:
+                    try:
+                        os.remove(self._body_path(body_hash))
+                    except FileNotFoundError:
+                        pass
+                    total -= size
+
+        logging.debug(f"HTTP cache evicted down to {total} bytes")
+
+    def pages(self):
+        """(url, body) for every cached page, for offline tools like site_template.py"""
+        with self._connect() as conn:
+            rows = conn.execute("SELECT url, body_hash, content_type FROM entries ORDER BY stored_at").fetchall()
+        for url, body_hash, content_type in rows:
+            try:
+                with open(self._body_path(body_hash), "rb") as file:
+                    yield url, PageBody(gzip.decompress(file.read()), content_type_charset(content_type))
+            except FileNotFoundError:
+                continue
+
+    def metrics(self) -> dict:
+        return {"hits": self.hits, "revalidations": self.revalidations, "misses": self.misses}
@@ -0,0 +1,188 @@
+import re
+
+from html_parser import HtmlParser
+
+
+# Multipliers from a pay period to a working year
+PERIODS = {
+    "hour": 2080, "hr": 2080, "hourly": 2080,
+    "day": 260, "daily": 260,
+    "week": 52, "wk": 52, "weekly": 52,
+    "month": 12, "mo": 12, "monthly": 12,
+    "year": 1, "yr": 1, "annum": 1, "annual": 1, "annually": 1, "annualized": 1,
+}
+
+# Annual salaries outside this range are page furniture ($5 gift cards, $10M funding rounds...)
+min_annual_salary = 10000
+max_annual_salary = 2000000
+
+# With no pay period, an amount below this is taken to be an hourly rate
+hourly_below = 500
+
+# A lone amount with no pay period needs one of these words in the cue_chars before it
+PAY_CUES = re.compile(r"\b(?:compensation|salary|salaries|pay|paid|wages?|earn|earnings|income|base|OTE)\b", re.IGNORECASE)
+cue_chars = 60
+
+# An amount followed by one of these is a one off payment, not a salary ("$10,000 relocation bonus")
+ONE_OFF = re.compile(
+    r"\s*(?:(?:signing|sign-on|joining|relocation|referral|retention|annual|one-time|home\s+office|learning|wellness)\s+)?"
+    r"(?:bonus|stipend|allowance|relocation)\b",
+    re.IGNORECASE)
+
+# Default salary snippet windows, see salary_snippets
+snippet_chars = 200
+max_snippets = 6
+
+# Where a page talks about pay: an amount or the words around one
+SNIPPET_CUES = re.compile(
+    r"[$£€]\s?\d|\b(?:compensation|salary|salaries|pay\s+(?:range|rate|band|scale)|base\s+pay|wages?|hourly\s+rate|OTE)\b",
+    re.IGNORECASE)
+
+_parser = HtmlParser()
+
+
+def _amount(name, currency=True):
+    # the lookahead skips "$50M" & "$2 billion" rather than matching a prefix of them
+    return (rf"""(?P<{name}_currency>[$£€]){'' if currency else '?'}\s?"""
+            r"""(?![\d,]*(?:\.\d+)?\s?(?:mm?|b|bn|million|billion)\b)"""
+            rf"""(?P<{name}>(?:\d{{1,3}}(?:,\d{{3}})+|\d+)(?:\.\d{{1,2}})?)(?!\.?\d)\s?(?P<{name}_k>k\b)?""")
+
+
+_PERIOD = r"""(?:\s*(?:/|per|an?)\s*(?P<{name}_period>hour|hr|day|week|wk|month|mo|year|yr|annum)\b|\s+(?P<{name}_adverb>hourly|daily|weekly|monthly|annually|annualized)\b)?"""
+
+# One compiled pattern covering "$120,000 - $150,000", "$120K/yr to $150K/yr", "$60.50 — $75.00 per hour",
+# "$150,000/year in our lowest geographic market up to $200,000", "starting at $95,000" & "up to $200,000"
+SALARY_PATTERN = re.compile(
+    rf"""
+    (?:(?P<starting>\b(?:starting\s+(?:at|from)|from|minimum\s+of)\s+)|(?P<ceiling>\b(?:up\s+to|maximum\s+of)\s+))?
+    (?P<single>{_amount("low")}{_PERIOD.format(name="low")})
+    (?:
+        (?:\s*(?:-|–|—|to|and)\s*|[^$£€\n]{{0,80}}?\bup\s+to\s+)
+        {_amount("high", currency=False)}{_PERIOD.format(name="high")}
+    )?
+    """,
+    re.IGNORECASE | re.VERBOSE)
+
+
+def _value(match, name):
+    value = match.group(name)
+    if value is None:
+        return None
+    value = float(value.replace(",", ""))
+    if match.group(f"{name}_k"):
+        value *= 1000
+    return value
+
+
+def _period(match, name):
+    period = match.group(f"{name}_period") or match.group(f"{name}_adverb")
+    return period.lower() if period else None
+
+
+def _cued(match) -> bool:
+    return PAY_CUES.search(match.string, max(0, match.start() - cue_chars), match.start()) is not None
+
+
+def parse_salary(match, known_salary=False):
+    """
+    (salary text, annual lower, annual upper) for a SALARY_PATTERN match, None if it isn't a
+    plausible salary. A lone "up to" amount is a ceiling, its lower is None, & a lone
+    "starting at" amount a floor, its upper is None. Unless known_salary, a lone amount
+    with no pay period needs a PAY_CUES word shortly before it
+    """
+    if ONE_OFF.match(match.string, match.end()):
+        return None
+
+    lower = _value(match, "low")
+    upper = _value(match, "high")
+    # "$120-150K"
+    if match.group("high_k") and not match.group("low_k") and lower < 1000:
+        lower *= 1000
+
+    # a lone amount, or "$90,000 and 5 years" which isn't a range
+    ranged = upper is not None and upper >= lower
+    if ranged:
+        period = _period(match, "high") or _period(match, "low")
+        text = match.group(0)
+    else:
+        upper = lower
+        period = _period(match, "low")
+        text = match.string[match.start():match.end("single")]
+        bounded = match.group("starting") or match.group("ceiling")
+        if period is None and not (known_salary or bounded or _cued(match)):
+            return None
+
+    if period is None:
+        if upper >= hourly_below:
+            period = "year"
+        elif ranged:
+            # "$45 - $60" on its own is an hourly range
+            period = "hour"
+        else:
+            # a lone "$100" is a stipend or a gift card, not a salary
+            return None
+
+    multiplier = PERIODS[period]
+    lower, upper = round(lower * multiplier), round(upper * multiplier)
+    if lower < min_annual_salary or upper > max_annual_salary:
+        return None
+
+    if match.group("ceiling") and not ranged:
+        lower = None
+    elif match.group("starting") and not ranged:
+        upper = None
+    return " ".join(text.split()), lower, upper
+
+
+def extract_salary(text, known_salary=False) -> dict:
+    """
+    Find the salary in a job description & normalise it to annual integers.
+    Returns {"salary", "salary_lower", "salary_upper"} or an empty dict. A range is
+    preferred to a single amount, otherwise the first plausible match wins. known_salary
+    is for text that is only a salary, e.g. a card's salary line, see parse_salary
+    """
+    if not text:
+        return {}
+
+    single = None
+    for match in SALARY_PATTERN.finditer(text):
+        parsed = parse_salary(match, known_salary)
+        if parsed is None:
+            continue
+        salary, lower, upper = parsed
+        if None not in (lower, upper) and lower != upper:
+            return {"salary": salary, "salary_lower": lower, "salary_upper": upper}
+        if single is None:
+            single = {"salary": salary, "salary_lower": lower, "salary_upper": upper}
+
+    return single or {}
+
+
+def page_text(raw_description) -> str:
+    """The visible text of a page, without the scripts & styles"""
+    document = _parser.parse(raw_description)
+    for node in document.select("script, style, noscript, template"):
+        node.decompose()
+    return " ".join(document.get_text(" ", strip=True).split())
+
+
+def salary_snippets(raw_description, chars=snippet_chars, limit=max_snippets) -> list[str]:
+    """
+    The windows of the page's text around its mentions of pay, chars either side of each
+    cue with overlapping windows merged & at most limit of them, in page order. A few
+    hundred characters for an LLM to find the salary in rather than the whole page
+    """
+    if not raw_description:
+        return []
+
+    text = page_text(raw_description)
+    windows = []
+    for match in SNIPPET_CUES.finditer(text):
+        start, end = max(0, match.start() - chars), min(len(text), match.end() + chars)
+        if windows and start <= windows[-1][1]:
+            windows[-1][1] = end
+        elif len(windows) == limit:
+            break
+        else:
+            windows.append([start, end])
+    return [text[start:end] for start, end in windows]
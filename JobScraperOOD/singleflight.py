@@ -0,0 +1,111 @@
+import asyncio
+import logging
+import threading
+
+from concurrent.futures import Future
+from urllib.parse import urlparse, parse_qsl, urlencode, urlunparse
+
+
+# Query parameters that only track how a posting was reached, not which posting it is
+TRACKING_PARAMS = {"refid", "trackingid", "trk", "trkinfo", "position", "pagenum", "lipi", "midtoken", "midsig", "originalsubdomain", "ebp"}
+
+
+def canonical_url(url) -> str:
+    """
+    Normalise a job URL so the same posting reached from different searches compares equal.
+    Drops tracking parameters (refId, trackingId, utm_*...) & the fragment, lower cases the
+    scheme & host and sorts the remaining query parameters.
+    """
+    if not url:
+        return url
+
+    url = url.strip().strip("\"'")
+    url_parts = urlparse(url)
+    query = [(name, value) for name, value in parse_qsl(url_parts.query, keep_blank_values=True)
+             if name.lower() not in TRACKING_PARAMS and not name.lower().startswith("utm_")]
+
+    return urlunparse((
+        url_parts.scheme.lower(),
+        url_parts.netloc.lower(),
+        url_parts.path.rstrip("/") or "/",
+        url_parts.params,
+        urlencode(sorted(query)),
+        ""))
+
+
+class SingleFlight:
+    """
+    Request coalescing keyed by canonical URL. The first caller for a URL does the fetch,
+    concurrent callers for the same URL wait for its result & later callers in the run
+    reuse it. Failures (exceptions or None) are shared with the waiters but not kept, so
+    the next caller tries again.
+
+    Works across threads & event loops: the in-flight call is a concurrent.futures.Future,
+    which blocking callers wait on directly & async callers wrap.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.shared = 0
+
+    def _claim(self, key):
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                self.shared += 1
+                return future, False
+            future = Future()
+            self._calls[key] = future
+            return future, True
+
+    def _settle(self, key, future, result=None, error=None):
+        if error is not None or result is None:
+            with self._lock:
+                self._calls.pop(key, None)
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def do(self, url, fn):
+        """Return fn() for url, sharing the call with anyone else asking for the same URL"""
+        key = canonical_url(url)
+        future, owner = self._claim(key)
+        if not owner:
+            logging.debug(f"Sharing in-flight fetch for {key}")
+            return future.result()
+
+        try:
+            result = fn()
+        except BaseException as e:
+            self._settle(key, future, error=e)
+            raise
+        self._settle(key, future, result=result)
+        return result
+
+    async def do_async(self, url, coro_fn):
+        """Async version of do, coro_fn is called to create the coroutine that does the fetch"""
+        key = canonical_url(url)
+        future, owner = self._claim(key)
+        if not owner:
+            logging.debug(f"Sharing in-flight fetch for {key}")
+            return await asyncio.wrap_future(future)
+
+        try:
+            result = await coro_fn()
+        except BaseException as e:
+            self._settle(key, future, error=e)
+            raise
+        self._settle(key, future, result=result)
+        return result
+
+    def reset(self):
+        """Forget the results of the previous run"""
+        with self._lock:
+            self._calls = {}
+            self.shared = 0
+
+
+# Job detail page fetches shared by every scraper in the process
+fetch_flight = SingleFlight()
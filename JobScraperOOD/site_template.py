@@ -0,0 +1,255 @@
+import glob
+import hashlib
+import json
+import logging
+import math
+import os
+import re
+import threading
+
+from argparse import ArgumentParser
+from collections import Counter
+from urllib.parse import urlparse
+
+import trafilatura
+
+try:
+    import lxml.html
+    from lxml import etree
+except ImportError:
+    lxml = None
+
+from page_encoding import decode_body
+
+
+# Default template settings
+template_directory = ".templates"
+template_min_pages = 3      # pages of a source seen before its template is learned
+template_min_share = 0.6    # share of those pages a block has to be on to be part of the template
+
+# Blocks with less text than this (e.g. a lone "Apply" link) are too generic to strip
+MIN_BLOCK_CHARS = 20
+
+# Never stripped: the head holds the JSON-LD & meta tags structured_data reads
+SKIP_TAGS = ("html", "head", "body", "script", "style", "noscript", "template")
+
+_DIGITS = re.compile(r"\d+")
+
+
+def _normalise(text) -> str:
+    # counts & dates change between visits ("12 applicants", "3 days ago"), the block doesn't
+    return _DIGITS.sub("0", " ".join(text.split()).lower()) if text else ""
+
+
+def block_hashes(document) -> dict:
+    """
+    A hash of every element's subtree (its tag, classes, text & children, Merkle style) so
+    the same navigation, footer or "similar jobs" block hashes the same on every page it
+    is on. Returns {element: (hash, characters of text)} for the elements in the body
+    """
+    hashes = {}
+    body = document.find("body")
+    if body is None:
+        return hashes
+
+    # children before their parents
+    for element in reversed(list(body.iter())):
+        if not isinstance(element.tag, str) or element.tag in SKIP_TAGS:
+            continue
+        digest = hashlib.blake2b(digest_size=8)
+        digest.update(element.tag.encode())
+        digest.update(" ".join(sorted((element.get("class") or "").split())).encode())
+        text = _normalise(element.text)
+        digest.update(text.encode())
+        size = len(text)
+        for child in element:
+            child_hash = hashes.get(child)
+            if child_hash is not None:
+                digest.update(child_hash[0].encode())
+                size += child_hash[1]
+            tail = _normalise(child.tail)
+            digest.update(tail.encode())
+            size += len(tail)
+        hashes[element] = (digest.hexdigest(), size)
+    return hashes
+
+
+def page_blocks(document) -> set:
+    """The hashes of the page's blocks worth learning a template from"""
+    return {block for block, size in block_hashes(document).values() if size >= MIN_BLOCK_CHARS}
+
+
+def strip_template(document, template) -> int:
+    """Remove the outermost blocks of document in template, returns how many were removed"""
+    if not template:
+        return 0
+    hashes = block_hashes(document)
+    removed = 0
+    body = document.find("body")
+    stack = list(body) if body is not None else []
+    while stack:
+        element = stack.pop()
+        found = hashes.get(element)
+        if found is not None and found[0] in template:
+            element.drop_tree()
+            removed += 1
+        else:
+            stack.extend(element)
+    return removed
+
+
+def to_html(document) -> str:
+    return etree.tostring(document, encoding="unicode", method="html")
+
+
+def parse(raw_description):
+    """An lxml tree of the page, None if it can't be parsed or lxml isn't installed"""
+    if not raw_description or lxml is None:
+        return None
+    # lxml would guess latin-1 for bytes without a charset meta tag
+    raw_description = decode_body(raw_description)
+    try:
+        return lxml.html.document_fromstring(raw_description)
+    except ValueError:
+        # lxml won't take a str with an encoding declaration
+        return lxml.html.document_fromstring(raw_description.encode("utf-8"))
+    except etree.ParserError:
+        return None
+
+
+class TemplateStore:
+    """
+    Learns each source's page template: the blocks (navigation, footers, "similar jobs",
+    sign in prompts...) on at least min_share of the first min_pages pages seen from the
+    source. Once learned the template is saved in directory & the matching blocks are
+    stripped from every new page of that source before it is cleaned for the summarizer.
+    Delete a source's file to relearn it.
+    """
+
+    def __init__(self, directory=template_directory, min_pages=template_min_pages, min_share=template_min_share):
+        self.directory = directory
+        self.min_pages = max(2, int(min_pages))
+        self.min_share = float(min_share)
+
+        self._templates = {}
+        self._samples = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config):
+        """Build the store from the [Templates] section, returns None unless ENABLED & lxml is installed"""
+        if config is None or not config.has_section("Templates"):
+            return None
+        section = config["Templates"]
+        if not section.getboolean("ENABLED", fallback=False):
+            return None
+        if lxml is None:
+            logging.warning("Site templates need lxml, install it to strip the templates")
+            return None
+        return cls(
+            directory=section.get("DIRECTORY", fallback=template_directory).strip("\"'"),
+            min_pages=section.getint("MIN_PAGES", fallback=template_min_pages),
+            min_share=section.getfloat("MIN_SHARE", fallback=template_min_share))
+
+    def _path(self, source) -> str:
+        return os.path.join(self.directory, re.sub(r"[^\w-]", "_", source) + ".json")
+
+    def template(self, source):
+        """The learned template of source as a frozenset of block hashes, None while it is still learning"""
+        with self._lock:
+            if source not in self._templates:
+                self._templates[source] = None
+                path = self._path(source)
+                if os.path.exists(path):
+                    with open(path, "r", encoding="utf-8") as file:
+                        self._templates[source] = frozenset(json.load(file)["blocks"])
+                    logging.info(f"Loaded the {source} page template from {path}")
+            return self._templates[source]
+
+    def observe(self, source, blocks):
+        """Add one page's block hashes to the sample of a source that is still learning"""
+        if blocks is None or self.template(source) is not None:
+            return
+        with self._lock:
+            sample = self._samples.setdefault(source, [])
+            sample.append(blocks)
+            if len(sample) < self.min_pages:
+                return
+            template = self.learn(sample, self.min_share)
+            del self._samples[source]
+            self._templates[source] = template
+
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self._path(source), "w", encoding="utf-8") as file:
+            json.dump({"source": source, "pages": self.min_pages, "blocks": sorted(template)}, file)
+        logging.info(f"Learned the {source} page template, {len(template)} blocks from {self.min_pages} pages")
+
+    @staticmethod
+    def learn(samples, min_share=template_min_share) -> frozenset:
+        """The blocks on at least min_share (& at least two) of the sampled pages"""
+        counts = Counter(block for blocks in samples for block in blocks)
+        needed = max(2, math.ceil(min_share * len(samples)))
+        return frozenset(block for block, count in counts.items() if count >= needed)
+
+
+def _text(cleaned) -> str:
+    return " ".join(cleaned.split()) if cleaned else ""
+
+
+def main():
+    parser = ArgumentParser(description="Learn page templates from saved pages & show how much they strip from each source")
+    parser.add_argument("pages", nargs="*", help="SOURCE=PATH, the path may be a glob e.g. LinkedIn=../job.txt LinkedIn=../page.html")
+    parser.add_argument("--cache", help="also use the job pages in this HTTP cache directory, one source per host")
+    parser.add_argument("--min-share", type=float, default=template_min_share, help="share of pages a block has to be on")
+    args = parser.parse_args()
+    if not args.pages and not args.cache:
+        parser.error("give SOURCE=PATH pages or --cache")
+
+    sources = {}
+    if args.cache:
+        from response_cache import ResponseCache
+        for url, body in ResponseCache(args.cache).pages():
+            sources.setdefault(urlparse(url).netloc, []).append((url, body))
+
+    for page in args.pages:
+        source, _, pattern = page.partition("=")
+        paths = sorted(glob.glob(pattern)) if pattern else []
+        if not paths:
+            parser.error(f"No pages match {page!r}, expected SOURCE=PATH")
+        for path in paths:
+            with open(path, "rb") as file:
+                sources.setdefault(source, []).append((path, file.read()))
+
+    for source, pages in sources.items():
+        documents = [(path, raw, parse(raw)) for path, raw in pages]
+        for path, _, document in documents:
+            if document is None:
+                print(f"{source}: can't parse {path}, skipping it")
+        documents = [(path, raw, document) for path, raw, document in documents if document is not None]
+        if len(documents) < 2:
+            print(f"{source}: a template needs at least 2 pages, skipping")
+            continue
+
+        template = TemplateStore.learn([page_blocks(document) for _, _, document in documents], args.min_share)
+        print(f"{source}: {len(template)} template blocks learned from {len(documents)} pages")
+        print(f"{'page':40} {'html bytes':>22} {'cleaned chars':>18}")
+
+        totals = [0, 0, 0, 0]
+        for path, raw, document in documents:
+            # both cleaned from the re-serialised page, so only the template differs
+            cleaned = _text(trafilatura.extract(to_html(document)))
+            strip_template(document, template)
+            stripped_html = to_html(document)
+            stripped = _text(trafilatura.extract(stripped_html))
+
+            sizes = (len(raw), len(stripped_html.encode("utf-8")), len(cleaned), len(stripped))
+            totals = [total + size for total, size in zip(totals, sizes)]
+            print(f"{os.path.basename(path.rstrip('/'))[-40:]:40} {sizes[0]:>10,} -> {sizes[1]:>9,} {sizes[2]:>8,} -> {sizes[3]:>7,}")
+
+        print(f"{'total':40} {totals[0]:>10,} -> {totals[1]:>9,} {totals[2]:>8,} -> {totals[3]:>7,}"
+              f"  (html {totals[1] / max(1, totals[0]) - 1:+.0%}, cleaned text {totals[3] / max(1, totals[2]) - 1:+.0%})")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    main()
@@ -0,0 +1,159 @@
+import json
+import logging
+import re
+
+from html_parser import HtmlParser
+
+
+# Fields a job detail page can give us without asking an LLM
+LOCAL_FIELDS = ("title", "company", "location", "date", "salary", "salary_lower", "salary_upper")
+
+# schema.org unitText to the number of those units in a working year
+ANNUAL_MULTIPLIERS = {"HOUR": 2080, "DAY": 260, "WEEK": 52, "MONTH": 12, "YEAR": 1}
+
+CURRENCY_SYMBOLS = {"USD": "$", "GBP": "£", "EUR": "€", "CAD": "CA$", "AUD": "A$", "INR": "₹"}
+
+# LinkedIn's og:title, e.g. "Qualtrics hiring Vice President in Seattle, WA | LinkedIn"
+HIRING_TITLE = re.compile(r"^(?P<company>.+?) hiring (?P<title>.+?)(?: in (?P<location>[^|]+?))?(?:\s*\|\s*LinkedIn)?$")
+
+_parser = HtmlParser()
+
+
+def _types(node) -> list:
+    types = node.get("@type", [])
+    return types if isinstance(types, list) else [types]
+
+
+def _job_postings(data):
+    """Every JobPosting in a JSON-LD document, which may be a list or an @graph"""
+    if isinstance(data, list):
+        for item in data:
+            yield from _job_postings(item)
+    elif isinstance(data, dict):
+        if "JobPosting" in _types(data):
+            yield data
+        yield from _job_postings(data.get("@graph", []))
+
+
+def _first(value):
+    return value[0] if isinstance(value, list) and value else value
+
+
+def _name(value):
+    value = _first(value)
+    if isinstance(value, dict):
+        return value.get("name")
+    return value or None
+
+
+def _location(posting):
+    place = _first(posting.get("jobLocation"))
+    address = place.get("address") if isinstance(place, dict) else None
+    if isinstance(address, str):
+        return address or None
+    if isinstance(address, dict):
+        country = address.get("addressCountry")
+        parts = [address.get("addressLocality"), address.get("addressRegion"), _name(country)]
+        location = ", ".join(part for part in parts if part)
+        if location:
+            return location
+    if posting.get("jobLocationType") == "TELECOMMUTE":
+        return "Remote"
+    return None
+
+
+def _number(value):
+    try:
+        return float(str(value).replace(",", ""))
+    except (TypeError, ValueError):
+        return None
+
+
+def _salary(posting) -> dict:
+    """salary, salary_lower & salary_upper from baseSalary, normalised to annual amounts"""
+    amount = _first(posting.get("baseSalary"))
+    if not isinstance(amount, dict):
+        return {}
+
+    value = amount.get("value")
+    unit = amount.get("unitText") or "YEAR"
+    if isinstance(value, dict):
+        unit = value.get("unitText") or unit
+        lower = _number(value.get("minValue", value.get("value")))
+        upper = _number(value.get("maxValue", value.get("value")))
+    else:
+        lower = upper = _number(value)
+
+    if lower is None and upper is None:
+        return {}
+    lower = lower if lower is not None else upper
+    upper = upper if upper is not None else lower
+
+    multiplier = ANNUAL_MULTIPLIERS.get(str(unit).upper(), 1)
+    currency = amount.get("currency") or "USD"
+    symbol = CURRENCY_SYMBOLS.get(currency, currency + " ")
+    salary = f"{symbol}{lower:,.0f}" if lower == upper else f"{symbol}{lower:,.0f} - {symbol}{upper:,.0f}"
+    if multiplier != 1:
+        salary += f" per {str(unit).lower()}"
+
+    return {"salary": salary, "salary_lower": int(lower * multiplier), "salary_upper": int(upper * multiplier)}
+
+
+def _from_json_ld(document) -> dict:
+    for script in document.select('script[type="application/ld+json"]'):
+        try:
+            data = json.loads(script.get_text())
+        except json.JSONDecodeError as e:
+            logging.debug(f"Skipping unparseable JSON-LD: {e}")
+            continue
+
+        for posting in _job_postings(data):
+            fields = {
+                "title": posting.get("title"),
+                "company": _name(posting.get("hiringOrganization")),
+                "location": _location(posting),
+                "date": (posting.get("datePosted") or "")[:10] or None,
+            }
+            fields.update(_salary(posting))
+            return {name: value for name, value in fields.items() if value}
+    return {}
+
+
+def _from_meta(document) -> dict:
+    """The few fields the Open Graph tags give reliably"""
+    fields = {}
+    for meta in document.select("meta[property], meta[name]"):
+        key = meta.get("property") or meta.get("name")
+        content = (meta.get("content") or "").strip()
+        if not content:
+            continue
+        if key in ("og:title", "twitter:title") and "title" not in fields:
+            hiring = HIRING_TITLE.match(content)
+            if hiring:
+                fields.update({name: value for name, value in hiring.groupdict().items() if value})
+            else:
+                # drop the " | Site name" suffix
+                fields["title"] = content.rsplit(" | ", 1)[0]
+        elif key in ("article:published_time", "datePosted") and "date" not in fields:
+            fields["date"] = content[:10]
+    return fields
+
+
+def extract_job_fields(raw_description):
+    """
+    Pull the job fields out of the page's schema.org JobPosting JSON-LD, falling back to
+    the meta tags. Returns (fields, provenance), provenance maps each field found to
+    json-ld or meta
+    """
+    if not raw_description:
+        return {}, {}
+
+    document = _parser.parse(raw_description)
+    fields, provenance = {}, {}
+    for source, found in (("json-ld", _from_json_ld(document)), ("meta", _from_meta(document))):
+        for name, value in found.items():
+            if name not in fields:
+                fields[name] = value
+                provenance[name] = source
+
+    return fields, provenance
@@ -0,0 +1,246 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from contextlib import contextmanager
+
+import trafilatura
+
+from page_encoding import decode_body
+from structured_data import LOCAL_FIELDS, extract_job_fields
+
+
+# Default summary cache settings
+summary_cache_path = ".summary_cache.sqlite"
+summary_cache_ttl = 7 * 24 * 60 * 60    # seconds a summary is reused before the job is summarized again
+summary_cache_max_size_mb = 50
+
+# Summarizer & compactor settings that change the summary of the same cleaned description
+SUMMARIZER_SETTINGS = ("structured_data", "local_salary", "skip_llm_if_complete", "retry_on_no_salary",
+                       "salary_snippet_chars", "salary_snippets")
+COMPACTOR_SETTINGS = ("budget", "drop_boilerplate", "encoding")
+
+# The parts of a summarized Job that are stored, the posting's own page & card fields replace
+# the LOCAL_FIELDS of a hit, a cross-post in another city keeps its location & date
+SUMMARY_FIELDS = ("title", "company", "location", "date", "salary", "salary_lower", "salary_upper",
+                  "description", "summary", "fit", "provenance")
+
+
+def _sha256(text) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class SummaryCache:
+    """
+    Persistent cache of job summaries keyed by content rather than URL, so a reposted or
+    cross-posted job (same description, new URL) isn't sent to the LLM again. The key is
+    the sha256 of the cleaned description & the summarizer's identity (its class, model,
+    prompt, schema & settings such as TOKEN_BUDGET), so a new prompt.txt, model or setting
+    misses the old entries. Entries older
+    than ttl are ignored & the least recently used are evicted past max_size.
+    """
+
+    def __init__(self, path=summary_cache_path, ttl=summary_cache_ttl, max_size=summary_cache_max_size_mb * 1024 * 1024):
+        self.path = path
+        self.ttl = ttl
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS summaries (
+                    key TEXT PRIMARY KEY,
+                    fields TEXT,
+                    stored_at REAL,
+                    last_access REAL)""")
+
+    @classmethod
+    def from_config(cls, config):
+        """Build the cache from the [SummaryCache] section, returns None if it is disabled"""
+        if config is None or not config.has_section("SummaryCache"):
+            return cls()
+
+        section = config["SummaryCache"]
+        if not section.getboolean("ENABLED", fallback=True):
+            logging.info("Summary cache disabled")
+            return None
+
+        return cls(
+            path=section.get("PATH", fallback=summary_cache_path).strip("\"'"),
+            ttl=section.getint("TTL", fallback=summary_cache_ttl),
+            max_size=section.getint("MAX_SIZE_MB", fallback=summary_cache_max_size_mb) * 1024 * 1024)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def key(cleaned_description, identity) -> str:
+        return _sha256(identity + "\0" + cleaned_description)
+
+    def get(self, key) -> dict:
+        """The stored fields for key, None if there are none or they are older than the ttl"""
+        with self._lock, self._connect() as conn:
+            row = conn.execute("SELECT fields, stored_at FROM summaries WHERE key = ?", (key,)).fetchone()
+            if row is None or time.time() - row[1] >= self.ttl:
+                self.misses += 1
+                return None
+            conn.execute("UPDATE summaries SET last_access = ? WHERE key = ?", (time.time(), key))
+            self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, key, fields):
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            conn.execute("INSERT OR REPLACE INTO summaries VALUES (?, ?, ?, ?)", (key, json.dumps(fields), now, now))
+        self.evict()
+
+    def evict(self):
+        """Drop the expired entries, then the least recently used until the rest fit in max_size"""
+        with self._lock, self._connect() as conn:
+            conn.execute("DELETE FROM summaries WHERE stored_at <= ?", (time.time() - self.ttl,))
+            total = conn.execute("SELECT COALESCE(SUM(LENGTH(fields)), 0) FROM summaries").fetchone()[0]
+            if total <= self.max_size:
+                return
+
+            rows = conn.execute("SELECT key, LENGTH(fields) FROM summaries ORDER BY last_access").fetchall()
+            for key, size in rows:
+                if total <= self.max_size:
+                    break
+                conn.execute("DELETE FROM summaries WHERE key = ?", (key,))
+                total -= size
+
+        logging.debug(f"Summary cache evicted down to {total} bytes")
+
+    def metrics(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses}
+
+
+class CachedSummarizer:
+    """
+    Wraps any GenAISummarizer with a SummaryCache: a job whose cleaned description has
+    been summarized before gets the stored fields straight back, everything else goes
+    to the wrapped summarizer & its result is stored. Duck typed rather than a
+    GenAISummarizer subclass, as job_scraper wraps its summarizer with it
+    """
+
+    def __init__(self, summarizer, cache):
+        self.summarizer = summarizer
+        self.cache = cache
+        self.identity = self._identity(summarizer)
+
+    @classmethod
+    def wrap(cls, summarizer, config):
+        """summarizer wrapped with the cache from the [SummaryCache] section, or as it is if that's disabled"""
+        if summarizer is None or isinstance(summarizer, cls):
+            return summarizer
+        cache = SummaryCache.from_config(config)
+        return summarizer if cache is None else cls(summarizer, cache)
+
+    @staticmethod
+    def _identity(summarizer) -> str:
+        """What, besides the description, decides the summary: the summarizer, its model, prompt, schema & settings"""
+        prompt = summarizer.get_prompt() if hasattr(summarizer, "get_prompt") else ""
+        model = summarizer.get_model() if hasattr(summarizer, "get_model") else ""
+        schema = json.dumps(getattr(summarizer, "job_schema", None), sort_keys=True)
+        compactor = getattr(summarizer, "compactor", None)
+        settings = {name: getattr(summarizer, name, None) for name in SUMMARIZER_SETTINGS}
+        settings.update({name: getattr(compactor, name, None) for name in COMPACTOR_SETTINGS})
+        return "\0".join([type(summarizer).__name__, str(model), _sha256(prompt or ""), _sha256(schema),
+                          _sha256(json.dumps(settings, sort_keys=True, default=str))])
+
+    def __getattr__(self, name):
+        # the wrapped summarizer's compactor, metrics...
+        return getattr(self.summarizer, name)
+
+    def _key(self, job):
+        """The job's cache key, None if it has no description to key on"""
+        if job.cleaned_description is None and job.raw_description:
+            # normally done by the CPU stage, the wrapped summarizer reuses it
+            job.cleaned_description = trafilatura.extract(decode_body(job.raw_description))
+        if not job.cleaned_description:
+            return None
+        return SummaryCache.key(job.cleaned_description, self.identity)
+
+    def _lookup(self, job, key):
+        fields = self.cache.get(key) if key is not None else None
+        if fields is None:
+            return None
+        logging.info(f"Summary cache hit for {job.url}, not summarizing it again")
+        return self._job(job, fields)
+
+    def _store(self, key, summary):
+        if key is not None and summary is not None:
+            self.cache.put(key, {name: getattr(summary, name, None) for name in SUMMARY_FIELDS})
+
+    def summarize(self, job):
+        if not hasattr(job, "cleaned_description"):
+            # the legacy summarizers take the raw page
+            return self.summarizer.summarize(job)
+
+        key = self._key(job)
+        summary = self._lookup(job, key)
+        if summary is None:
+            summary = self.summarizer.summarize(job)
+            self._store(key, summary)
+        return summary
+
+    def _summarize_many(self, jobs, summarize) -> list:
+        """The cached summaries of jobs, with the rest from summarize(the jobs the cache doesn't have)"""
+        keys = [self._key(job) for job in jobs]
+        summaries = [self._lookup(job, key) for job, key in zip(jobs, keys)]
+        missing = [index for index, summary in enumerate(summaries) if summary is None]
+        if missing:
+            for index, summary in zip(missing, summarize([jobs[index] for index in missing])):
+                summaries[index] = summary
+                self._store(keys[index], summary)
+        return summaries
+
+    def summarize_batch(self, jobs) -> list:
+        """The wrapped summarizer's batch mode, with only the jobs the cache doesn't have in the batch"""
+        return self._summarize_many(jobs, self.summarizer.summarize_batch)
+
+    def summarize_packed(self, jobs) -> list:
+        """The wrapped summarizer's packing, with only the jobs the cache doesn't have in the packs"""
+        return self._summarize_many(jobs, self.summarizer.summarize_packed)
+
+    @staticmethod
+    def _local_fields(job):
+        """This posting's own fields & their provenance: its page's structured data, then its card"""
+        if getattr(job, "page_fields", None) is not None:
+            fields, provenance = dict(job.page_fields[0]), dict(job.page_fields[1])
+        elif job.raw_description:
+            fields, provenance = extract_job_fields(decode_body(job.raw_description))
+        else:
+            fields, provenance = {}, {}
+        for name in LOCAL_FIELDS:
+            value = getattr(job, name, None)
+            if value and name not in fields:
+                fields[name] = value
+                provenance[name] = "card"
+        return fields, provenance
+
+    @classmethod
+    def _job(cls, job, fields):
+        """The cached fields on this posting, which may have a new id & URL, with its own page & card fields over them"""
+        fields = dict(fields)
+        local, provenance = cls._local_fields(job)
+        fields.update(local)
+        fields["provenance"] = {**(fields.get("provenance") or {}), **provenance}
+        return type(job)(id=job.id, source=job.source, url=job.url, raw_description=job.raw_description,
+                         cleaned_description=job.cleaned_description, **fields)
@@ -0,0 +1,155 @@
+import atexit
+import logging
+import threading
+
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+
+# Default summary stage settings
+summary_concurrency = 8
+summary_max_retries = 5
+
+
+def summarize_job(summarizer, job, max_retries=summary_max_retries):
+    """
+    The summarized job, asking up to max_retries times, None if every attempt failed. Every
+    summarizer, OpenAI, Anthropic, Deepseek or structured, is handed the Job itself
+    """
+    json_job = None
+    retries = 0
+    while json_job is None and retries < max_retries:
+        json_job = summarizer.summarize(job)
+        retries += 1
+    return json_job
+
+
+class SummaryStage:
+    """
+    Runs the LLM summaries of many jobs at once rather than one per scraper thread. Up to
+    concurrency summaries are in flight, on worker threads shared by every scraper, as the
+    LLM SDK clients are blocking. The providers' limits still hold: each request waits for
+    its tokens in the provider's LLMBudget & a slot in its AIMD concurrency window, so
+    concurrency is the most the stage will ask for, not what the provider has to take.
+    """
+
+    def __init__(self, concurrency=summary_concurrency, max_retries=summary_max_retries):
+        self.concurrency = max(1, int(concurrency))
+        self.max_retries = max(1, int(max_retries))
+
+        self.summarized_jobs = 0
+        self.failed_jobs = 0
+        self.peak_in_flight = 0
+        self._in_flight = 0
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _pool(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="summarize")
+            return self._executor
+
+    def _summarize(self, summarizer, jobs) -> list:
+        """The summaries of a unit of work: one job, or a pack of them for a summarizer with a pack_size"""
+        with self._lock:
+            self._in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self._in_flight)
+        try:
+            if len(jobs) > 1:
+                # a packed summarizer splits & retries the jobs a pack fails on itself
+                return summarizer.summarize_packed(jobs)
+            return [summarize_job(summarizer, jobs[0], self.max_retries)]
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+
+    def _result(self, future, size) -> list:
+        try:
+            summaries = future.result()
+        except Exception as e:
+            logging.error(f"Failed to summarize job description: {e}")
+            summaries = [None] * size
+
+        failed = sum(1 for json_job in summaries if json_job is None)
+        with self._lock:
+            self.failed_jobs += failed
+            self.summarized_jobs += len(summaries) - failed
+        if failed:
+            logging.error(f"Failed to summarize {failed} job descriptions after multiple attempts.")
+        return [json_job for json_job in summaries if json_job is not None]
+
+    @staticmethod
+    def _units(jobs, size):
+        unit = []
+        for job in jobs:
+            unit.append(job)
+            if len(unit) == size:
+                yield unit
+                unit = []
+        if unit:
+            yield unit
+
+    def summarized(self, summarizer, jobs, limit=None):
+        """
+        Yield the summaries of jobs as they complete, which isn't necessarily in order. Jobs
+        are taken from the iterable while earlier ones are in flight, with up to concurrency
+        requests submitted at once, each for one job or for a pack of the summarizer's
+        pack_size jobs. With a limit no more jobs are started once that many have been
+        summarized or are in flight, & the jobs that fail aren't yielded
+        """
+        size = max(1, getattr(summarizer, "pack_size", 1))
+        pending = {}
+        done_count = 0
+
+        def finished(done):
+            nonlocal done_count
+            for future in done:
+                for json_job in self._result(future, pending.pop(future)):
+                    done_count += 1
+                    yield json_job
+
+        for unit in self._units(jobs, size):
+            while len(pending) >= self.concurrency:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                yield from finished(done)
+            if limit is not None and done_count + sum(pending.values()) >= limit:
+                # wait on the ones in flight, more may be needed if they fail
+                done, _ = wait(pending)
+                yield from finished(done)
+                if done_count >= limit:
+                    break
+            pending[self._pool().submit(self._summarize, summarizer, unit)] = len(unit)
+
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            yield from finished(done)
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+    def metrics(self) -> dict:
+        with self._lock:
+            return {"concurrency": self.concurrency, "summarized": self.summarized_jobs,
+                    "failed": self.failed_jobs, "peak_in_flight": self.peak_in_flight}
+
+
+_stage = None
+_stage_lock = threading.Lock()
+
+
+def get_summary_stage(config=None) -> SummaryStage:
+    """The process wide summary stage, created on first use from CONCURRENCY & MAX_RETRIES in the [Summarize] section"""
+    global _stage
+    with _stage_lock:
+        if _stage is None:
+            concurrency, max_retries = summary_concurrency, summary_max_retries
+            if config is not None and config.has_section("Summarize"):
+                concurrency = config["Summarize"].getint("CONCURRENCY", fallback=concurrency)
+                max_retries = config["Summarize"].getint("MAX_RETRIES", fallback=max_retries)
+
+            _stage = SummaryStage(concurrency, max_retries)
+            atexit.register(_stage.shutdown)
+        return _stage
@@ -0,0 +1,145 @@
+# tests/conftest.py
+import configparser
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from rate_limiter import rate_limiter
+from singleflight import fetch_flight
+
+
+# The top of the repo, where prompt.txt & the saved pages are checked in
+ROOT = os.path.join(os.path.dirname(__file__), "..", "..")
+
+
+def _saved_page(name="job.txt"):
+    with open(os.path.join(ROOT, name), "rb") as file:
+        return file.read()
+
+
+def echo_schema(text, schema, instructions):
+    """Answers every field the schema asks for, 7 for the integers & "llm <field>" for the strings"""
+    properties = schema["format"]["schema"]["properties"]
+    return {name: {"integer": 7, "string": f"llm {name}"}[spec["type"]] for name, spec in properties.items()}
+
+
+class LocalServer:
+    """Stand-in web server for the scrapers. Routes map a path (including the query string) to
+    (status, body, headers) or to a callable taking the request handler & returning the same.
+    body can also be an iterable of chunks to send the response a piece at a time."""
+
+    def __init__(self):
+        self.routes = {}
+        self.hits = []
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _respond(self):
+                server.hits.append(self.path)
+                route = server.routes.get(self.path) or server.routes.get(self.path.split("?")[0])
+                if route is None:
+                    route = (404, b"not found", {})
+                if callable(route):
+                    route = route(self)
+                status, body, headers = route
+                if isinstance(body, str):
+                    body = body.encode("utf-8")
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                if not isinstance(body, bytes):
+                    # an iterable of chunks, written as they are produced & ended by closing the connection
+                    self.end_headers()
+                    for chunk in body:
+                        self.wfile.write(chunk.encode("utf-8") if isinstance(chunk, str) else chunk)
+                        self.wfile.flush()
+                    return
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                if self.command != "HEAD":
+                    self.wfile.write(body)
+
+            def do_GET(self):
+                self._respond()
+
+            def do_POST(self):
+                self.body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                self._respond()
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+@pytest.fixture
+def local_server():
+    server = LocalServer()
+    server.start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture(autouse=True)
+def unthrottled_local_host():
+    """Don't rate limit requests to the stand-in server & start each test with no shared fetches"""
+    rate_limiter.host_limits["127.0.0.1"] = (1000.0, 1000)
+    rate_limiter._buckets.pop("127.0.0.1", None)
+    fetch_flight.reset()
+    yield
+    rate_limiter._buckets.pop("127.0.0.1", None)
+
+
+@pytest.fixture
+def structured_summarizer(monkeypatch):
+    """
+    Makes OpenAIStructuredSummarizers from prompt.txt & an [OpenAI] section with the extra
+    settings lines. Their LLM is answer(text, schema, instructions), echo_schema by default,
+    with each query recorded in summarizer.queries; answer=None keeps the real API call
+    """
+    ai_summarizer = pytest.importorskip("ai_summarizer")
+
+    def make(settings="", answer=echo_schema):
+        config = configparser.RawConfigParser()
+        config.read_string("[OpenAI]\nOPENAI_API_KEY = key\nMODEL = model\n" + settings)
+        summarizer = ai_summarizer.OpenAIStructuredSummarizer(config, os.path.join(ROOT, "prompt.txt"))
+        summarizer.queries = []
+
+        if answer is not None:
+            def query(text, schema=None, instructions=None):
+                summarizer.queries.append((text, schema, instructions))
+                return answer(text, schema, instructions)
+
+            monkeypatch.setattr(summarizer, "_openai_structured_query", query)
+        return summarizer
+
+    return make
+
+
+@pytest.fixture(scope="session")
+def job_page():
+    """Reads a page saved at the top of the repo, job_page() for the LinkedIn job page or job_page("page.html")"""
+    return _saved_page
+
+
+@pytest.fixture(scope="session")
+def prompt_file():
+    """The summary prompt checked in at the top of the repo"""
+    return os.path.join(ROOT, "prompt.txt")
@@ -0,0 +1,85 @@
+# tests/test_ai_summarizer.py
+import re
+
+import pytest
+
+from job_scraper import Job
+from summary_stage import SummaryStage
+
+PAGE = "<html><body><article><p>Position {} " + "A role building data platforms for a growing team. " * 20 + "</p></article></body></html>"
+
+
+@pytest.fixture
+def summarizer(structured_summarizer):
+    """A packing summarizer whose LLM answers every job in a request, except those in drop"""
+    def answer(text, schema, instructions):
+        if "jobs" not in schema["format"]["schema"]["properties"]:
+            position = re.search(r"Position (\w+)", text).group(1)
+            return {"summary": f"single {position}", "fit": 5}
+        if summarizer.fail_packs:
+            return None
+
+        jobs = []
+        for index, position in re.findall(r"JOB (\d+)\nPosition (\w+)", text):
+            if position not in summarizer.drop:
+                jobs.append({"index": int(index), "summary": f"packed {position}", "fit": 7})
+        return {"jobs": jobs}
+
+    summarizer = structured_summarizer("PACK_SIZE = 4\n", answer)
+    summarizer.drop = set()
+    summarizer.fail_packs = False
+    return summarizer
+
+
+def _jobs(names):
+    return [Job(id=str(index), url=f"https://example.com/jobs/{name}", raw_description=PAGE.format(name))
+            for index, name in enumerate(names)]
+
+
+def test_jobs_share_a_request(summarizer):
+    summaries = summarizer.summarize_packed(_jobs("abcdef"))
+
+    # 6 jobs, 4 to a pack
+    assert len(summarizer.queries) == 2
+    text, schema, instructions = summarizer.queries[0]
+    assert instructions.startswith(summarizer.get_prompt()) and summarizer.get_prompt() not in text
+    item = schema["format"]["schema"]["properties"]["jobs"]["items"]
+    assert item["required"][0] == "index" and "summary" in item["properties"]
+
+    assert [summary.summary for summary in summaries] == [f"packed {name}" for name in "abcdef"]
+    assert [summary.url for summary in summaries] == [f"https://example.com/jobs/{name}" for name in "abcdef"]
+    assert summaries[0].provenance["summary"] == "llm" and "index" not in summaries[0].provenance
+
+
+def test_the_token_cap_closes_a_pack_early(summarizer):
+    summarizer.pack_token_cap = 1
+    summarizer.summarize_packed(_jobs("abc"))
+    # every job is over the cap on its own, so each goes as a single request
+    assert len(summarizer.queries) == 3
+    assert all("jobs" not in schema["format"]["schema"]["properties"] for _, schema, _ in summarizer.queries)
+
+
+def test_jobs_missing_from_a_partial_answer_are_retried(summarizer):
+    summarizer.drop = {"b", "c"}
+    summaries = summarizer.summarize_packed(_jobs("abcd"))
+
+    # the pack, then b & c split into requests of their own
+    assert len(summarizer.queries) == 3
+    assert [summary.summary for summary in summaries] == ["packed a", "single b", "single c", "packed d"]
+
+
+def test_a_failed_pack_is_split(summarizer):
+    summarizer.fail_packs = True
+    summaries = summarizer.summarize_packed(_jobs("abcd"))
+
+    # 4 -> 2 + 2 -> 1 + 1 + 1 + 1
+    assert len(summarizer.queries) == 7
+    assert [summary.summary for summary in summaries] == [f"single {name}" for name in "abcd"]
+
+
+def test_the_summary_stage_sends_packs(summarizer):
+    summaries = list(SummaryStage(concurrency=2).summarized(summarizer, _jobs("abcdefghij")))
+
+    assert sorted(summary.summary for summary in summaries) == [f"packed {name}" for name in "abcdefghij"]
+    # 4 + 4 packed, the 2 left over as another pack
+    assert len(summarizer.queries) == 3
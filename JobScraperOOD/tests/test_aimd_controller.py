@@ -0,0 +1,65 @@
+# tests/test_aimd_controller.py
+import configparser
+
+from aimd_controller import AIMDController, ControllerRegistry
+
+
+def test_window_grows_additively():
+    controller = AIMDController("test", initial=2, maximum=10)
+
+    for _ in range(6):
+        controller.acquire()
+        controller.release(200)
+
+    # 2 + 1/2 + 1/2.5 + ... crosses 3 after three successes & 4 after six
+    assert controller.limit == 4
+    assert controller.metrics()["successes"] == 6
+
+
+def test_overload_halves_window_once_per_cooldown():
+    controller = AIMDController("test", initial=8, maximum=8, cooldown=60)
+
+    for _ in range(3):
+        controller.acquire()
+    for _ in range(3):
+        controller.release(429)
+
+    assert controller.limit == 4
+    assert controller.metrics()["overloads"] == 3
+    assert controller.in_flight == 0
+
+
+def test_window_respects_minimum_and_limits_in_flight():
+    controller = AIMDController("test", initial=1, minimum=1, maximum=4, cooldown=0)
+    controller.acquire()
+    controller.release(503)
+
+    assert controller.limit == 1
+    assert controller.try_acquire()
+    assert not controller.try_acquire()
+
+
+def test_registry_uses_max_workers():
+    config = configparser.RawConfigParser()
+    config.read_string("[DEFAULT]\nMAX_WORKERS = 12\n")
+
+    registry = ControllerRegistry()
+    registry.configure(config)
+
+    assert registry.get("llm:openai").maximum == 12
+    assert registry.get("llm:openai") is registry.get("llm:openai")
+    assert "llm:openai" in registry.metrics()
+
+
+def test_configure_reaches_controllers_created_before_it():
+    registry = ControllerRegistry()
+    # a scraper's fetcher, built before the processor configures the registry
+    fetcher = registry.get("LinkedIn", initial=4, maximum=4)
+    provider = registry.get("llm:openai")
+
+    config = configparser.RawConfigParser()
+    config.read_string("[Concurrency]\nINITIAL_WINDOW = 3\nMIN_WINDOW = 2\nMAX_WINDOW = 10\n")
+    registry.configure(config)
+
+    assert (fetcher.minimum, fetcher.limit, fetcher.maximum) == (2, 4, 4)
+    assert (provider.minimum, provider.limit, provider.maximum) == (2, 3, 10)
@@ -0,0 +1,38 @@
+# tests/test_async_fetcher.py
+import time
+
+from async_fetcher import AsyncFetcher
+
+
+def test_fetch_all_keeps_order(local_server):
+    for i in range(5):
+        local_server.routes[f"/job/{i}"] = (200, f"job {i}", {})
+
+    urls = [f"{local_server.url}/job/{i}" for i in range(5)]
+    pages = AsyncFetcher(name="test-order", concurrency=3, timeout=5).fetch_all_sync(urls)
+
+    assert pages == [f"job {i}".encode() for i in range(5)]
+
+
+def test_fetch_failure_returns_none(local_server):
+    local_server.routes["/ok"] = (200, "ok", {})
+
+    pages = AsyncFetcher(name="test-failure", concurrency=2, timeout=5).fetch_all_sync([f"{local_server.url}/ok", f"{local_server.url}/missing"])
+
+    assert pages == [b"ok", None]
+
+
+def test_fetch_runs_concurrently(local_server):
+    def slow(handler):
+        time.sleep(0.3)
+        return (200, "slow", {})
+
+    local_server.routes["/slow"] = slow
+    urls = [f"{local_server.url}/slow?n={i}" for i in range(8)]
+
+    start = time.monotonic()
+    pages = AsyncFetcher(name="test-concurrent", concurrency=8, timeout=5).fetch_all_sync(urls)
+    elapsed = time.monotonic() - start
+
+    assert all(page == b"slow" for page in pages)
+    assert elapsed < 8 * 0.3 / 2
@@ -0,0 +1,91 @@
+# tests/test_browser_pool.py
+import threading
+
+import pytest
+
+from browser_pool import BrowserPool
+
+
+class FakeDriver:
+    def __init__(self):
+        self.quit_called = False
+        self.broken = False
+
+    def execute_script(self, script):
+        if self.broken:
+            raise RuntimeError("session deleted")
+        return 1
+
+    def quit(self):
+        self.quit_called = True
+
+
+def test_sessions_are_reused():
+    pool = BrowserPool(size=2, max_pages=10, driver_factory=FakeDriver)
+
+    with pool.browser() as first:
+        pass
+    with pool.browser() as second:
+        pass
+
+    assert first is second
+    assert pool.metrics()["started"] == 1
+
+
+def test_recycled_after_max_pages():
+    pool = BrowserPool(size=1, max_pages=2, driver_factory=FakeDriver)
+
+    drivers = []
+    for _ in range(3):
+        with pool.browser() as driver:
+            drivers.append(driver)
+
+    assert drivers[0] is drivers[1]
+    assert drivers[2] is not drivers[0]
+    assert drivers[0].quit_called
+    assert pool.metrics()["recycled"] == 1
+
+
+def test_unhealthy_session_is_replaced():
+    pool = BrowserPool(size=1, driver_factory=FakeDriver)
+    with pool.browser() as driver:
+        pass
+    driver.broken = True
+
+    with pool.browser() as replacement:
+        pass
+
+    assert replacement is not driver
+    assert driver.quit_called
+
+
+def test_pool_is_size_bounded_and_shuts_down():
+    pool = BrowserPool(size=2, driver_factory=FakeDriver)
+    in_use = []
+    peak = []
+    lock = threading.Lock()
+    release = threading.Event()
+
+    def scrape():
+        with pool.browser() as driver:
+            with lock:
+                in_use.append(driver)
+                peak.append(len(in_use))
+            release.wait(0.2)
+            with lock:
+                in_use.remove(driver)
+
+    threads = [threading.Thread(target=scrape) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert max(peak) == 2
+    assert pool.metrics()["started"] == 2
+
+    pool.shutdown()
+    assert pool.metrics()["idle"] == 0
+    with pytest.raises(RuntimeError):
+        with pool.browser():
+            pass
@@ -0,0 +1,98 @@
+# tests/test_compactor.py
+from types import SimpleNamespace
+
+import pytest
+import trafilatura
+
+import compactor as compactor_module
+from compactor import DescriptionCompactor, count_tokens
+
+EEO = "Acme is an equal opportunity employer. All applicants will be considered without regard to race, color or religion."
+FILLER = "We have a ping pong table, a dog friendly office and plenty of snacks for everyone on the team. " * 4
+
+DESCRIPTION = "\n".join([
+    "Senior Data Engineer",
+    "Acme",
+    "Remote",
+    "About Us",
+    FILLER,
+    "Responsibilities",
+    "- Build the batch & streaming pipelines behind our analytics.",
+    "- Build the batch & streaming pipelines behind our analytics.",
+    "Requirements",
+    "- 5+ years of Python and SQL.",
+    "Life at Acme",
+    FILLER.replace("ping pong", "foosball"),
+    EEO,
+    "The pay range for this role is $150,000 - $180,000, and we are an equal opportunity employer.",
+])
+
+
+@pytest.fixture(autouse=True)
+def estimated_tokens(monkeypatch):
+    """The budgets below assume the length estimate, whether or not tiktoken is installed"""
+    monkeypatch.setattr(compactor_module, "tiktoken", None)
+
+
+def test_dedupe_and_boilerplate_without_a_budget():
+    compacted, before, after = DescriptionCompactor(budget=0).compact(DESCRIPTION)
+
+    assert compacted.count("Build the batch") == 1
+    assert EEO not in compacted
+    # the pay paragraph stays even though it mentions equal opportunity
+    assert "$150,000 - $180,000" in compacted
+    assert before > after == count_tokens(compacted)
+
+
+def test_budget_trims_the_other_sections_first():
+    compactor = DescriptionCompactor(budget=80)
+
+    compacted, _, after = compactor.compact(DESCRIPTION)
+
+    assert after <= 80
+    assert "ping pong" not in compacted and "foosball" not in compacted
+    for kept in ("Senior Data Engineer", "Acme", "Remote", "5+ years of Python", "$150,000 - $180,000"):
+        assert kept in compacted
+    assert compactor.metrics() == {"tokens_in": count_tokens(DESCRIPTION), "tokens_out": after}
+
+
+def test_tight_budget_keeps_the_pay():
+    compacted, _, after = DescriptionCompactor(budget=40).compact(DESCRIPTION)
+
+    assert after <= 40
+    assert "5+ years of Python" not in compacted
+    assert "$150,000 - $180,000" in compacted
+
+
+def test_saved_page_fits_the_budget_and_keeps_the_salary(job_page):
+    cleaned = trafilatura.extract(job_page())
+
+    compacted, before, after = DescriptionCompactor(budget=1000).compact(cleaned)
+
+    assert after <= 1000 < before
+    assert "equal opportunity employer" not in compacted
+    assert compacted.startswith("Vice President Go-To-Market Systems\nQualtrics\nSeattle, WA")
+    assert "$362,000—$394,000 USD" in compacted
+
+
+def test_compact_page_cleans_the_html_first():
+    page = "<html><body><article><p>" + FILLER + "</p><p>" + EEO + "</p></article></body></html>"
+
+    text = DescriptionCompactor(budget=0).compact_page(page.encode("utf-8"))
+
+    assert "<" not in text and "ping pong" in text and EEO not in text
+
+
+def test_tokens_counted_with_the_encoder_or_estimated_if_it_cant_load(monkeypatch):
+    def get_encoding(name):
+        if name == "offline":
+            raise OSError("can't download the BPE file")
+        return SimpleNamespace(encode=lambda text, disallowed_special=(): text.split())
+
+    monkeypatch.setattr(compactor_module, "tiktoken", SimpleNamespace(get_encoding=get_encoding))
+    monkeypatch.setattr(compactor_module, "_encodings", {})
+
+    assert count_tokens("build the data pipelines", encoding="words") == 4
+    assert count_tokens("build the data pipelines", encoding="offline") == 6
+    # the failure is remembered rather than retried for every description
+    assert compactor_module._encodings["offline"] is None
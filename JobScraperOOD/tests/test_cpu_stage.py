@@ -0,0 +1,74 @@
+# tests/test_cpu_stage.py
+import pytest
+
+from cpu_stage import CpuStage, prepare_page
+from job_scraper import Job
+
+
+def article(text):
+    return f"<html><body><article><p>{text * 20}</p></article></body></html>"
+
+
+@pytest.fixture
+def stage():
+    stage = CpuStage(workers=2, chunk_size=2)
+    yield stage
+    stage.shutdown()
+
+
+def test_workers_match_preparing_in_process(stage, job_page):
+    jobs = [Job(id=str(n), raw_description=job_page() if n == 0 else article(f"Job number {n}. ")) for n in range(5)]
+
+    prepared = list(stage.prepared(iter(jobs)))
+
+    assert prepared == jobs
+    cleaned, fields, provenance, _ = prepare_page(job_page())
+    assert jobs[0].cleaned_description == cleaned
+    assert jobs[0].page_fields == (fields, provenance)
+    assert fields["salary_upper"] == 394000
+    assert jobs[3].cleaned_description.startswith("Job number 3.")
+    assert stage.metrics() == {"workers": 2, "pages": 5}
+
+
+def test_workers_are_started_once_and_reused(stage):
+    list(stage.prepared([Job(raw_description=article("One. "))]))
+    executor = stage._executor
+
+    list(stage.prepared([Job(raw_description=article("Two. ")) for _ in range(3)]))
+
+    assert stage._executor is executor
+
+
+def test_failed_chunk_is_left_for_the_summarizer(stage):
+    jobs = [Job(raw_description=42), Job(raw_description=article("Fine. "))]
+
+    assert list(stage.prepared(jobs)) == jobs
+    assert jobs[0].page_fields is None and jobs[1].page_fields is None
+
+
+def test_no_workers_prepares_in_the_calling_thread():
+    stage = CpuStage(workers=0)
+    job = Job(raw_description=article("Inline. "))
+
+    list(stage.prepared([job]))
+
+    assert stage._executor is None
+    assert job.cleaned_description.startswith("Inline.")
+
+
+def test_summarizer_uses_the_prepared_page(structured_summarizer, monkeypatch, job_page):
+    summarizer = structured_summarizer(answer=lambda text, schema, instructions: {"summary": "llm summary"})
+    ai_summarizer = pytest.importorskip("ai_summarizer")
+    job = Job(id="1", raw_description=job_page())
+    list(CpuStage(workers=0).prepared([job]))
+
+    def not_again(*args, **kwargs):
+        raise AssertionError("page parsed twice")
+
+    monkeypatch.setattr(ai_summarizer, "extract_job_fields", not_again)
+    monkeypatch.setattr(ai_summarizer.trafilatura, "extract", not_again)
+
+    summarized = summarizer.summarize(job)
+
+    assert summarizer.queries[0][0].startswith(summarizer.compactor.compact(job.cleaned_description)[0])
+    assert (summarized.company, summarized.salary_upper, summarized.summary) == ("Qualtrics", 394000, "llm summary")
@@ -0,0 +1,42 @@
+# tests/test_dice_scraper.py
+import configparser
+import time
+from argparse import ArgumentParser, Namespace
+
+from DiceJobScraper import DiceJobScraper
+from job_scraper import Job
+
+
+def make_scraper(base_url):
+    config = configparser.RawConfigParser()
+    config.read_string(
+        "[Dice]\n"
+        "DICE_USERNAME = user\n"
+        "DICE_PASSWORD = password\n"
+        f"DICE_URL = {base_url}/jobs?q=ai\n"
+        "FETCH_CONCURRENCY = 10\n"
+        "[Cache]\nENABLED = false\n")
+
+    parser = ArgumentParser()
+    parser.parse_args = lambda: Namespace(username=None, password=None, url=None)
+    return DiceJobScraper(config, parser)
+
+
+def test_detail_pages_fetched_concurrently(local_server):
+    def slow_detail(handler):
+        time.sleep(0.3)
+        return (200, f"detail {handler.path.rsplit('/', 1)[-1]}", {})
+
+    for job_id in range(10):
+        local_server.routes[f"/job-detail/{job_id}"] = slow_detail
+
+    scraper = make_scraper(local_server.url)
+    # card discovery needs a browser, stand in for it with the cards it would find
+    scraper._get_response = lambda url: [Job(id=str(job_id), source="Dice", url=f"{local_server.url}/job-detail/{job_id}") for job_id in range(10)]
+
+    start = time.monotonic()
+    jobs = scraper.scrape()
+    elapsed = time.monotonic() - start
+
+    assert [job.raw_description for job in jobs] == [f"detail {job_id}".encode() for job_id in range(10)]
+    assert elapsed < 10 * 0.3 / 2
@@ -0,0 +1,76 @@
+# tests/test_extraction_spec.py
+import configparser
+import json
+
+import pytest
+
+from extraction_spec import ExtractionSpec, get_spec
+from html_parser import HtmlParser, BACKENDS
+
+
+CARDS = """<html><body><div data-testid="jobSearchResultsContainer">
+    <a data-testid="job-search-job-card-link" href="https://www.dice.com/job-detail/0123456789abcdef0123456789abcdef0123">Job</a>
+</div>
+<dhi-search-card data-cy="search-card" data-cy-value="abc-123"></dhi-search-card>
+<div class="job_seen_beacon"><h2> Engineer </h2><span class="date">Posted 30 minutes ago</span></div>
+</body></html>"""
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_linkedin_spec_on_saved_page(backend, job_page):
+    cards = get_spec(None, "LinkedIn").extract_all(HtmlParser(backend), job_page("page.html"))
+
+    assert len(cards) == 35
+    assert cards[0] == {
+        "id": "4132750878",
+        "url": cards[0]["url"],
+        "title": "Learning and Development Director",
+        "company": "Blue Origin",
+        "location": "Seattle, WA",
+        "salary": None,
+        "date": "2025-03-30",
+    }
+    assert cards[0]["url"].startswith("https://www.linkedin.com/jobs/view/learning-and-development-director")
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_dice_and_indeed_specs(backend):
+    parser = HtmlParser(backend)
+
+    assert get_spec(None, "Dice").extract_all(parser, CARDS) == [{"id": "abc-123", "url": "https://www.dice.com/job-detail/abc-123"}]
+    assert get_spec(None, "DicePlatform").extract_all(parser, CARDS) == [{
+        "id": "0123456789abcdef0123456789abcdef0123",
+        "url": "https://www.dice.com/job-detail/0123456789abcdef0123456789abcdef0123"}]
+    assert get_spec(None, "Indeed").extract_all(parser, CARDS) == [{"title": "Engineer", "posted": "Posted 30 minutes ago"}]
+
+
+def test_complex_field_selectors_and_defaults():
+    spec = ExtractionSpec.from_dict("Test", {
+        "container": "li",
+        "fields": {
+            "second": "div > span.b",
+            "missing": {"selector": "em", "default": "n/a"},
+            "number": {"selector": "span.a", "regex": r"\d+", "format": "#{}"},
+        },
+    })
+    html = "<ul><li><span class='a'>item 42</span><div><span class='b'>two</span></div></li></ul>"
+
+    assert spec.extract_all(HtmlParser(), html) == [{"second": "two", "missing": "n/a", "number": "#42"}]
+
+
+def test_spec_file_from_config(tmp_path):
+    spec_path = tmp_path / "specs.json"
+    spec_path.write_text(json.dumps({"LinkedIn": {"container": "div.new-card", "fields": {"title": "h2"}}}))
+    config = configparser.RawConfigParser()
+    config.read_string(f"[Parser]\nSPEC_FILE = {spec_path}\n")
+
+    spec = get_spec(config, "LinkedIn")
+
+    assert spec.extract_all(HtmlParser(), "<div class='new-card'><h2>Renamed</h2></div>") == [{"title": "Renamed"}]
+    with pytest.raises(KeyError):
+        get_spec(config, "Dice")
+
+
+def test_unknown_field_keys_rejected():
+    with pytest.raises(ValueError):
+        ExtractionSpec.from_dict("Test", {"container": "li", "fields": {"title": {"selectr": "h3"}}})
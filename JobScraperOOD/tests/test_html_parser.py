@@ -0,0 +1,91 @@
+# tests/test_html_parser.py
+import pytest
+
+from html_parser import HtmlParser, BACKENDS, CardStream, css_to_xpath, strainer_for
+from page_encoding import PageBody
+
+
+CARD_SELECTOR = "div.base-search-card.job-search-card"
+
+
+@pytest.fixture(scope="module")
+def page(job_page):
+    return job_page("page.html")
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_backends_find_the_same_cards(page, backend):
+    cards = HtmlParser(backend).select(page, CARD_SELECTOR)
+
+    assert len(cards) == 35
+    first = cards[0]
+    assert first.get("data-entity-urn") == "urn:li:jobPosting:4132750878"
+    assert first.find("a")["href"].startswith("https://www.linkedin.com/jobs/view/")
+    assert first.find("time").get("datetime") == "2025-03-30"
+    assert first.select_one("h3").get_text(strip=True) == "Learning and Development Director"
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_attribute_and_child_selectors(backend):
+    html = """<html><body>
+        <div data-testid="results"><a data-testid="card" href="/1">one</a><span><a data-testid="card" href="/2">two</a></span></div>
+        <a data-testid="card" href="/3">outside</a>
+        <dhi-search-card data-cy="search-card" data-cy-value="abc"></dhi-search-card>
+    </body></html>"""
+    parser = HtmlParser(backend)
+
+    assert [a["href"] for a in parser.select(html, 'div[data-testid="results"] a[data-testid="card"]')] == ["/1", "/2"]
+    assert [a["href"] for a in parser.select(html, 'div[data-testid="results"] > a')] == ["/1"]
+    assert [card.get("data-cy-value") for card in parser.select(html, 'dhi-search-card[data-cy="search-card"]')] == ["abc"]
+    assert parser.select(html, "div.missing") == []
+
+
+def test_css_to_xpath_groups_and_quotes():
+    assert css_to_xpath("li, p#main") == "descendant::li | descendant::p[@id = 'main']"
+    assert css_to_xpath("a[title=\"it's\"]") == "descendant::a[@title = \"it's\"]"
+
+
+def test_strainer_only_for_simple_selectors():
+    assert strainer_for("div.job_seen_beacon") is not None
+    assert strainer_for("li, p") is None
+    assert strainer_for("a[href^=http]") is None
+
+
+def test_unknown_backend():
+    with pytest.raises(ValueError):
+        HtmlParser("regex")
+
+
+def test_card_stream_yields_cards_as_they_close(page):
+    stream = CardStream(CARD_SELECTOR)
+    arrivals = []
+    for offset in range(0, len(page), 8192):
+        arrivals.append(len(stream.feed(page[offset:offset + 8192])))
+    arrivals.append(len(stream.close()))
+
+    assert sum(arrivals) == 35
+    # the cards turn up spread over the chunks rather than all at the end
+    assert len([count for count in arrivals if count]) > 5
+
+
+def test_card_stream_decodes_with_the_charset():
+    page = "<ul><li>Café</li><li>Zürich</li></ul>"
+
+    # one byte at a time splits every multi-byte character across two chunks
+    stream = CardStream("li")
+    cards = [card for byte in page.encode("utf-8") for card in stream.feed(bytes([byte]))] + stream.close()
+    assert [card.text for card in cards] == ["Café", "Zürich"]
+
+    stream = CardStream("li")
+    cards = stream.feed(PageBody(page.encode("latin-1"), "ISO-8859-1")) + stream.close()
+    assert [card.text for card in cards] == ["Café", "Zürich"]
+
+    declared = f'<meta charset="windows-1252">{page}'.encode("cp1252")
+    stream = CardStream("li")
+    assert [card.text for card in stream.feed(declared) + stream.close()] == ["Café", "Zürich"]
+
+
+def test_card_stream_needs_a_simple_selector():
+    with pytest.raises(ValueError):
+        CardStream("ul > li")
+    assert CardStream("li").close() == []
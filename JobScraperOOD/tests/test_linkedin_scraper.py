@@ -0,0 +1,151 @@
+# tests/test_linkedin_scraper.py
+import configparser
+import time
+from argparse import ArgumentParser, Namespace
+from datetime import date, timedelta
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+from LinkedInJobScraper import LinkedInJobScraper
+
+CARD_CLASS = "base-card relative w-full hover:no-underline focus:no-underline base-card--link base-search-card base-search-card--link job-search-card"
+
+
+def search_page(base_url, job_ids, posted=None):
+    posted = posted or date.today()
+    cards = "".join(
+        f'<li><div class="{CARD_CLASS}" data-entity-urn="urn:li:jobPosting:{job_id}">'
+        f'<a href="{base_url}/jobs/view/{job_id}?refId=x"></a>'
+        f'<time datetime="{posted.isoformat()}"></time></div></li>'
+        for job_id in job_ids)
+    return f"<html><body><ul>{cards}</ul></body></html>"
+
+
+def make_scraper(base_url, extra=""):
+    config = configparser.RawConfigParser()
+    config.read_string(
+        "[LinkedIn]\n"
+        "LINKEDIN_USERNAME = user\n"
+        "LINKEDIN_PASSWORD = password\n"
+        f"LINKEDIN_BASE_URL = {base_url}/jobs/search?keywords=leader\n"
+        "LINKEDIN_TIME_FILTER = 1440\n"
+        "PAGE_SIZE = 2\n"
+        f"{extra}"
+        "[Cache]\nENABLED = false\n")
+
+    parser = ArgumentParser()
+    parser.parse_args = lambda: Namespace(username=None, password=None, url=None)
+    return LinkedInJobScraper(config, parser)
+
+
+@pytest.fixture
+def paged_server(local_server):
+    pages = {
+        0: search_page(local_server.url, [1, 2]),
+        2: search_page(local_server.url, [2, 3]),
+        4: search_page(local_server.url, [4]),
+        6: search_page(local_server.url, []),
+    }
+
+    def search(handler):
+        start = int(parse_qs(urlparse(handler.path).query).get("start", ["0"])[0])
+        return (200, pages.get(start, search_page(local_server.url, [])), {})
+
+    local_server.routes["/jobs/search"] = search
+    for job_id in range(1, 6):
+        local_server.routes[f"/jobs/view/{job_id}"] = (200, f"job {job_id}", {})
+    return local_server
+
+
+@pytest.mark.parametrize("mode", ["async", "serial", "threaded"])
+def test_scrape_walks_pages_until_empty(paged_server, mode):
+    scraper = make_scraper(paged_server.url, f"FETCH_MODE = {mode}\n")
+
+    jobs = scraper.scrape()
+
+    assert sorted(job.raw_description for job in jobs) == [b"job 1", b"job 2", b"job 3", b"job 4"]
+    assert all(job.source == "LinkedIn" for job in jobs)
+
+
+def test_max_jobs_stops_paging(paged_server):
+    scraper = make_scraper(paged_server.url, "MAX_JOBS = 3\n")
+
+    jobs = scraper.scrape()
+
+    assert len(jobs) == 3
+    assert not any("start=4" in hit for hit in paged_server.hits)
+
+
+def test_time_window_stops_paging(local_server):
+    old = date.today() - timedelta(days=5)
+    local_server.routes["/jobs/search"] = lambda handler: (
+        200,
+        search_page(local_server.url, [1]) if "start=" not in handler.path else search_page(local_server.url, [2], posted=old),
+        {})
+    local_server.routes["/jobs/view/1"] = (200, "job 1", {})
+
+    scraper = make_scraper(local_server.url)
+    cards = list(scraper.iter_search_cards())
+
+    assert [card["id"] for card in cards] == ["1"]
+    assert len([hit for hit in local_server.hits if hit.startswith("/jobs/search")]) == 2
+
+
+def test_guest_mode_fetches_fragments(local_server):
+    def fragments(handler):
+        start = int(parse_qs(urlparse(handler.path).query)["start"][0])
+        ids = {0: [7, 8], 2: [9]}.get(start, [])
+        # the guest endpoint returns bare <li> fragments, no page around them
+        body = search_page(local_server.url, ids).replace("<html><body><ul>", "").replace("</ul></body></html>", "")
+        return (200, body, {})
+
+    local_server.routes["/jobs-guest/jobs/api/seeMoreJobPostings/search"] = fragments
+    for job_id in (7, 8, 9):
+        local_server.routes[f"/jobs/view/{job_id}"] = (200, f"job {job_id}", {})
+
+    scraper = make_scraper(local_server.url, f"SEARCH_MODE = guest\nGUEST_API_URL = {local_server.url}/jobs-guest/jobs/api/seeMoreJobPostings/search\n")
+    jobs = scraper.scrape()
+
+    assert sorted(job.raw_description for job in jobs) == [b"job 7", b"job 8", b"job 9"]
+    assert all(job.url.startswith(f"{local_server.url}/jobs/view/") for job in jobs)
+    assert not any(hit.startswith("/jobs/search") for hit in local_server.hits)
+    assert any("keywords=leader" in hit and "start=0" in hit for hit in local_server.hits)
+
+
+def test_stream_search_walks_pages(paged_server):
+    scraper = make_scraper(paged_server.url, "STREAM_SEARCH = true\n")
+
+    jobs = scraper.scrape()
+
+    assert sorted(job.raw_description for job in jobs) == [b"job 1", b"job 2", b"job 3", b"job 4"]
+    assert sorted(job.id for job in jobs) == ["1", "2", "3", "4"]
+
+
+def test_stream_search_fetches_details_while_page_downloads(local_server):
+    page = search_page(local_server.url, [1, 2])
+    split = page.index("<li>", page.index("<li>") + 1)
+    detail_seen_first = []
+
+    def detail_requested():
+        return any(hit.startswith("/jobs/view/1?") for hit in local_server.hits)
+
+    def slow_page(handler):
+        def chunks():
+            yield page[:split]
+            # hold the rest of the page back until the first card's detail page has been asked for
+            deadline = time.monotonic() + 5
+            while not detail_requested() and time.monotonic() < deadline:
+                time.sleep(0.01)
+            detail_seen_first.append(detail_requested())
+            yield page[split:]
+        return (200, chunks() if "start=" not in handler.path else search_page(local_server.url, []), {})
+
+    local_server.routes["/jobs/search"] = slow_page
+    local_server.routes["/jobs/view/1"] = (200, "job 1", {})
+    local_server.routes["/jobs/view/2"] = (200, "job 2", {})
+
+    jobs = make_scraper(local_server.url, "STREAM_SEARCH = true\n").scrape()
+
+    assert detail_seen_first == [True]
+    assert sorted(job.raw_description for job in jobs) == [b"job 1", b"job 2"]
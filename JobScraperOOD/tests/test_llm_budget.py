@@ -0,0 +1,45 @@
+# tests/test_llm_budget.py
+from configparser import RawConfigParser
+
+from compactor import count_tokens
+from llm_budget import BudgetRegistry, LLMBudget
+
+
+def test_no_limits_never_wait():
+    budget = LLMBudget("llm:test")
+    assert all(budget.reserve("prompt", "description " * 1000) == 0 for _ in range(100))
+
+
+def test_requests_per_minute():
+    budget = LLMBudget("llm:test", requests_per_minute=60)
+    waits = [budget.reserve("hi") for _ in range(62)]
+    # a minute's worth at once, then one a second
+    assert waits[:60] == [0] * 60
+    assert 0.9 < waits[60] <= 1.0
+    assert 1.9 < waits[61] <= 2.0
+
+
+def test_tokens_per_minute_counts_the_input_and_the_reply():
+    description = "Build the pipelines behind our analytics. " * 100
+    budget = LLMBudget("llm:test", tokens_per_minute=6000, output_tokens=500)
+    tokens = count_tokens(description) + 500
+    assert budget.estimate(description) == tokens
+
+    sent = 0
+    while budget.reserve(description) == 0:
+        sent += 1
+    assert sent == 6000 // tokens
+    assert budget.metrics()["tokens"] == tokens * (sent + 1)
+
+
+def test_configured_per_provider():
+    config = RawConfigParser()
+    config.read_string("[OpenAI]\nTOKENS_PER_MINUTE = 30000\nREQUESTS_PER_MINUTE = 500\n[Deepseek]\nOUTPUT_TOKENS = 800\n")
+    budgets = BudgetRegistry()
+    budgets.configure(config)
+
+    openai = budgets.get("llm:openai")
+    assert (openai.tokens.burst, openai.requests.burst, openai.output_tokens) == (30000, 500, 500)
+    deepseek = budgets.get("llm:deepseek")
+    assert (deepseek.tokens, deepseek.requests, deepseek.output_tokens) == (None, None, 800)
+    assert budgets.get("llm:anthropic").tokens is None
@@ -0,0 +1,50 @@
+# tests/test_llm_clients.py
+from types import SimpleNamespace
+
+from llm_clients import LLMClients, PromptCacheStats
+
+
+def test_clients_are_shared_per_key_and_base_url():
+    clients = LLMClients()
+    client = clients.openai("key", "http://127.0.0.1:1/v1")
+
+    assert clients.openai("key", "http://127.0.0.1:1/v1") is client
+    assert clients.openai("other", "http://127.0.0.1:1/v1") is not client
+    assert clients.openai("key") is not client
+
+    clients.close()
+    assert clients.openai("key", "http://127.0.0.1:1/v1") is not client
+
+
+def test_cache_hit_rate_from_usage():
+    stats = PromptCacheStats()
+    # Responses API, then chat completions & Deepseek's own field
+    stats.record_openai("llm:openai", SimpleNamespace(input_tokens=2000, input_tokens_details=SimpleNamespace(cached_tokens=1536)))
+    stats.record_openai("llm:openai", SimpleNamespace(input_tokens=2000, input_tokens_details=SimpleNamespace(cached_tokens=0)))
+    stats.record_openai("llm:deepseek", SimpleNamespace(prompt_tokens=1000, prompt_tokens_details=None, prompt_cache_hit_tokens=600))
+    # Anthropic's input_tokens leaves out the cached tokens
+    stats.record_anthropic("llm:anthropic", SimpleNamespace(input_tokens=200, cache_read_input_tokens=800, cache_creation_input_tokens=0))
+    stats.record_openai("llm:openai", None)
+
+    metrics = stats.metrics()
+    assert metrics["llm:openai"] == {"requests": 2, "input_tokens": 4000, "cached_tokens": 1536, "hit_rate": 0.384}
+    assert metrics["llm:deepseek"]["hit_rate"] == 0.6
+    assert metrics["llm:anthropic"]["input_tokens"] == 1000 and metrics["llm:anthropic"]["hit_rate"] == 0.8
+
+
+def test_requests_share_a_static_prefix(structured_summarizer):
+    settings = "BASE_URL = http://127.0.0.1:1/v1\n"
+    summarizer = structured_summarizer(settings, answer=None)
+
+    first = summarizer._request_body("first job")
+    second = summarizer._request_body("second job")
+
+    # the instructions & schema first, the job text last & on its own
+    assert first["input"][:-1] == second["input"][:-1] and first["text"] == second["text"] == summarizer.job_schema
+    assert first["input"][1]["content"] == summarizer.get_prompt()
+    assert first["input"][-1]["content"] == "first job"
+    assert first["prompt_cache_key"] == second["prompt_cache_key"]
+    assert summarizer._request_body("first job", instructions="other")["prompt_cache_key"] != first["prompt_cache_key"]
+
+    # every summarizer for the same endpoint uses the same keep-alive client
+    assert structured_summarizer(settings, answer=None).client is summarizer.client
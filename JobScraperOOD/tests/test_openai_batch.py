@@ -0,0 +1,111 @@
+# tests/test_openai_batch.py
+import json
+
+import pytest
+
+from job_scraper import Job
+
+PAGE = "<html><body><article><p>{} " + "A role building data platforms for a growing team. " * 20 + "</p></article></body></html>"
+
+JSON = {"Content-Type": "application/json"}
+
+
+class BatchEndpoint:
+    """
+    Stand-in for the OpenAI Files & Batch APIs on the local server: takes the uploaded
+    JSONL, reports the batch in progress once, then serves an output line per request
+    answered with answer(custom_id, body), None for a request that failed
+    """
+
+    def __init__(self, local_server, answer):
+        self.answer = answer
+        self.requests = []
+        self.polls = 0
+        local_server.routes["/v1/files"] = self.upload
+        local_server.routes["/v1/batches"] = self.create
+        local_server.routes["/v1/batches/batch_1"] = self.retrieve
+        local_server.routes["/v1/files/file-out/content"] = self.output
+
+    @staticmethod
+    def _batch(status, **fields):
+        batch = {"id": "batch_1", "object": "batch", "endpoint": "/v1/responses", "input_file_id": "file-in",
+                 "completion_window": "24h", "status": status, "created_at": 0,
+                 "request_counts": {"total": 0, "completed": 0, "failed": 0}}
+        batch.update(fields)
+        return 200, json.dumps(batch), JSON
+
+    def upload(self, handler):
+        # the multipart body, the JSONL lines are the ones that parse
+        for line in handler.body.decode("utf-8").splitlines():
+            if line.startswith('{"custom_id"'):
+                self.requests.append(json.loads(line))
+        return 200, json.dumps({"id": "file-in", "object": "file", "bytes": len(handler.body), "created_at": 0,
+                                "filename": "batch.jsonl", "purpose": "batch", "status": "processed"}), JSON
+
+    def create(self, handler):
+        assert json.loads(handler.body)["input_file_id"] == "file-in"
+        return self._batch("validating")
+
+    def retrieve(self, handler):
+        self.polls += 1
+        if self.polls == 1:
+            return self._batch("in_progress")
+        return self._batch("completed", output_file_id="file-out")
+
+    def output(self, handler):
+        lines = []
+        for request in self.requests:
+            answer = self.answer(request["custom_id"], request["body"])
+            if answer is None:
+                response = {"status_code": 500, "body": {"error": {"message": "server error"}}}
+            else:
+                response = {"status_code": 200, "body": {"output": [
+                    {"type": "message", "content": [{"type": "output_text", "text": json.dumps(answer)}]}]}}
+            lines.append(json.dumps({"id": f"line-{request['custom_id']}", "custom_id": request["custom_id"], "response": response, "error": None}))
+        return 200, "\n".join(lines), {"Content-Type": "application/octet-stream"}
+
+
+@pytest.fixture
+def summarizer(structured_summarizer, local_server, tmp_path):
+    return structured_summarizer(f"BATCH_MODE = true\nBATCH_BASE_URL = {local_server.url}/v1\n"
+                                 f"BATCH_DIRECTORY = {tmp_path}\nBATCH_POLL_INTERVAL = 0\n", answer=None)
+
+
+def _answer(custom_id, body):
+    properties = body["text"]["format"]["schema"]["properties"]
+    # the description tells the stand-in which job it is
+    title = body["input"][-1]["content"].split("JOB ")[1].split()[0]
+    return {name: {"integer": 7, "string": f"{title} {name}"}[spec["type"]] for name, spec in properties.items()}
+
+
+def test_batch_results_map_back_to_their_jobs(summarizer, local_server, tmp_path):
+    endpoint = BatchEndpoint(local_server, lambda custom_id, body: None if "JOB b" in body["input"][-1]["content"] else _answer(custom_id, body))
+    jobs = [Job(id=str(index), url=f"https://example.com/jobs/{name}", raw_description=PAGE.format(f"JOB {name}"))
+            for index, name in enumerate("abc")]
+
+    summaries = summarizer.summarize_batch(jobs)
+
+    assert [request["custom_id"] for request in endpoint.requests] == ["job-0", "job-1", "job-2"]
+    assert {request["url"] for request in endpoint.requests} == {"/v1/responses"}
+    # the same request a live call would make
+    assert endpoint.requests[0]["body"]["text"]["format"]["name"] == "Job_Summarizer"
+    assert endpoint.requests[0]["body"]["model"] == "model"
+    assert endpoint.polls == 2
+
+    assert summaries[0].summary == "a summary" and summaries[0].url == "https://example.com/jobs/a"
+    assert summaries[1] is None
+    assert summaries[2].summary == "c summary" and summaries[2].provenance["summary"] == "llm"
+    assert len(list(tmp_path.glob("batch-*.jsonl"))) == 1
+
+
+def test_jobs_complete_locally_stay_out_of_the_batch(summarizer, local_server):
+    summarizer.skip_llm_if_complete = True
+    endpoint = BatchEndpoint(local_server, _answer)
+    complete = Job(id="1", title="Data Engineer", company="Acme", location="Remote", date="2025-01-01",
+                   salary="$150,000 - $180,000", raw_description=PAGE.format("JOB a"))
+    jobs = [complete, Job(id="2", raw_description=PAGE.format("JOB b"))]
+
+    summaries = summarizer.summarize_batch(jobs)
+
+    assert [request["custom_id"] for request in endpoint.requests] == ["job-1"]
+    assert summaries[0].company == "Acme" and summaries[1].summary == "b summary"
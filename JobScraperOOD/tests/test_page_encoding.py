@@ -0,0 +1,66 @@
+# tests/test_page_encoding.py
+import codecs
+import pickle
+
+from html_parser import HtmlParser
+from page_encoding import PageBody, content_type_charset, decode_body, sniff_charset
+from site_template import parse
+
+PAGE = "<html><body><p>The world’s café — {}</p></body></html>"
+
+
+class Response:
+    def __init__(self, content, content_type):
+        self.content = content
+        self.headers = {"Content-Type": content_type}
+
+
+def test_utf8_without_a_charset_isnt_read_as_latin1():
+    body = PAGE.format("naïve").encode("utf-8")
+    assert decode_body(body) == PAGE.format("naïve")
+    assert "world’s café" in HtmlParser().parse(body).get_text(" ")
+    assert "world’s café" in parse(body).text_content()
+
+
+def test_the_content_type_charset_wins_over_a_guess():
+    response = Response(PAGE.format("Zoë").encode("cp1252"), "text/html; charset=windows-1252")
+    body = PageBody.from_response(response)
+    assert body.charset == "windows-1252"
+    assert decode_body(body) == PAGE.format("Zoë")
+
+
+def test_the_page_declares_its_own_charset():
+    page = '<html><head><meta charset="shift_jis"></head><body>東京のエンジニア</body></html>'
+    assert sniff_charset(page.encode("shift_jis")) == "shift_jis"
+    assert decode_body(page.encode("shift_jis")) == page
+
+    page = "<meta http-equiv='Content-Type' content='text/html; charset=iso-8859-1'><p>Montréal</p>"
+    assert decode_body(page.encode("latin-1")) == page
+
+
+def test_byte_order_marks_and_buffers():
+    assert decode_body(codecs.BOM_UTF8 + "café".encode("utf-8")) == "café"
+    assert decode_body("café".encode("utf-16")) == "café"
+    assert decode_body(memoryview("café".encode("utf-8"))) == "café"
+    assert decode_body("already text") == "already text"
+    assert decode_body(None) is None
+
+
+def test_page_body_keeps_its_charset_when_pickled():
+    body = pickle.loads(pickle.dumps(PageBody(b"caf\xe9", "latin-1")))
+    assert isinstance(body, PageBody) and body.charset == "latin-1"
+    assert decode_body(body) == "café"
+
+
+def test_content_type_charset():
+    assert content_type_charset('text/html; charset="UTF-8"') == "UTF-8"
+    assert content_type_charset("text/html") is None
+    assert content_type_charset(None) is None
+
+
+def test_saved_linkedin_page_decodes_to_the_same_text_as_utf8(job_page):
+    raw = job_page()
+    text = decode_body(raw)
+    assert text == raw.decode("utf-8")
+    # str(bytes) would have sent the escaped repr on to the cleaners
+    assert len(text) < len(str(raw))
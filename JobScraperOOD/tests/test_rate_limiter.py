@@ -0,0 +1,44 @@
+# tests/test_rate_limiter.py
+import configparser
+import time
+
+from rate_limiter import HostRateLimiter, TokenBucket, parse_retry_after
+
+
+def test_burst_then_refill_rate():
+    bucket = TokenBucket(rate=10, burst=3)
+    waits = [bucket.reserve() for _ in range(5)]
+
+    assert waits[:3] == [0.0, 0.0, 0.0]
+    assert 0.05 < waits[3] <= 0.1
+    assert 0.15 < waits[4] <= 0.2
+
+
+def test_block_holds_back_host():
+    bucket = TokenBucket(rate=100, burst=10)
+    bucket.block(2)
+
+    assert bucket.reserve() > 1.9
+
+
+def test_parse_retry_after():
+    assert parse_retry_after("120") == 120
+    assert parse_retry_after(None, fallback=7) == 7
+    assert parse_retry_after("not a date", fallback=5) == 5
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0
+
+
+def test_hosts_have_separate_buckets_and_config():
+    config = configparser.RawConfigParser()
+    config.read_string("[RateLimit]\nDEFAULT_RATE = 50\nDEFAULT_BURST = 1\nwww.dice.com = 0.5, 1\n")
+
+    limiter = HostRateLimiter()
+    limiter.configure(config)
+
+    assert limiter.bucket("https://www.dice.com/job-detail/1").rate == 0.5
+    assert limiter.bucket("https://www.linkedin.com/jobs/view/1").rate == 50
+
+    start = time.monotonic()
+    limiter.acquire("https://www.linkedin.com/jobs/view/1")
+    limiter.acquire("https://www.dice.com/job-detail/1")
+    assert time.monotonic() - start < 0.1
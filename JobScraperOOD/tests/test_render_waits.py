@@ -0,0 +1,52 @@
+# tests/test_render_waits.py
+import time
+
+from render_waits import all_of, css_present, url_contains, wait_for_any
+
+
+class FakeDriver:
+    """Renders `selector` after `delay` seconds, optionally redirecting to `redirect_url`"""
+
+    def __init__(self, selector, delay, url="https://www.dice.com/jobs?q=ai", redirect_url=None):
+        self.selector = selector
+        self.ready_at = time.monotonic() + delay
+        self.url = url
+        self.redirect_url = redirect_url
+
+    @property
+    def current_url(self):
+        if self.redirect_url and time.monotonic() >= self.ready_at:
+            return self.redirect_url
+        return self.url
+
+    def find_elements(self, by, selector):
+        if selector == self.selector and time.monotonic() >= self.ready_at:
+            return ["element"]
+        return []
+
+
+def test_returns_first_condition_met():
+    driver = FakeDriver("a.card", delay=0.2)
+
+    start = time.monotonic()
+    match = wait_for_any(driver, {1: css_present("a.card"), 2: css_present("div.results")}, timeout=5)
+
+    assert match == 1
+    assert time.monotonic() - start < 1
+
+
+def test_redirect_detected_while_waiting_for_cards():
+    driver = FakeDriver("div.results", delay=0.2, redirect_url="https://www.dice.com/platform/jobs?q=ai")
+
+    match = wait_for_any(driver, {
+        1: css_present("a.card"),
+        2: all_of(url_contains("/platform/jobs"), css_present("div.results")),
+    }, timeout=5)
+
+    assert match == 2
+
+
+def test_timeout_returns_none():
+    driver = FakeDriver("a.card", delay=10)
+
+    assert wait_for_any(driver, {1: css_present("a.card")}, timeout=0.3) is None
@@ -0,0 +1,95 @@
+# tests/test_response_cache.py
+import sqlite3
+
+from async_fetcher import AsyncFetcher
+from page_encoding import PageBody
+from response_cache import ResponseCache
+from singleflight import fetch_flight
+
+
+def test_store_and_fresh_hit(tmp_path):
+    cache = ResponseCache(directory=str(tmp_path), ttl=60)
+    cache.store("https://example.com/job/1", b"<html>job 1</html>", {"ETag": '"abc"'})
+
+    cached = cache.get("https://example.com/job/1")
+
+    assert cached.content == b"<html>job 1</html>"
+    assert cache.metrics()["hits"] == 1
+    assert cache.get("https://example.com/job/2") is None
+
+
+def test_identical_bodies_share_storage(tmp_path):
+    cache = ResponseCache(directory=str(tmp_path), ttl=60)
+    cache.store("https://example.com/job/1?refId=a", b"same page")
+    cache.store("https://example.com/job/1?refId=b", b"same page")
+
+    bodies = [path for path in tmp_path.rglob("*.gz")]
+    assert len(bodies) == 1
+
+
+def test_stale_entry_revalidates_with_etag(tmp_path, local_server):
+    def etag_route(handler):
+        if handler.headers.get("If-None-Match") == '"v1"':
+            return (304, b"", {})
+        return (200, b"job page", {"ETag": '"v1"'})
+
+    local_server.routes["/job"] = etag_route
+    cache = ResponseCache(directory=str(tmp_path), ttl=0)
+    fetcher = AsyncFetcher(name="test-cache", concurrency=1, timeout=5, cache=cache)
+
+    first = fetcher.fetch_all_sync([f"{local_server.url}/job"])
+    # a new run, so the page isn't shared from the first fetch
+    fetch_flight.reset()
+    second = fetcher.fetch_all_sync([f"{local_server.url}/job"])
+
+    assert first == second == [b"job page"]
+    assert cache.metrics()["revalidations"] == 1
+
+
+def test_fresh_hit_is_a_page_body(tmp_path, local_server):
+    local_server.routes["/job"] = (200, b"job page", {})
+    cache = ResponseCache(directory=str(tmp_path), ttl=60)
+    fetcher = AsyncFetcher(name="test-cache-hit", concurrency=1, timeout=5, cache=cache)
+
+    fetcher.fetch_all_sync([f"{local_server.url}/job"])
+    fetch_flight.reset()
+    [page] = fetcher.fetch_all_sync([f"{local_server.url}/job"])
+
+    # the cached copy goes on to the parsers just like a downloaded one
+    assert isinstance(page, PageBody) and page == b"job page"
+    assert cache.metrics()["hits"] == 1
+
+
+def test_cached_page_keeps_its_charset(tmp_path, local_server):
+    local_server.routes["/job"] = (200, "Café".encode("latin-1"), {"Content-Type": "text/html; charset=ISO-8859-1"})
+    cache = ResponseCache(directory=str(tmp_path), ttl=60)
+    fetcher = AsyncFetcher(name="test-cache-charset", concurrency=1, timeout=5, cache=cache)
+
+    fetcher.fetch_all_sync([f"{local_server.url}/job"])
+    fetch_flight.reset()
+    [page] = fetcher.fetch_all_sync([f"{local_server.url}/job"])
+
+    assert page.charset == "ISO-8859-1"
+    assert cache.get(f"{local_server.url}/job").text == "Café"
+    assert [body.charset for _, body in cache.pages()] == ["ISO-8859-1"]
+
+
+def test_index_without_content_type_is_upgraded(tmp_path):
+    with sqlite3.connect(tmp_path / "index.sqlite") as conn:
+        conn.execute("CREATE TABLE entries (url_key TEXT PRIMARY KEY, url TEXT, body_hash TEXT, etag TEXT, "
+                     "last_modified TEXT, stored_at REAL, last_access REAL, size INTEGER)")
+    conn.close()
+
+    cache = ResponseCache(directory=str(tmp_path), ttl=60)
+    cache.store("https://example.com/job/1", b"job 1", {"Content-Type": "text/html; charset=utf-8"})
+
+    assert cache.get("https://example.com/job/1").headers == {"Content-Type": "text/html; charset=utf-8"}
+
+
+def test_lru_eviction(tmp_path):
+    cache = ResponseCache(directory=str(tmp_path), ttl=60, max_size=45)
+    cache.store("https://example.com/job/1", b"first page")
+    cache.store("https://example.com/job/2", b"second page")
+
+    assert cache.get("https://example.com/job/1") is None
+    assert len(list(tmp_path.rglob("*.gz"))) == 1
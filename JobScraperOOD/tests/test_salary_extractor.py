@@ -0,0 +1,119 @@
+# tests/test_salary_extractor.py
+import pytest
+
+from job_scraper import Job
+from salary_extractor import extract_salary, salary_snippets
+
+
+@pytest.mark.parametrize("text, lower, upper", [
+    # the forms job_scrape.py's salary_regex list looked for
+    ("Pay range: $120,000 - $150,000", 120000, 150000),
+    ("$120,000 to $150,000 a year", 120000, 150000),
+    ("$60.50 to $75.00", 125840, 156000),
+    ("$362,000—$394,000 USD", 362000, 394000),
+    ("$150,000/year in our lowest geographic market up to $210,000/year in our highest", 150000, 210000),
+    ("Salaries starting at $95,000", 95000, None),
+    ("Up to $200,000", None, 200000),
+    # & what it missed
+    ("$120K/yr - $150K/yr", 120000, 150000),
+    ("$120-150K", 120000, 150000),
+    ("$45 per hour", 93600, 93600),
+    ("$8,000 - $10,000 per month", 96000, 120000),
+    ("£55,000 – £65,000", 55000, 65000),
+    ("The salary is $130,000.", 130000, 130000),
+])
+def test_salary_forms(text, lower, upper):
+    found = extract_salary(text)
+    assert (found["salary_lower"], found["salary_upper"]) == (lower, upper)
+
+
+def test_range_preferred_to_earlier_single_amount():
+    found = extract_salary("A $5,000 signing bonus. The base salary is $130,000 - $160,000 per year.")
+    assert found == {"salary": "$130,000 - $160,000 per year", "salary_lower": 130000, "salary_upper": 160000}
+
+
+def test_not_salaries():
+    assert extract_salary("We raised $50M & give every hire a $100 stipend") == {}
+    assert extract_salary("No salary listed") == {}
+    assert extract_salary(None) == {}
+
+
+def test_only_the_lower_bound_when_the_second_number_is_not_a_salary():
+    assert extract_salary("Base salary $90,000 and 5 years of experience")["salary"] == "$90,000"
+
+
+def test_a_lone_amount_needs_a_pay_cue():
+    assert extract_salary("Starting from $80,000 depending on experience") == {
+        "salary": "Starting from $80,000", "salary_lower": 80000, "salary_upper": None}
+    assert extract_salary("A $10,000 relocation bonus for the right candidate") == {}
+    assert extract_salary("Compensation includes a $25,000 signing bonus") == {}
+    assert extract_salary("Over 40,000 customers & $12,000 in credits") == {}
+    assert extract_salary("$120,000", known_salary=True)["salary_upper"] == 120000
+    # a range or a pay period is enough on its own
+    assert extract_salary("$120,000 - $140,000")["salary_upper"] == 140000
+    assert extract_salary("$2,000 a month")["salary_upper"] == 24000
+
+
+def test_salary_snippets_are_a_sliver_of_the_page(job_page):
+    raw = job_page()
+
+    snippets = salary_snippets(raw)
+
+    assert 0 < len(snippets) <= 6
+    assert sum(len(snippet) for snippet in snippets) * 50 < len(raw)
+    assert "$362,000.00/yr - $394,000.00/yr" in snippets[0]
+    assert not any("<" in snippet for snippet in snippets)
+
+
+def test_no_snippets_without_pay():
+    assert salary_snippets("<html><body><script>var price = '$5';</script><p>Great team</p></body></html>") == []
+
+
+@pytest.fixture
+def summarizer(structured_summarizer):
+    def answer(text, schema, instructions):
+        properties = schema["format"]["schema"]["properties"]
+        if instructions is not None:
+            return {"salary": "$150,000 - $180,000", "salary_lower": 150000, "salary_upper": 180000}
+        return {name: {"integer": 0, "string": ""}[spec["type"]] if name.startswith("salary") else
+                {"integer": 7, "string": f"llm {name}"}[spec["type"]] for name, spec in properties.items()}
+
+    return structured_summarizer(answer=answer)
+
+
+DESCRIPTION = "<p>" + "A role building data platforms for a growing team. " * 20 + "</p>"
+
+
+def test_summarizer_uses_the_salary_in_the_description(summarizer):
+    queries = summarizer.queries
+    page = "<html><body><article><p>" + "A role building data platforms for a growing team. " * 20 + \
+        "The pay is $140,000 to $170,000 a year.</p></article></body></html>"
+
+    job = summarizer.summarize(Job(id="1", title="Card Title", salary="$130K/yr - $150K/yr", raw_description=page))
+    assert (job.salary_lower, job.salary_upper, job.provenance["salary_upper"]) == (130000, 150000, "card")
+
+    job = summarizer.summarize(Job(id="2", title="Card Title", raw_description=page))
+    assert (job.salary_lower, job.salary_upper, job.provenance["salary_upper"]) == (140000, 170000, "regex")
+    assert summarizer.WANTED_PROMPT + "company, location, date, description, summary, fit" in queries[-1][0]
+
+
+def test_salary_requery_sends_only_the_snippets(summarizer):
+    summarizer.retry_on_no_salary = True
+    summarizer.local_salary = False
+    page = "<html><body><article>" + DESCRIPTION + "</article><table><tr><td>Pay range</td><td>$150,000 - $180,000</td></tr></table>" + \
+        "<script>" + "var x = 1;" * 5000 + "</script></body></html>"
+
+    job = summarizer.summarize(Job(id="1", title="Data Engineer", raw_description=page))
+
+    text, schema, instructions = summarizer.queries[-1]
+    assert set(schema["format"]["schema"]["properties"]) == {"salary", "salary_lower", "salary_upper"}
+    assert instructions is not None and "$150,000 - $180,000" in text and len(text) * 50 < len(page)
+    assert (job.salary_lower, job.salary_upper, job.provenance["salary_upper"], job.summary) == (150000, 180000, "llm", "llm summary")
+
+
+def test_no_salary_requery_when_the_page_never_mentions_pay(summarizer):
+    summarizer.retry_on_no_salary = True
+
+    job = summarizer.summarize(Job(id="1", title="Data Engineer", raw_description="<html><body><article>" + DESCRIPTION + "</article></body></html>"))
+
+    assert len(summarizer.queries) == 1 and not job.salary_upper
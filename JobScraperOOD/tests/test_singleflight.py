@@ -0,0 +1,53 @@
+# tests/test_singleflight.py
+import threading
+import time
+
+from async_fetcher import AsyncFetcher
+from singleflight import SingleFlight, canonical_url
+
+
+def test_canonical_url_strips_tracking():
+    a = "https://www.linkedin.com/jobs/view/director-4132750878?position=1&pageNum=0&refId=abc%3D%3D&trackingId=xyz"
+    b = "https://WWW.linkedin.com/jobs/view/director-4132750878/?refId=other&trackingId=zzz#top"
+
+    assert canonical_url(a) == canonical_url(b) == "https://www.linkedin.com/jobs/view/director-4132750878"
+    assert canonical_url("https://www.dice.com/jobs?q=ai&utm_source=x&location=Seattle") == "https://www.dice.com/jobs?location=Seattle&q=ai"
+
+
+def test_concurrent_callers_share_one_call():
+    flight = SingleFlight()
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        time.sleep(0.2)
+        return b"page"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(flight.do(f"https://example.com/job?refId={i}", fetch))) for i in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == [b"page"] * 5
+    assert len(calls) == 1
+    # later callers in the run reuse the result
+    assert flight.do("https://example.com/job", fetch) == b"page"
+    assert len(calls) == 1
+
+
+def test_failures_are_not_kept():
+    flight = SingleFlight()
+    assert flight.do("https://example.com/job", lambda: None) is None
+    assert flight.do("https://example.com/job", lambda: b"page") == b"page"
+
+
+def test_async_fetcher_coalesces_duplicate_urls(local_server):
+    local_server.routes["/jobs/view/1"] = (200, "job 1", {})
+    urls = [f"{local_server.url}/jobs/view/1?refId={i}&trackingId={i}" for i in range(4)]
+
+    pages = AsyncFetcher(name="test-singleflight", concurrency=4, timeout=5).fetch_all_sync(urls)
+
+    assert pages == [b"job 1"] * 4
+    assert len(local_server.hits) == 1
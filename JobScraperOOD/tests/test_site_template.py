@@ -0,0 +1,69 @@
+# tests/test_site_template.py
+from cpu_stage import CpuStage
+from job_scraper import Job
+from site_template import TemplateStore, page_blocks, parse, strip_template, to_html
+
+CHROME = """
+<nav class="top-nav"><a href="/">Jobs</a><a href="/people">People</a><a href="/learning">Learning</a><a href="/jobs/saved">Saved jobs</a></nav>
+<section class="similar-jobs"><h2>People also viewed</h2><ul><li>Staff Engineer at Initech</li><li>Data Lead at Hooli</li></ul></section>
+<footer><p>© 2025 Jobsite Corporation</p><a href="/terms">User Agreement</a> <a href="/privacy">Privacy Policy</a></footer>
+"""
+
+
+def page(n, title):
+    return f"""<html><head><script type="application/ld+json">{{"@type": "JobPosting", "title": "{title}"}}</script></head><body>
+{CHROME.replace("2025", str(2020 + n))}
+<article><h1>{title}</h1><p>{title} number {n} owns the pipelines that move our data every day, working with a friendly team.</p>
+<p>Requirements for the {title}: {n} years of Python, SQL and cloud experience.</p></article>
+</body></html>"""
+
+
+def test_blocks_on_every_page_are_learned_and_stripped():
+    pages = [parse(page(n, title)) for n, title in enumerate(["Data Engineer", "Platform Engineer", "ML Engineer"])]
+
+    template = TemplateStore.learn([page_blocks(document) for document in pages])
+    document = parse(page(7, "Analytics Engineer"))
+    strip_template(document, template)
+    html = to_html(document)
+
+    for gone in ("People also viewed", "User Agreement", "top-nav"):
+        assert gone not in html
+    for kept in ("Analytics Engineer number 7", "7 years of Python", "application/ld+json"):
+        assert kept in html
+
+
+def test_template_is_saved_and_reloaded(tmp_path):
+    store = TemplateStore(directory=str(tmp_path), min_pages=2)
+    store.observe("Jobsite", page_blocks(parse(page(1, "Data Engineer"))))
+    assert store.template("Jobsite") is None
+
+    store.observe("Jobsite", page_blocks(parse(page(2, "ML Engineer"))))
+
+    assert store.template("Jobsite")
+    assert TemplateStore(directory=str(tmp_path)).template("Jobsite") == store.template("Jobsite")
+    assert store.template("Other") is None
+
+
+def test_cpu_stage_learns_then_strips(tmp_path):
+    stage = CpuStage(workers=0, chunk_size=1, templates=TemplateStore(directory=str(tmp_path), min_pages=2))
+    jobs = [Job(source="Jobsite", raw_description=page(n, "Data Engineer")) for n in range(3)]
+
+    list(stage.prepared(jobs))
+
+    # the pages after the template was learned are stripped
+    assert "Initech" not in jobs[2].cleaned_description
+    assert "number 2 owns the pipelines" in jobs[2].cleaned_description
+    assert jobs[2].page_fields[0]["title"] == "Data Engineer"
+
+
+def test_saved_pages_lose_shared_chrome(job_page):
+    raw = [job_page(name) for name in ("job.txt", "page.html")]
+
+    template = TemplateStore.learn([page_blocks(parse(content)) for content in raw])
+    document = parse(raw[0])
+    before = len(to_html(document))
+    strip_template(document, template)
+    html = to_html(document)
+
+    assert template and len(html) < before
+    assert "$362,000.00/yr - $394,000.00/yr" in html
@@ -0,0 +1,92 @@
+# tests/test_structured_data.py
+import json
+
+import pytest
+
+from job_scraper import Job
+from structured_data import extract_job_fields
+
+
+def json_ld(data):
+    return f'<html><head><script type="application/ld+json">{json.dumps(data)}</script></head><body></body></html>'
+
+
+def test_job_posting_json_ld_on_saved_page(job_page):
+    fields, provenance = extract_job_fields(job_page())
+
+    assert fields == {
+        "title": "Vice President Go-To-Market Systems",
+        "company": "Qualtrics",
+        "location": "Seattle, WA, US",
+        "date": "2025-03-31",
+        "salary": "$362,000 - $394,000",
+        "salary_lower": 362000,
+        "salary_upper": 394000,
+    }
+    assert set(provenance.values()) == {"json-ld"}
+
+
+def test_hourly_salary_in_a_graph_is_annualised():
+    page = json_ld({"@graph": [
+        {"@type": "Organization", "name": "Other"},
+        {"@type": ["JobPosting"], "title": "Contractor", "jobLocationType": "TELECOMMUTE",
+         "baseSalary": {"currency": "USD", "value": {"minValue": "50", "maxValue": "60.5", "unitText": "HOUR"}}},
+    ]})
+
+    fields, _ = extract_job_fields(page)
+
+    assert fields["location"] == "Remote"
+    assert fields["salary"] == "$50 - $60 per hour"
+    assert (fields["salary_lower"], fields["salary_upper"]) == (104000, 125840)
+
+
+def test_meta_tags_fill_in_when_there_is_no_json_ld():
+    page = ('<html><head><meta property="og:title" content="Qualtrics hiring Vice President in Seattle, WA | LinkedIn">'
+            '<script type="application/ld+json">{not json</script></head></html>')
+
+    fields, provenance = extract_job_fields(page)
+
+    assert fields == {"company": "Qualtrics", "title": "Vice President", "location": "Seattle, WA"}
+    assert provenance == {"company": "meta", "title": "meta", "location": "meta"}
+
+
+def test_nothing_to_find():
+    assert extract_job_fields(b"") == ({}, {})
+    assert extract_job_fields("<html><body><p>Just text</p></body></html>") == ({}, {})
+
+
+@pytest.fixture
+def summarizer(structured_summarizer):
+    return structured_summarizer()
+
+
+def test_llm_only_asked_for_missing_fields(summarizer, job_page):
+    job = summarizer.summarize(Job(id="4104638350", url="https://www.linkedin.com/jobs/view/4104638350", raw_description=job_page()))
+
+    text, schema, _ = summarizer.queries[0]
+    # the whole schema every time so the request prefix stays cacheable, the wanted fields go with the job
+    assert schema == summarizer.job_schema
+    assert text.endswith(summarizer.WANTED_PROMPT + "description, summary, fit" + text[text.index("\n\nThese fields"):])
+    assert '"salary_upper": 394000' in text
+    assert (job.title, job.company, job.salary_upper, job.summary, job.fit) == (
+        "Vice President Go-To-Market Systems", "Qualtrics", 394000, "llm summary", 7)
+    assert job.provenance["title"] == "json-ld" and job.provenance["summary"] == "llm"
+
+
+def test_card_fields_fill_gaps(summarizer):
+    page = "<html><body><article><p>" + "A role building data platforms for a growing team. " * 20 + "</p></article></body></html>"
+
+    job = summarizer.summarize(Job(id="1", title="Card Title", company="Card Co", raw_description=page))
+
+    assert summarizer.WANTED_PROMPT + "location, date, salary, salary_lower, salary_upper, description, summary, fit" in summarizer.queries[0][0]
+    assert (job.title, job.company, job.location) == ("Card Title", "Card Co", "llm location")
+    assert job.provenance["title"] == "card" and job.provenance["location"] == "llm"
+
+
+def test_skip_llm_when_page_has_everything(summarizer, job_page):
+    summarizer.skip_llm_if_complete = True
+
+    job = summarizer.summarize(Job(id="1", raw_description=job_page()))
+
+    assert summarizer.queries == []
+    assert job.salary_lower == 362000 and job.summary == ""
@@ -0,0 +1,136 @@
+# tests/test_summary_cache.py
+import time
+
+from configparser import RawConfigParser
+
+from job_scraper import GenAISummarizer, Job
+from summary_cache import CachedSummarizer, SummaryCache
+
+
+DESCRIPTION = "Senior Data Engineer\nAcme\nBuild the pipelines behind our analytics. $150,000 - $180,000"
+
+
+class CountingSummarizer(GenAISummarizer):
+    def __init__(self, prompt="Summarize this job", model="gpt-test"):
+        self.prompt = prompt
+        self.model = model
+        self.calls = 0
+
+    def get_prompt(self):
+        return self.prompt
+
+    def get_model(self):
+        return self.model
+
+    def summarize(self, job):
+        self.calls += 1
+        return Job(id=job.id, source=job.source, url=job.url, title="Senior Data Engineer", company="Acme",
+                   location=job.location, date=job.date,
+                   salary_lower=150000, salary_upper=180000, summary="Pipelines", fit=7,
+                   raw_description=job.raw_description, provenance={"summary": "llm"})
+
+
+def _job(url, description=DESCRIPTION):
+    return Job(id=None, url=url, raw_description=b"<html>page</html>", cleaned_description=description)
+
+
+def test_a_repost_is_served_from_the_cache(tmp_path):
+    inner = CountingSummarizer()
+    summarizer = CachedSummarizer(inner, SummaryCache(path=str(tmp_path / "summaries.sqlite")))
+
+    first = summarizer.summarize(_job("https://example.com/jobs/1"))
+    repost = summarizer.summarize(_job("https://example.com/jobs/2"))
+
+    assert inner.calls == 1
+    assert repost.url == "https://example.com/jobs/2"
+    assert (repost.title, repost.salary_upper, repost.fit, repost.provenance) == (first.title, 180000, 7, {"summary": "llm"})
+    assert summarizer.cache.metrics() == {"hits": 1, "misses": 1}
+
+
+def test_the_cache_persists_between_runs(tmp_path):
+    path = str(tmp_path / "summaries.sqlite")
+    CachedSummarizer(CountingSummarizer(), SummaryCache(path=path)).summarize(_job("https://example.com/jobs/1"))
+
+    inner = CountingSummarizer()
+    CachedSummarizer(inner, SummaryCache(path=path)).summarize(_job("https://example.com/jobs/1"))
+
+    assert inner.calls == 0
+
+
+def test_a_new_prompt_model_or_description_misses(tmp_path):
+    path = str(tmp_path / "summaries.sqlite")
+    CachedSummarizer(CountingSummarizer(), SummaryCache(path=path)).summarize(_job("https://example.com/jobs/1"))
+
+    for inner, job in ((CountingSummarizer(prompt="A new prompt"), _job("https://example.com/jobs/1")),
+                       (CountingSummarizer(model="gpt-other"), _job("https://example.com/jobs/1")),
+                       (CountingSummarizer(), _job("https://example.com/jobs/1", DESCRIPTION + " Remote"))):
+        CachedSummarizer(inner, SummaryCache(path=path)).summarize(job)
+        assert inner.calls == 1
+
+
+def test_a_new_setting_misses(tmp_path):
+    path = str(tmp_path / "summaries.sqlite")
+    CachedSummarizer(CountingSummarizer(), SummaryCache(path=path)).summarize(_job("https://example.com/jobs/1"))
+
+    inner = CountingSummarizer()
+    inner.local_salary = False
+    CachedSummarizer(inner, SummaryCache(path=path)).summarize(_job("https://example.com/jobs/1"))
+    assert inner.calls == 1
+
+    inner = CountingSummarizer()
+    inner.compactor = type("Compactor", (), {"budget": 800, "drop_boilerplate": True, "encoding": "o200k_base"})()
+    CachedSummarizer(inner, SummaryCache(path=path)).summarize(_job("https://example.com/jobs/1"))
+    assert inner.calls == 1
+
+
+def test_expired_entries_are_summarized_again(tmp_path):
+    inner = CountingSummarizer()
+    summarizer = CachedSummarizer(inner, SummaryCache(path=str(tmp_path / "summaries.sqlite"), ttl=0))
+
+    summarizer.summarize(_job("https://example.com/jobs/1"))
+    summarizer.summarize(_job("https://example.com/jobs/1"))
+
+    assert inner.calls == 2
+
+
+def test_least_recently_used_evicted_past_max_size(tmp_path):
+    cache = SummaryCache(path=str(tmp_path / "summaries.sqlite"), max_size=250)
+    cache.put("a", {"summary": "x" * 100})
+    time.sleep(0.01)
+    cache.put("b", {"summary": "y" * 100})
+    time.sleep(0.01)
+    cache.get("a")
+    cache.put("c", {"summary": "z" * 100})
+
+    assert cache.get("a") is not None
+    assert cache.get("b") is None
+    assert cache.get("c") is not None
+
+
+def test_from_config(tmp_path):
+    config = RawConfigParser()
+    config.read_string(f"[SummaryCache]\nPATH = {tmp_path / 'cache.sqlite'}\nTTL = 60\nMAX_SIZE_MB = 1\n")
+    cache = SummaryCache.from_config(config)
+    assert (cache.ttl, cache.max_size) == (60, 1024 * 1024)
+
+    config.read_string("[SummaryCache]\nENABLED = false\n")
+    inner = CountingSummarizer()
+    assert CachedSummarizer.wrap(inner, config) is inner
+
+
+def test_a_cross_post_keeps_its_own_location_and_date(tmp_path):
+    inner = CountingSummarizer()
+    summarizer = CachedSummarizer(inner, SummaryCache(path=str(tmp_path / "summaries.sqlite")))
+    seattle = _job("https://example.com/jobs/1")
+    seattle.location, seattle.date = "Seattle, WA", "2025-03-01"
+    austin = _job("https://example.com/jobs/2")
+    austin.location, austin.date = "Austin, TX", "2025-04-01"
+
+    first = summarizer.summarize(seattle)
+    repost = summarizer.summarize(austin)
+
+    assert inner.calls == 1
+    assert (first.location, repost.location) == ("Seattle, WA", "Austin, TX")
+    assert repost.date == "2025-04-01" and repost.provenance["location"] == "card"
+    # the LLM's parts are reused
+    assert (repost.summary, repost.fit, repost.provenance["summary"]) == ("Pipelines", 7, "llm")
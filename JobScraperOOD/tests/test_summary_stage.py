@@ -0,0 +1,129 @@
+# tests/test_summary_stage.py
+import configparser
+import json
+import threading
+import time
+
+import pytest
+
+from job_scraper import GenAISummarizer, Job
+from summary_cache import CachedSummarizer, SummaryCache
+from summary_stage import SummaryStage
+
+
+class SlowSummarizer(GenAISummarizer):
+    """Stand-in for an LLM summarizer, each call takes latency seconds"""
+
+    def __init__(self, latency=0.05, failures=0):
+        self.latency = latency
+        self.failures = failures
+        self.calls = 0
+        self.in_flight = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def summarize(self, job):
+        with self._lock:
+            self.calls += 1
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+            fail = self.failures > 0
+            self.failures -= 1
+        time.sleep(self.latency)
+        with self._lock:
+            self.in_flight -= 1
+        return None if fail else Job(id=job.id, title=f"job {job.id}")
+
+
+def _jobs(count):
+    return [Job(id=i) for i in range(count)]
+
+
+def test_summaries_run_concurrently():
+    summarizer = SlowSummarizer(latency=0.05)
+    stage = SummaryStage(concurrency=8)
+
+    started = time.monotonic()
+    summaries = list(stage.summarized(summarizer, iter(_jobs(24))))
+    elapsed = time.monotonic() - started
+
+    assert sorted(job.id for job in summaries) == list(range(24))
+    assert summarizer.peak == 8
+    # 24 jobs at 0.05s each would take 1.2s one at a time
+    assert elapsed < 0.6
+    assert stage.metrics()["summarized"] == 24
+
+
+def test_concurrency_bounds_the_requests_in_flight():
+    summarizer = SlowSummarizer(latency=0.02)
+    list(SummaryStage(concurrency=3).summarized(summarizer, _jobs(12)))
+    assert summarizer.peak == 3
+
+
+def test_failed_summaries_are_retried_then_dropped():
+    summarizer = SlowSummarizer(latency=0, failures=2)
+    stage = SummaryStage(concurrency=1, max_retries=2)
+
+    summaries = list(stage.summarized(summarizer, _jobs(3)))
+
+    # the first job fails both attempts, the others succeed first time
+    assert [job.id for job in summaries] == [1, 2]
+    assert stage.metrics()["failed"] == 1
+
+
+def test_limit_stops_taking_jobs():
+    taken = []
+
+    def jobs():
+        for job in _jobs(20):
+            taken.append(job.id)
+            yield job
+
+    summaries = list(SummaryStage(concurrency=4).summarized(SlowSummarizer(latency=0.01), jobs(), limit=2))
+
+    assert len(summaries) == 2
+    assert len(taken) <= 3
+
+
+# (module, class, config section, query method) of the summarizers that take the whole page
+PROVIDERS = [
+    ("ai_summarizer", "OpenAISummarizer", "[OpenAI]\nOPENAI_API_KEY = key\nMODEL = model\n", "_query_openai"),
+    ("anthropic_summarizer", "AnthropicSummarizer", "[Anthropic]\nANTHROPIC_API_KEY = key\nANTHROPIC_MODEL = model\n", "_query_anthropic"),
+    ("deepseek_summarizer", "DeepseekSummarizer", "[Deepseek]\nDEEPSEEK_API_KEY = key\nMODEL = model\n", "_query_deekseek"),
+]
+
+
+def test_the_structured_summarizer_through_the_stage(structured_summarizer):
+    summarizer = structured_summarizer()
+    page = "<html><body><article><p>Job {}. " + "A role building data platforms for a growing team. " * 20 + "</p></article></body></html>"
+
+    summaries = list(SummaryStage(concurrency=2).summarized(summarizer, [Job(id=str(n), raw_description=page.format(n)) for n in range(3)]))
+
+    assert len(summaries) == 3 and len(summarizer.queries) == 3
+    assert all(job.summary == "llm summary" for job in summaries)
+
+
+@pytest.mark.parametrize("module, name, section, query", PROVIDERS)
+def test_each_provider_summarizes_jobs_through_the_stage_and_cache(module, name, section, query, prompt_file, monkeypatch, tmp_path):
+    config = configparser.RawConfigParser()
+    config.read_string(section)
+    summarizer = getattr(pytest.importorskip(module), name)(config, prompt_file)
+    sent = []
+
+    def answer(text):
+        sent.append(text)
+        return json.dumps({"title": text.split(".")[0], "summary": "llm summary", "fit": 7})
+
+    monkeypatch.setattr(summarizer, query, answer)
+    cached = CachedSummarizer(summarizer, SummaryCache(path=str(tmp_path / "summaries.sqlite")))
+    page = "<html><body><article><p>{}. " + "A role building data platforms for a growing team. " * 20 + "</p></article></body></html>"
+    jobs = [Job(id="1", url="https://example.com/jobs/1", raw_description=page.format("Data Engineer").encode("utf-8")),
+            # cleaned by the CPU stage already
+            Job(id="2", url="https://example.com/jobs/2", raw_description=b"<html></html>", cleaned_description="Platform Engineer. Own the platform.")]
+
+    summaries = sorted(SummaryStage(concurrency=2).summarized(cached, jobs), key=lambda job: job.title)
+
+    assert [job.title for job in summaries] == ["Data Engineer", "Platform Engineer"]
+    assert all(job.summary == "llm summary" for job in summaries)
+    assert sorted(text.split(".")[0] for text in sent) == ["Data Engineer", "Platform Engineer"]
+    assert summaries[0].raw_description == jobs[0].raw_description
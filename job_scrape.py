@@ -14,6 +14,7 @@ import logging
 import json
 
 import configparser
+import functools
 from argparse import ArgumentParser
 
 
@@ -401,13 +402,15 @@ def upload_resume_files():
 def query_openai(prompt, model="gpt-3.5-turbo", temp=0.1, max_tokens=500):
     try:
 
-        # Check if the files are already uploaded
-        filelist = openai.files.list()
+        # Check if the files are already uploaded, once per run rather than once per job
+        filelist = get_openai_files()
         fileids = []
 
         if not any(filelist):
             logging.error("No files found in OpenAI")
             fileids = upload_resume_files()
+            # list them again so this & later jobs see the uploaded files
+            filelist = get_openai_files()
 
         input_string = make_input_string(prompt, filelist)
 
@@ -426,7 +429,23 @@ def query_openai(prompt, model="gpt-3.5-turbo", temp=0.1, max_tokens=500):
         # logging.error(f"Model: {model} Temperature: {temp} Max Output Tokens: {max_tokens} Prompt: {prompt}")
         return None
 
-# read the prompt from the prompt file
+# the uploaded files, kept once there are some, an empty listing is checked again on the next query
+openai_files = None
+
+# set once setup_openai_key has put the config's key in place
+openai_key_set = False
+
+def get_openai_files():
+    global openai_files
+    if openai_files is not None:
+        return openai_files
+    filelist = openai.files.list()
+    if any(filelist):
+        openai_files = filelist
+    return filelist
+
+# read the prompt from the prompt file, once, every job shares it
+@functools.lru_cache(maxsize=None)
 def load_prompt(filename):
     """Load OpenAI Prompt"""
     # Open the file and read its contents
@@ -461,8 +480,11 @@ def get_job_json_via_genai(job):
     # add the HTML job page to the prompt
     prompt = prompt + ". Here is the job description: " + job
 
-    # Set up the OpenAI API key
-    setup_openai_key()
+    # Set up the OpenAI API key, the first time through. The config's key wins over an
+    # OPENAI_API_KEY in the environment, which the SDK has already read into openai.api_key
+    global openai_key_set
+    if not openai_key_set:
+        openai_key_set = setup_openai_key() is True
      
     model = config["OpenAI"]["MODEL"]
     temp = float(config["OpenAI"]["TEMPERATURE"])